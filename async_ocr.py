@@ -0,0 +1,182 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from utils.onnxocr.onnx_paddleocr import ONNXPaddleOcr
+from utils.log import log
+
+
+class _MicroBatcher:
+    """
+    请求微批处理器：把排队的请求合并成批次，交给执行器统一运行。
+
+    批次在达到 max_batch_size 或等待超过 max_wait 秒时提交，
+    每个调用方的 future 单独完成。
+    """
+
+    def __init__(self, name, run_batch, executor, max_batch_size, max_wait):
+        """
+        :param name: 批处理器名称，仅用于日志
+        :param run_batch: 同步批处理函数，输入请求列表，返回等长结果列表
+        :param executor: 运行批处理函数的执行器
+        :param max_batch_size: 单批最大请求数
+        :param max_wait: 凑批最长等待时间（秒）
+        """
+        self.name = name
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max_wait
+        self.queue = None
+        self.worker = None
+        # 已从队列取出、尚未完成的请求（正在凑批或正在运行的批次）
+        self.inflight = []
+        # 统计信息：已运行批次数与请求数
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self):
+        if self.worker is None or self.worker.done():
+            self.queue = asyncio.Queue()
+            self.worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item):
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future))
+        return await future
+
+    async def _collect(self):
+        """等待第一个请求，然后在时间窗口内尽量凑满一批"""
+        loop = asyncio.get_running_loop()
+        batch = self.inflight = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # 已被调用方取消的请求不再计算
+        return [(item, future) for item, future in batch if not future.cancelled()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            self.batches += 1
+            self.items += len(items)
+            try:
+                results = await loop.run_in_executor(self.executor, self.run_batch, items)
+            except Exception as e:
+                log.error(f"{self.name} 批处理失败({len(items)} 个请求): {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+        }
+
+    async def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+        # 取消正在处理与仍在排队的请求，等待中的调用方收到 CancelledError 而不是一直挂起
+        for _, future in self.inflight:
+            future.cancel()
+        self.inflight = []
+        while self.queue is not None and not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            future.cancel()
+
+
+class AsyncOCR:
+    """
+    异步 OCR 前端，多个并发任务共享同一个已加载的模型。
+
+    recognize / detect 的请求先进入队列，再按批大小或等待时间合并成微批，
+    在专用执行器中运行，每个调用方单独拿到自己的结果。
+
+    用法:
+        async with AsyncOCR() as ocr:
+            text, score = await ocr.recognize(crop)
+            boxes = await ocr.detect(img)
+    """
+
+    def __init__(self, ts=None, max_batch_size=None, max_wait=0.005, executor=None):
+        """
+        :param ts: ONNXPaddleOcr 实例，为空时新建一个
+        :param max_batch_size: 识别微批的最大大小，默认取识别器的 rec_batch_num
+        :param max_wait: 凑批最长等待时间（秒）
+        :param executor: 运行模型的执行器，为空时创建单线程专用执行器
+        """
+        self.ts = ts if ts is not None else ONNXPaddleOcr(use_angle_cls=False, cpu=False)
+        self.own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+
+        if max_batch_size is None:
+            max_batch_size = self.ts.text_recognizer.rec_batch_num
+        self.rec_batcher = _MicroBatcher("rec", self.ts.text_recognizer, self.executor, max_batch_size, max_wait)
+        # 检测输入尺寸各不相同，无法拼成一个张量，这里合批只为减少执行器调度次数
+        self.det_batcher = _MicroBatcher("det", self._detect_batch, self.executor, max_batch_size, max_wait)
+
+    def _detect_batch(self, img_list):
+        return [self.ts.det_text(img) for img in img_list]
+
+    async def recognize(self, crop):
+        """
+        识别单行文本图像。
+
+        :param crop: 单行文本图像（BGR）
+        :return: (text, score)
+        """
+        text, score = await self.rec_batcher.submit(crop)
+        return text, score
+
+    async def detect(self, img):
+        """
+        检测图像中的文本框。
+
+        :param img: 整幅图像（BGR）
+        :return: 与 ONNXPaddleOcr.det_text 相同的 [(box, None), ...]
+        """
+        return await self.det_batcher.submit(img)
+
+    async def ocr_one_row(self, img, box=None):
+        """与 My_TS.ocr_one_row 相同的接口，box 为 [x1, x2, y1, y2]"""
+        if box is not None:
+            x1, x2, y1, y2 = box
+            img = img[y1:y2, x1:x2]
+        text, _ = await self.recognize(img)
+        return text.strip()
+
+    async def close(self):
+        await self.rec_batcher.close()
+        await self.det_batcher.close()
+        if self.own_executor:
+            self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
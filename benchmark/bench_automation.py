@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import traversal_ralic, scan_ralic, enter_relic
+from coordinate_manage import BoxManager
+from config import RelicConfig
+from relic import Relic
+from ocr import My_TS
+from game_sim import GameSimulator
+from utils.log import setup_logging
+
+# 自动化流程吞吐量基准：在无界面模拟器上原样运行 main.py 中的流程
+#
+#   python benchmark/bench_automation.py --count 40 --latency 0.15
+#   python benchmark/bench_automation.py --count 200 --mode grid
+#
+# --mode step 按 D 键逐个遍历（traversal_ralic），grid 按背包网格逐页扫描（scan_ralic）。
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自动化流程吞吐量基准（模拟器）")
+    parser.add_argument("--relics", type=str, default=os.path.join(ROOT, "result.json"))
+    parser.add_argument("--boxes", type=str, default=os.path.join(ROOT, "boxes.yaml"))
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--font", type=str, default=None)
+    parser.add_argument("--mode", choices=["step", "grid"], default="step")
+    args = parser.parse_args()
+    setup_logging(files=False)
+
+    manager = BoxManager(resolution=(1920, 1080))
+    manager.import_from_yaml(args.boxes)
+    config = RelicConfig.load_from_yaml(os.path.join(ROOT, "config/relic.yaml"))
+    Relic.valid_locations = config.valid_locations
+    Relic.valid_items = config.valid_items
+    Relic.valid_sets = config.valid_sets
+    Relic.valid_names_by_set = config.set_to_names
+
+    sim = GameSimulator.from_files(args.relics, args.boxes, count=args.count,
+                                   latency=args.latency, font_path=args.font)
+    sim.attach()
+    ocr_model = My_TS(lang='ch')
+
+    start = time.perf_counter()
+    enter_relic(manager, ocr_model)
+    entered = time.perf_counter()
+    # traversal_ralic 会在当前目录写 result.json，放到临时目录避免覆盖样例数据
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            if args.mode == "grid":
+                scan_ralic(manager, ocr_model)
+            else:
+                traversal_ralic(manager, ocr_model)
+        finally:
+            os.chdir(cwd)
+    end = time.perf_counter()
+
+    print(f"进入遗器界面: {entered - start:.2f}s")
+    print(f"遍历 {args.count} 个遗器: {end - entered:.2f}s, {args.count / (end - entered):.2f} relics/s")
+    print(f"模拟器收到操作: {sim.actions}")
+
+
+if __name__ == "__main__":
+    main()
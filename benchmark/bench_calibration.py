@@ -0,0 +1,85 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2
+import numpy as np
+from calibration import Calibrator
+from coordinate_manage import BoxManager
+from utils.log import setup_logging
+
+# 界面锚点校准基准：把样例截图整体缩放并平移，检查解出的修正与校准后区域的误差，
+# 并测量完整校准、复核、无锚点界面下的 ensure 与查表的耗时
+#
+#   python benchmark/bench_calibration.py --images "test*.png"
+
+TRANSFORMS = [(1.0, 0, 0), (1.0, 7, -5), (1.0, -12, 9), (0.95, 20, 15), (1.05, -30, -20), (0.9, 40, 30)]
+FIELDS = ["relic_name", "relic_main_value", "relic_sub4_value", "backpack_type", "button_upgrade"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="界面锚点校准基准")
+    parser.add_argument("--images", type=str, default=os.path.join(ROOT, "test*.png"))
+    parser.add_argument("--boxes", type=str, default=os.path.join(ROOT, "boxes.yaml"))
+    parser.add_argument("--templates", type=str, default=os.path.join(ROOT, "config/landmarks"))
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    setup_logging(files=False)
+
+    manager = BoxManager(resolution=(1920, 1080))
+    manager.import_from_yaml(args.boxes)
+    calibrator = Calibrator.load(manager, args.templates, cache_path=None)
+    if not calibrator.templates:
+        return
+
+    failed, worst = 0, 0
+    calibrate_s, verify_s, runs = 0.0, 0.0, 0
+    for path in sorted(glob.glob(args.images)):
+        img = cv2.imread(path)
+        h, w = img.shape[:2]
+        for scale, dx, dy in TRANSFORMS:
+            frame = cv2.warpAffine(img, np.float32([[scale, 0, dx], [0, scale, dy]]), (w, h))
+            start = time.perf_counter()
+            result = calibrator.calibrate(frame)
+            calibrate_s += time.perf_counter() - start
+            runs += 1
+            if result is None:
+                failed += 1
+                print(f"  {os.path.basename(path)} {scale} ({dx}, {dy}): 校准失败")
+                continue
+            manager.set_correction(manager.plan_for_frame(frame).viewport, (result["scale"], *result["offset"]))
+            plan = manager.plan_for_frame(frame)
+            base = manager.plan((w, h), calibrated=False)
+            for name in FIELDS:
+                expected = np.array(base.box(name)) * scale + (dx, dx, dy, dy)
+                worst = max(worst, float(np.abs(np.array(plan.box(name)) - expected).max()))
+            start = time.perf_counter()
+            calibrator.verify(frame, plan)
+            verify_s += time.perf_counter() - start
+            manager.set_correction(plan.viewport, None)
+
+    print(f"校准 {runs} 次，失败 {failed} 次，区域坐标最大误差 {worst:.1f} px")
+    print(f"完整校准: {calibrate_s / runs * 1000:.1f} ms   复核: {verify_s / max(runs - failed, 1) * 1000:.2f} ms")
+
+    # 没有锚点的界面：只有第一次做完整搜索，复核间隔内直接查表
+    blank = np.full((1080, 1920, 3), 40, dtype=np.uint8)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        calibrator.ensure(blank)
+    print(f"无锚点界面 ensure {args.repeat} 次: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    plan = manager.plan((1920, 1080))
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for name in manager.box_list:
+            plan.box(name)
+    print(f"校准后查表: {(time.perf_counter() - start) / args.repeat / len(manager.box_list) * 1e6:.2f} us/区域")
+
+
+if __name__ == "__main__":
+    main()
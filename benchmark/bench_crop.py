@@ -0,0 +1,76 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from bench_memory import load_args
+from utils.onnxocr import predict_det
+from utils.onnxocr.predict_system import sorted_boxes
+from utils.onnxocr.utils import get_rotate_crop_image
+
+# 文字框裁剪基准：对比轴对齐快速路径（切片视图）与透视变换的耗时，并逐框检查两者结果一致
+#
+#   python benchmark/bench_crop.py --images "test*.png"
+#
+# 识别模型存在时，同时比较两种裁剪的识别文本与得分。
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文字框裁剪基准")
+    parser.add_argument("--images", type=str, default="test*.png")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--axis_tolerance", type=float, default=0.0)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.images))
+    if not paths:
+        print(f"没有找到图像: {args.images}")
+        return
+    params = load_args()
+    detector = predict_det.TextDetector(params, cpu=True)
+    recognizer = None
+    if os.path.exists(params.rec_model_dir):
+        from utils.onnxocr.predict_rec import TextRecognizer
+        recognizer = TextRecognizer(params, cpu=True)
+
+    total, fast, pixel_diff, text_diff = 0, 0, 0, 0
+    warp_s, slice_s = 0.0, 0.0
+    for path in paths:
+        img = cv2.imread(path)
+        boxes = sorted_boxes(detector(img))
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            warped = [get_rotate_crop_image(img, box.copy(), axis_tolerance=None) for box in boxes]
+        warp_s += time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            crops = [get_rotate_crop_image(img, box.copy(), axis_tolerance=args.axis_tolerance) for box in boxes]
+        slice_s += time.perf_counter() - start
+
+        total += len(boxes)
+        for a, b in zip(warped, crops):
+            if not b.flags.owndata:
+                fast += 1
+            if a.shape != b.shape or not np.array_equal(a, b):
+                pixel_diff += 1
+        if recognizer is not None:
+            for (ta, sa), (tb, sb) in zip(recognizer(warped), recognizer(crops)):
+                text_diff += ta != tb
+
+    print(f"截图 {len(paths)} 张，文字框 {total} 个，走快速路径 {fast} 个")
+    print(f"每帧裁剪耗时: 透视变换 {warp_s / args.repeat / len(paths) * 1000:.3f} ms   "
+          f"快速路径 {slice_s / args.repeat / len(paths) * 1000:.3f} ms")
+    print(f"像素不一致的框: {pixel_diff}")
+    if recognizer is not None:
+        print(f"识别文本不一致的框: {text_diff}")
+    else:
+        print("识别模型不存在，未比较识别结果")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from coordinate_manage import BoxManager
+from digit_reader import GlyphAtlas, DigitReader, NUMERIC_BOXES, DEFAULT_ATLAS_PATH
+
+# 数字字段识别基准：对比字形模板匹配与识别网络的单字段耗时和一致率
+#
+#   python benchmark/bench_digit_reader.py --images "test*.png"
+#
+# 识别模型存在时，用前一半截图的识别结果建立模板库，在全部截图上对比；
+# 否则只用 --atlas 指定的模板库测量模板匹配耗时。
+
+
+def load_crops(paths, manager):
+    crops = []
+    for path in paths:
+        img = cv2.imread(path)
+        for name in NUMERIC_BOXES:
+            x1, x2, y1, y2 = manager.format_box_scaled(name)
+            crops.append(img[y1:y2, x1:x2])
+    return crops
+
+
+def timed(func, crops, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [func(crop) for crop in crops]
+    return results, (time.perf_counter() - start) * 1000 / (repeat * len(crops))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数字字段识别基准")
+    parser.add_argument("--images", type=str, default="test*.png")
+    parser.add_argument("--boxes", type=str, default="boxes.yaml")
+    parser.add_argument("--atlas", type=str, default=DEFAULT_ATLAS_PATH)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.images))
+    if not paths:
+        print(f"没有找到图像: {args.images}")
+        return
+    manager = BoxManager(resolution=(1920, 1080))
+    manager.import_from_yaml(args.boxes)
+    crops = load_crops(paths, manager)
+
+    from utils.onnxocr.utils import infer_args
+    if not os.path.exists(infer_args().get_default("rec_model_dir")):
+        atlas = GlyphAtlas.load(args.atlas)
+        reader = DigitReader(atlas)
+        _, reader_ms = timed(reader.match, crops, args.repeat)
+        print(f"识别模型不存在，只测量模板匹配: {len(crops)} 个字段, {reader_ms:.3f} ms/字段")
+        return
+
+    from ocr import My_TS
+    ocr_model = My_TS(lang='ch')
+    recognize = lambda crop: ocr_model.ts.text_recognizer([crop])[0]
+    recognize(crops[0])
+    labels, rec_ms = timed(recognize, crops, args.repeat)
+
+    # 用前一半截图建立模板库
+    atlas = GlyphAtlas()
+    train = len(NUMERIC_BOXES) * max(1, len(paths) // 2)
+    for crop, (text, score) in zip(crops[:train], labels[:train]):
+        if score >= 0.95:
+            atlas.learn(crop, text.strip())
+    reader = DigitReader(atlas)
+    results, reader_ms = timed(reader.match, crops, args.repeat)
+
+    accepted = [(text, label.strip()) for (text, confidence), (label, _) in zip(results, labels)
+                if confidence >= reader.min_confidence]
+    agree = sum(text == label for text, label in accepted)
+    print(f"模板库: {len(atlas)} 个字形, 字符 {atlas.chars()}")
+    print(f"识别网络: {rec_ms:.3f} ms/字段")
+    print(f"模板匹配: {reader_ms:.3f} ms/字段 ({rec_ms / reader_ms:.1f}x)")
+    print(f"直接采用 {len(accepted)}/{len(crops)} 个字段，其中与识别网络一致 {agree} 个")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入耗时预算：在新进程中用 -X importtime 测量核心模块的导入耗时，
+# 并检查无界面的核心模块不会拉起界面、自动化或推理依赖
+#
+#   python benchmark/bench_import.py --runs 5
+#
+# 超出预算或导入了禁止的模块时以非零状态退出。
+
+# 模块: 预算（ms，累计导入耗时的中位数）
+BUDGETS = {
+    "ocr_index": 150,
+    "config": 150,
+    "coordinate_manage": 150,
+    "relic": 150,
+    "relic_parser": 250,
+    "ocr": 250,
+    "screen_state": 250,
+}
+
+# 核心模块不应导入的依赖
+FORBIDDEN = ["tkinter", "pyautogui", "pygetwindow", "onnxruntime", "PIL", "shapely", "pyclipper", "yaml", "flet"]
+
+
+def measure(module):
+    """返回 (累计导入耗时 ms, 导入的全部模块名)"""
+    cmd = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    with tempfile.TemporaryDirectory() as cwd:
+        # 在空目录中运行，顺便检查导入没有写文件的副作用
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=cwd, env=env)
+        if proc.returncode:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        leftovers = os.listdir(cwd)
+    total, imported = 0, set()
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if not m:
+            continue
+        imported.add(m.group(3))
+        if m.group(3) == module and len(m.group(2)) == 1:
+            total = int(m.group(1)) / 1000
+    return total, imported, leftovers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="核心模块导入耗时预算")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="预算倍数，慢机器上放宽")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':20s} {'median ms':>10s} {'budget':>8s}")
+    for module, budget in BUDGETS.items():
+        runs = [measure(module) for _ in range(args.runs)]
+        median = sorted(r[0] for r in runs)[len(runs) // 2]
+        _, imported, leftovers = runs[-1]
+        budget *= args.scale
+        print(f"{module:20s} {median:10.1f} {budget:8.0f}")
+        if median > budget:
+            failures.append(f"{module}: {median:.1f} ms > {budget:.0f} ms")
+        heavy = sorted(name for name in FORBIDDEN if name in imported)
+        if heavy:
+            failures.append(f"{module}: imports {', '.join(heavy)}")
+        if leftovers:
+            failures.append(f"{module}: import created {', '.join(leftovers)}")
+
+    for failure in failures:
+        print("  FAIL", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2
+import numpy as np
+from coordinate_manage import BoxManager, Viewport, detect_viewport
+
+# 布局表检查与基准：
+# - 16:9 分辨率下编译的布局表与原先的等比缩放逐项一致
+# - 给样例截图加上黑边（上下 / 左右）后能检测出画面区域，布局表中的区域裁出的像素与原图一致
+# - 画面检测、布局表编译与查询的耗时
+#
+#   python benchmark/bench_layout.py --images "test*.png"
+
+
+def legacy_scaled(box, resolution):
+    x1, x2, y1, y2 = box.format_output()
+    sx, sy = resolution[0] / box.resolution[0], resolution[1] / box.resolution[1]
+    return int(x1 * sx), int(x2 * sx), int(y1 * sy), int(y2 * sy)
+
+
+def pad(img, top, left):
+    h, w = img.shape[:2]
+    out = np.zeros((h + 2 * top, w + 2 * left, 3), dtype=img.dtype)
+    out[top:top + h, left:left + w] = img
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="布局表检查与基准")
+    parser.add_argument("--images", type=str, default=os.path.join(ROOT, "test*.png"))
+    parser.add_argument("--boxes", type=str, default=os.path.join(ROOT, "boxes.yaml"))
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    manager = BoxManager(resolution=(1920, 1080))
+    manager.import_from_yaml(args.boxes)
+
+    mismatches = 0
+    for resolution in [(1280, 720), (1600, 900), (1920, 1080), (2560, 1440), (3840, 2160)]:
+        plan = manager.plan(resolution)
+        mismatches += sum(plan.box(name) != legacy_scaled(box, resolution) for name, box in manager.box_list.items())
+    print(f"16:9 分辨率下与等比缩放不一致的区域: {mismatches}")
+
+    paths = sorted(glob.glob(args.images))
+    wrong_viewport = wrong_pixels = 0
+    for path in paths:
+        img = cv2.imread(path)
+        reference = manager.plan_for_frame(img)
+        for top, left in [(0, 0), (60, 0), (0, 320), (41, 0)]:
+            frame = pad(img, top, left)
+            plan = manager.plan_for_frame(frame)
+            if plan.viewport != Viewport(left, top, img.shape[1], img.shape[0]):
+                wrong_viewport += 1
+                continue
+            for name in manager.box_list:
+                x1, x2, y1, y2 = plan.box(name)
+                r1, r2, s1, s2 = reference.box(name)
+                wrong_pixels += not np.array_equal(frame[y1:y2, x1:x2], img[s1:s2, r1:r2])
+    print(f"截图 {len(paths)} 张，画面区域检测错误: {wrong_viewport}，裁剪像素不一致的区域: {wrong_pixels}")
+
+    if paths:
+        img = cv2.imread(paths[0])
+        boxed = pad(img, 60, 0)
+        for label, frame in (("无黑边", img), ("有黑边", boxed)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                detect_viewport(frame)
+            print(f"画面区域检测（{label}）: {(time.perf_counter() - start) / args.repeat * 1000:.3f} ms")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        manager._compile(Viewport(0, 0, 2560, 1080))
+    print(f"编译布局表: {(time.perf_counter() - start) / args.repeat * 1000:.3f} ms")
+    plan = manager.plan((2560, 1080))
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for name in manager.box_list:
+            plan.box(name)
+    per_lookup = (time.perf_counter() - start) / args.repeat / len(manager.box_list) * 1e6
+    print(f"布局表查询: {per_lookup:.2f} us/区域")
+    print("2560x1080 布局示例:", {name: plan.box(name) for name in ("relic_name", "relic_area", "button_upgrade")})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from utils.onnxocr.utils import infer_args, get_rotate_crop_image
+from utils.onnxocr import predict_det
+from utils.onnxocr.predict_system import sorted_boxes
+
+# OCR 流水线内存基准：统计每帧的峰值分配字节数与进程峰值 RSS
+#
+#   python benchmark/bench_memory.py --images "test*.png" --repeat 5
+#
+# 识别模型存在时测量完整的 检测→裁剪→识别；否则只测量 检测→裁剪。
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+
+
+def load_args():
+    parser = infer_args()
+    params = argparse.Namespace(**{action.dest: action.default for action in parser._actions})
+    params.rec_image_shape = "3, 48, 320"
+    params.cpu = True
+    return params
+
+
+def build_pipeline(params):
+    if os.path.exists(params.rec_model_dir):
+        from utils.onnxocr.predict_system import TextSystem
+        return "det+crop+rec", TextSystem(params)
+
+    detector = predict_det.TextDetector(params, cpu=True)
+
+    def det_crop(img):
+        dt_boxes = sorted_boxes(detector(img))
+        return [get_rotate_crop_image(img, box) for box in dt_boxes]
+    return "det+crop", det_crop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR 流水线内存基准")
+    parser.add_argument("--images", type=str, default="test*.png")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.images))
+    if not paths:
+        print(f"没有找到图像: {args.images}")
+        return
+    frames = [cv2.imread(path) for path in paths]
+
+    name, pipeline = build_pipeline(load_args())
+    # 预热一次，排除模型懒初始化的分配
+    pipeline(frames[0])
+
+    tracemalloc.start()
+    peaks = []
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for frame in frames:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            pipeline(frame)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    print(f"pipeline: {name}, frames: {len(peaks)}")
+    print(f"peak allocated per frame: avg {sum(peaks) / len(peaks) / 1024 / 1024:.1f} MB, "
+          f"max {max(peaks) / 1024 / 1024:.1f} MB")
+    print(f"peak RSS: {peak_rss_mb():.1f} MB")
+    print(f"avg time per frame: {elapsed / len(peaks) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
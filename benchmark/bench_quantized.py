@@ -0,0 +1,264 @@
+import argparse
+import ast
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cv2
+import numpy as np
+from coordinate_manage import BoxManager
+from game_sim import GameSimulator, display_stat
+from ocr import My_TS
+from utils.onnxocr.onnx_paddleocr import ONNXPaddleOcr
+from utils.onnxocr.utils import infer_args
+from utils.log import setup_logging
+
+# 量化模型回归基准：在金标准遗器数据上对比 fp32 与 INT8 模型的字段级准确率与耗时
+#
+#   python -m utils.onnxocr.quantize --model det --mode dynamic
+#   python -m utils.onnxocr.quantize --model rec --mode static
+#   python benchmark/bench_quantized.py --variants fp32 int8_dynamic int8_static
+#
+# 金标准来自 result.json 与 test.json：
+# - 样例截图按 fp32 识别出的遗器名与部位匹配金标准条目，匹配不到的截图只统计与 fp32 的一致率
+# - --simulate 时用模拟器把每条金标准遗器渲染成详情面板（需要中文字体）
+# 每个变体同时设置检测与识别模型，可用 --det_only / --rec_only 只替换其中一个。
+# 字段准确率只经过识别模型；检测模型的质量看整帧检测+识别结果相对 fp32 的框召回率、IoU 与文字一致率。
+
+FIELDS = ["relic_name", "relic_location", "relic_level", "relic_main_name", "relic_main_value"] + \
+         [f"relic_sub{i}_{kind}" for i in range(1, 5) for kind in ("name", "value")]
+
+
+def load_golden(paths):
+    """
+    读取 result.json（JSON 列表）与 test.json（识别日志中以 Python 字典形式打印的遗器）。
+    日志中有被截断或混入其他输出的条目，无法解析的跳过；重复条目只保留一次。
+    """
+    relics, seen = [], set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        try:
+            items = json.loads(text)
+        except json.JSONDecodeError:
+            items = []
+            for chunk in top_level_braces(text):
+                try:
+                    items.append(ast.literal_eval(chunk))
+                except (ValueError, SyntaxError):
+                    pass
+        for relic in items:
+            if not isinstance(relic, dict) or not {"name", "location", "level", "item_detail"} <= relic.keys():
+                continue
+            key = json.dumps(relic, ensure_ascii=False, sort_keys=True)
+            if key not in seen:
+                seen.add(key)
+                relics.append(relic)
+    return relics
+
+
+def top_level_braces(text):
+    """按花括号配对切出最外层的 {...} 片段"""
+    depth, start = 0, 0
+    for i, ch in enumerate(text):
+        if ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield text[start:i + 1]
+
+
+def expected_fields(relic):
+    """金标准遗器在详情面板上各字段的显示文本"""
+    fields = {"relic_name": relic["name"], "relic_location": relic["location"], "relic_level": f"+{relic['level']}"}
+    (main_name, main_value), = relic["item_detail"]["main"].items()
+    fields["relic_main_name"], fields["relic_main_value"] = display_stat(main_name, main_value)
+    subs = list(relic["item_detail"]["sub"].items())
+    for i in range(1, 5):
+        name, value = display_stat(*subs[i - 1]) if i <= len(subs) else ("", "")
+        fields[f"relic_sub{i}_name"], fields[f"relic_sub{i}_value"] = name, value
+    return fields
+
+
+def normalize(text):
+    return text.replace(" ", "").lstrip("+")
+
+
+def match_golden(fields, golden):
+    """按遗器名与部位找金标准条目，多条时取字段一致最多的"""
+    candidates = [g for g in golden if g["relic_name"] == fields["relic_name"]
+                  and g["relic_location"] == fields["relic_location"]]
+    return max(candidates, key=lambda g: sum(normalize(fields[k]) == normalize(g[k]) for k in FIELDS), default=None)
+
+
+def build_model(variant, det_only, rec_only):
+    kwargs = {"use_angle_cls": False, "cpu": True}
+    if not rec_only:
+        kwargs["det_model_variant"] = variant
+    if not det_only:
+        kwargs["rec_model_variant"] = variant
+    return My_TS(lang='ch', ts=ONNXPaddleOcr(**kwargs))
+
+
+def quad_rects(boxes):
+    """检测框（四点）的外接矩形 [x1, y1, x2, y2]"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4, 2)
+    return np.concatenate([boxes.min(axis=1), boxes.max(axis=1)], axis=1)
+
+
+def iou_matrix(a, b):
+    """两组矩形两两之间的 IoU"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def compare_detection(result, reference, min_iou=0.5):
+    """
+    把整帧检测+识别结果与 fp32 对比：fp32 的每个文本框取 IoU 最大的框，IoU 达到 min_iou 算召回。
+
+    :param result: [(四点框, 文字), ...]
+    :param reference: fp32 的同格式结果
+    :return: (召回的框数, 召回且文字相同的框数, 召回框的 IoU 之和, fp32 框数)
+    """
+    if not reference:
+        return 0, 0, 0.0, 0
+    if not result:
+        return 0, 0, 0.0, len(reference)
+    iou = iou_matrix(quad_rects([box for box, _ in reference]), quad_rects([box for box, _ in result]))
+    best = iou.argmax(axis=1)
+    best_iou = iou[np.arange(len(reference)), best]
+    recalled = best_iou >= min_iou
+    same_text = sum(normalize(reference[i][1]) == normalize(result[j][1])
+                    for i, j in enumerate(best) if recalled[i])
+    return int(recalled.sum()), int(same_text), float(best_iou[recalled].sum()), len(reference)
+
+
+def run_variant(model, frames, boxes, repeat):
+    """
+    返回 (每帧字段识别结果, 每帧整帧检测+识别结果, 检测耗时 ms/帧, 字段识别耗时 ms/帧)。
+
+    字段识别只裁固定区域、不经过检测模型，检测模型的质量由整帧结果与 fp32 对比得到。
+    """
+    model.ts.text_detector(frames[0][1])
+    model.ocr_fields(frames[0][1], boxes)
+    det_s, rec_s, results = 0.0, 0.0, []
+    for _ in range(repeat):
+        results = []
+        for _, img in frames:
+            start = time.perf_counter()
+            model.ts.text_detector(img)
+            det_s += time.perf_counter() - start
+            start = time.perf_counter()
+            read = model.ocr_fields(img, boxes)
+            rec_s += time.perf_counter() - start
+            results.append({field: text for field, (text, _) in read.items()})
+    full = []
+    for _, img in frames:
+        dt_boxes, rec_res = model.ts(img)
+        full.append([(box, text) for box, (text, _) in zip(dt_boxes or [], rec_res or [])])
+    n = repeat * len(frames)
+    return results, full, det_s / n * 1000, rec_s / n * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量化模型字段级准确率与耗时对比")
+    parser.add_argument("--variants", nargs="+", default=["fp32", "int8_dynamic", "int8_static"])
+    parser.add_argument("--images", type=str, default=os.path.join(ROOT, "test*.png"))
+    parser.add_argument("--golden", nargs="+",
+                        default=[os.path.join(ROOT, "result.json"), os.path.join(ROOT, "test.json")])
+    parser.add_argument("--boxes", type=str, default=os.path.join(ROOT, "boxes.yaml"))
+    parser.add_argument("--simulate", action="store_true", help="同时渲染金标准遗器的详情面板")
+    parser.add_argument("--det_only", action="store_true", help="只替换检测模型")
+    parser.add_argument("--rec_only", action="store_true", help="只替换识别模型")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    setup_logging(files=False)
+
+    rec_model = infer_args().get_default("rec_model_dir")
+    if not os.path.exists(rec_model):
+        print(f"识别模型不存在: {rec_model}")
+        return
+
+    manager = BoxManager(resolution=(1920, 1080))
+    manager.import_from_yaml(args.boxes)
+    boxes = {field: manager.format_box_scaled(field) for field in FIELDS}
+    golden_relics = load_golden(args.golden)
+    golden = [expected_fields(relic) for relic in golden_relics]
+
+    frames = [(os.path.basename(path), cv2.imread(path)) for path in sorted(glob.glob(args.images))]
+    truth = [None] * len(frames)
+    if args.simulate:
+        sim = GameSimulator(golden_relics, manager, latency=0)
+        sim.state = "backpack"
+        sim.tab = 2
+        for i, fields in enumerate(golden):
+            sim._select(i)
+            sim.version += 1
+            frames.append((f"sim:{fields['relic_name']}", sim.render().copy()))
+            truth.append(fields)
+    if not frames:
+        print("没有可用的画面")
+        return
+
+    report = {}
+    reference = None
+    for variant in ["fp32"] + [v for v in args.variants if v != "fp32"]:
+        try:
+            model = build_model(variant, args.det_only, args.rec_only)
+        except FileNotFoundError as e:
+            print(f"{variant}: 跳过，{e}")
+            continue
+        results, full, det_ms, rec_ms = run_variant(model, frames, boxes, args.repeat)
+        if reference is None:
+            reference, full_reference = results, full
+            # 样例截图按 fp32 的识别结果匹配金标准
+            for k, fields in enumerate(results[:len(truth)]):
+                if truth[k] is None:
+                    truth[k] = match_golden(fields, golden)
+        correct = total = agree = 0
+        errors = []
+        for (name, _), fields, ref, expected in zip(frames, results, reference, truth):
+            agree += sum(normalize(fields[f]) == normalize(ref[f]) for f in FIELDS)
+            if expected is None:
+                continue
+            for f in FIELDS:
+                total += 1
+                if normalize(fields[f]) == normalize(expected[f]):
+                    correct += 1
+                else:
+                    errors.append(f"{name} {f}: {fields[f]!r} != {expected[f]!r}")
+        # 检测：fp32 文本框的召回率、召回框的平均 IoU、召回且整帧识别文字相同的比例
+        recalled, same_text, iou_sum, ref_boxes = map(sum, zip(*(compare_detection(f, r)
+                                                                 for f, r in zip(full, full_reference))))
+        detection = (recalled / max(ref_boxes, 1), iou_sum / max(recalled, 1), same_text / max(ref_boxes, 1))
+        report[variant] = (correct, total, agree, detection, det_ms, rec_ms, errors)
+
+    print(f"画面 {len(frames)} 个，有金标准的 {sum(t is not None for t in truth)} 个")
+    print(f"{'variant':14s} {'accuracy':>16s} {'agree fp32':>11s} {'det recall':>11s} {'det IoU':>8s} "
+          f"{'e2e text':>9s} {'det ms':>8s} {'fields ms':>10s}")
+    for variant, (correct, total, agree, detection, det_ms, rec_ms, errors) in report.items():
+        accuracy = f"{correct}/{total} ({correct / total:.1%})" if total else "-"
+        recall, mean_iou, text_match = detection
+        print(f"{variant:14s} {accuracy:>16s} {agree / (len(frames) * len(FIELDS)):>10.1%} "
+              f"{recall:>10.1%} {mean_iou:8.3f} {text_match:>8.1%} {det_ms:8.1f} {rec_ms:10.1f}")
+    for variant, (*_, errors) in report.items():
+        for error in errors:
+            print(f"  [{variant}] {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.onnxocr.predict_system import sorted_boxes
+
+# 检测框排序基准：对比原先的 sorted + 逐个前移 与按行聚类的向量化排序，并检查两者顺序一致
+#
+#   python benchmark/bench_sorted_boxes.py --sizes 100 500 1000
+#
+# 框按背包网格式的行生成，每行的 y 带少量抖动；--jitter 越大，跨度超过容差、需要回退逐个前移的行越多。
+
+
+def legacy_sorted_boxes(dt_boxes):
+    num_boxes = dt_boxes.shape[0]
+    _boxes = list(sorted(dt_boxes, key=lambda x: (x[0][1], x[0][0])))
+    for i in range(num_boxes - 1):
+        for j in range(i, -1, -1):
+            if abs(_boxes[j + 1][0][1] - _boxes[j][0][1]) < 10 and \
+                    (_boxes[j + 1][0][0] < _boxes[j][0][0]):
+                _boxes[j], _boxes[j + 1] = _boxes[j + 1], _boxes[j]
+            else:
+                break
+    return _boxes
+
+
+def make_boxes(n, rng, jitter):
+    rows = max(1, n // 12)
+    y = rng.integers(0, rows, n) * 40 + rng.uniform(-jitter, jitter, n)
+    x = rng.uniform(0, 1900, n)
+    w = rng.uniform(20, 200, n)
+    h = rng.uniform(15, 30, n)
+    quads = np.stack([np.stack([x, y], 1), np.stack([x + w, y], 1),
+                      np.stack([x + w, y + h], 1), np.stack([x, y + h], 1)], 1)
+    return quads.astype(np.float32)
+
+
+def timed(fn, boxes, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(boxes)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检测框排序基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--jitter", type=float, default=3.0)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for n in args.sizes:
+        legacy_ms, new_ms, mismatches = 0.0, 0.0, 0
+        for _ in range(args.trials):
+            boxes = make_boxes(n, rng, args.jitter)
+            t_old, expected = timed(legacy_sorted_boxes, boxes, args.repeat)
+            t_new, actual = timed(sorted_boxes, boxes, args.repeat)
+            legacy_ms += t_old / args.trials
+            new_ms += t_new / args.trials
+            mismatches += not np.array_equal(np.array(expected), np.array(actual))
+        print(f"{n:5d} 个框: 原排序 {legacy_ms:8.3f} ms   向量化 {new_ms:7.3f} ms   "
+              f"加速 {legacy_ms / new_ms:5.1f}x   顺序不一致 {mismatches}/{args.trials}")
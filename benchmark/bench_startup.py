@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+START = time.perf_counter()
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 冷启动基准：每种配置在新进程中测量 导入 → 模型加载 → 预热 → 第一张截图出结果 的耗时
+#
+#   python benchmark/bench_startup.py --image test.png --runs 3
+#
+# 配置：
+#   cold         不使用优化图缓存，不预热
+#   miss         缓存目录为空（首次启动），启动时后台写缓存
+#   cache        使用优化图缓存（先运行一次生成缓存）
+#   cache+warmup 使用优化图缓存并预热
+# 识别模型不存在时只测量检测模型。
+
+
+def child(image, cache_dir, warmup):
+    import cv2
+    from bench_memory import load_args
+    params = load_args()
+    params.ort_cache_dir = cache_dir
+    params.warmup = warmup
+    img = cv2.imread(image)
+    imported = time.perf_counter()
+
+    if os.path.exists(params.rec_model_dir):
+        from utils.onnxocr.predict_system import TextSystem
+        system = TextSystem(params)
+        loaded = time.perf_counter()
+        system(img)
+        startup = dict(system.startup)
+    else:
+        from utils.onnxocr import predict_det
+        created = time.perf_counter()
+        system = predict_det.TextDetector(params, cpu=True)
+        startup = {'init_ms': (time.perf_counter() - created) * 1000}
+        if warmup:
+            start = time.perf_counter()
+            system.warmup([tuple(int(v) for v in shape.split('x')) for shape in params.warmup_det_shapes.split(',')])
+            startup['warmup_ms'] = (time.perf_counter() - start) * 1000
+        loaded = time.perf_counter()
+        system(img)
+    done = time.perf_counter()
+    return {
+        'import_ms': (imported - START) * 1000,
+        'init_ms': startup['init_ms'],
+        'warmup_ms': startup.get('warmup_ms', 0.0),
+        'first_call_ms': (done - loaded) * 1000,
+        'first_result_ms': (done - START) * 1000,
+    }
+
+
+def run_child(image, cache_dir, warmup):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", "--image", image,
+           "--cache_dir", cache_dir, "--warmup", str(int(warmup))]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=ROOT).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR 冷启动基准")
+    parser.add_argument("--image", type=str, default=os.path.join(ROOT, "test.png"))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", action="store_true")
+    parser.add_argument("--cache_dir", type=str, default="")
+    parser.add_argument("--warmup", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        print(json.dumps(child(args.image, args.cache_dir, bool(args.warmup))))
+        return
+
+    cache_dir = tempfile.mkdtemp(prefix="ort_cache_")
+    try:
+        run_child(args.image, cache_dir, False)  # 生成缓存
+        configs = [("cold", "", False), ("miss", None, False), ("cache", cache_dir, False),
+                   ("cache+warmup", cache_dir, True)]
+        keys = ['import_ms', 'init_ms', 'warmup_ms', 'first_call_ms', 'first_result_ms']
+        print(f"{'config':14s}" + "".join(f"{k:>17s}" for k in keys))
+        for name, cache, warmup in configs:
+            # miss 每次使用新的空缓存目录，启动时后台写缓存
+            runs = [run_child(args.image, tempfile.mkdtemp(dir=cache_dir) if cache is None else cache, warmup)
+                    for _ in range(args.runs)]
+            # 取各项的中位数
+            row = {k: sorted(r[k] for r in runs)[len(runs) // 2] for k in keys}
+            print(f"{name:14s}" + "".join(f"{row[k]:17.1f}" for k in keys))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
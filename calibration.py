@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from coordinate_manage import BoxManager, LayoutPlan, Viewport, detect_viewport
+from utils.log import log, setup_logging
+
+# 界面锚点自动校准：窗口偏移几个像素或界面缩放略有不同时，boxes.yaml 中的固定区域会偏离文字。
+# 在画面上用多尺度模板匹配找到几个稳定的界面锚点（landmark_* 区域，如背包图标、关闭按钮），
+# 解出 帧坐标 = 缩放 * 布局坐标 + 偏移 的修正，写入 BoxManager，之后所有区域查询都是查表。
+# 修正按画面区域与窗口位置缓存到文件，锚点不再匹配时才重新校准。
+
+LANDMARK_PREFIX = "landmark_"
+DEFAULT_TEMPLATE_DIR = "config/landmarks"
+DEFAULT_CACHE_PATH = "config/calibration.json"
+
+# 相对布局缩放的搜索范围
+DEFAULT_SCALES = tuple(np.round(np.arange(0.85, 1.151, 0.025), 3))
+
+
+class Calibrator:
+    """
+    界面锚点校准器。
+
+    模板为参考分辨率下裁出的灰度图，锚点的预期位置取 BoxManager 中同名区域，
+    因此带鱼屏等比例下锚点同样按区域的锚点规则换算。
+    """
+
+    def __init__(self, manager: BoxManager, templates: Dict[str, np.ndarray], cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+                 scales=DEFAULT_SCALES, threshold: float = 0.8, search_margin: int = 48, max_residual: float = 3.0,
+                 min_landmarks: int = 2, check_interval: float = 5.0):
+        """
+        :param manager: 已导入布局的 BoxManager，校准结果写入其中
+        :param templates: 锚点区域名 -> 参考分辨率下的灰度模板
+        :param cache_path: 校准结果缓存文件，为 None 时不落盘
+        :param scales: 相对布局缩放的搜索范围
+        :param threshold: 模板匹配得分阈值（TM_CCOEFF_NORMED）
+        :param search_margin: 预期位置周围的搜索范围（参考分辨率像素）
+        :param max_residual: 锚点拟合残差上限（参考分辨率像素），超出的锚点视为误匹配
+        :param min_landmarks: 至少匹配的锚点数
+        :param check_interval: 两次复核锚点的最小间隔（秒），间隔内直接查表
+        """
+        self.manager = manager
+        self.templates = {name: template for name, template in templates.items() if name in manager.box_list}
+        self.cache_path = cache_path
+        self.scales = tuple(scales)
+        self.threshold = threshold
+        self.search_margin = search_margin
+        self.max_residual = max_residual
+        self.min_landmarks = min_landmarks
+        self.check_interval = check_interval
+        self.cache: Dict[str, Dict] = {}
+        self._scaled: Dict[Tuple[str, float], np.ndarray] = {}  # (锚点, 缩放) -> 缩放后的模板
+        self._active_key = None
+        self._last_check = 0.0
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self.cache = json.load(f)
+
+    @classmethod
+    def load(cls, manager: BoxManager, template_dir: str = DEFAULT_TEMPLATE_DIR, **kwargs) -> 'Calibrator':
+        """从模板目录加载锚点模板（文件名为区域名），目录不存在时校准器不做任何修正"""
+        templates = {}
+        if os.path.isdir(template_dir):
+            for filename in sorted(os.listdir(template_dir)):
+                name, ext = os.path.splitext(filename)
+                if ext == ".png" and name in manager.box_list:
+                    templates[name] = cv2.imread(os.path.join(template_dir, filename), cv2.IMREAD_GRAYSCALE)
+        if not templates:
+            log.warning(f"没有找到界面锚点模板: {template_dir}，不进行自动校准")
+        return cls(manager, templates, **kwargs)
+
+    @staticmethod
+    def cache_key(viewport: Viewport, window=None) -> str:
+        """缓存键：画面区域 + 窗口位置与大小"""
+        key = f"{viewport.width}x{viewport.height}+{viewport.x}+{viewport.y}"
+        if window is not None:
+            key += "@{},{},{}x{}".format(*window)
+        return key
+
+    def _template(self, name, scale):
+        scale = round(scale, 4)
+        template = self._scaled.get((name, scale))
+        if template is None:
+            template = self.templates[name]
+            if scale != 1:
+                interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+                template = cv2.resize(template, None, fx=scale, fy=scale, interpolation=interpolation)
+            template = self._scaled[(name, scale)] = template
+        return template
+
+    def _match(self, frame, name, box, margin, scales):
+        """
+        在区域周围 margin 像素内按各缩放匹配模板，只把搜索窗口转为灰度。
+
+        :return: (得分, 中心 x, 中心 y)
+        """
+        h, w = frame.shape[:2]
+        x1, x2, y1, y2 = box
+        wx1, wy1 = max(0, x1 - margin), max(0, y1 - margin)
+        window = frame[wy1:min(h, y2 + margin), wx1:min(w, x2 + margin)]
+        if window.ndim == 3:
+            window = cv2.cvtColor(window, cv2.COLOR_BGR2GRAY)
+        best = (-1.0, 0.0, 0.0)
+        for scale in scales:
+            template = self._template(name, scale)
+            th, tw = template.shape
+            if th > window.shape[0] or tw > window.shape[1] or th < 4 or tw < 4:
+                continue
+            _, score, _, (lx, ly) = cv2.minMaxLoc(cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED))
+            if score > best[0]:
+                best = (score, wx1 + lx + tw / 2, wy1 + ly + th / 2)
+        return best
+
+    def calibrate(self, frame: np.ndarray, viewport: Optional[Viewport] = None) -> Optional[Dict]:
+        """
+        在整个搜索范围内匹配锚点并拟合修正。
+
+        :param frame: 截图
+        :param viewport: 画面区域，为空时自动检测
+        :return: {"scale", "offset", "score", "landmarks"}；匹配的锚点不足时返回 None
+        """
+        if viewport is None:
+            viewport = detect_viewport(frame)
+        base = self.manager.plan(viewport, calibrated=False)
+        scales = [base.scale * s for s in self.scales]
+        spread = max(abs(s - 1) for s in self.scales)
+
+        points = []
+        for name in self.templates:
+            x1, x2, y1, y2 = base.box(name)
+            px, py = (x1 + x2) / 2, (y1 + y2) / 2
+            # 界面整体缩放时离原点越远的锚点移动越多，搜索范围随之扩大
+            margin = int(self.search_margin * base.scale + spread * max(px, py))
+            score, qx, qy = self._match(frame, name, base.box(name), margin, scales)
+            if score >= self.threshold:
+                points.append((name, px, py, qx, qy, score))
+        result = self._fit(points, self.max_residual * base.scale)
+        if result is None:
+            log.debug(f"界面锚点匹配不足: {[p[0] for p in points]}")
+        return result
+
+    def _fit(self, points: List[Tuple], tolerance: float) -> Optional[Dict]:
+        """最小二乘拟合 q = k * p + t，逐个剔除残差最大的锚点直到全部在容差内"""
+        points = list(points)
+        while len(points) >= max(2, self.min_landmarks):
+            p = np.array([pt[1:3] for pt in points])
+            q = np.array([pt[3:5] for pt in points])
+            n = len(points)
+            a = np.zeros((2 * n, 3))
+            a[0::2, 0], a[0::2, 1] = p[:, 0], 1
+            a[1::2, 0], a[1::2, 2] = p[:, 1], 1
+            (k, tx, ty), *_ = np.linalg.lstsq(a, q.reshape(-1), rcond=None)
+            residual = np.hypot(*(q - (k * p + (tx, ty))).T)
+            worst = int(np.argmax(residual))
+            if residual[worst] <= tolerance:
+                # 更高的精度只是拟合噪声，取整后无修正时结果与未校准完全一致
+                return {
+                    "scale": round(float(k), 5),
+                    "offset": [round(float(tx), 2), round(float(ty), 2)],
+                    "score": float(np.mean([pt[5] for pt in points])),
+                    "landmarks": [pt[0] for pt in points],
+                }
+            points.pop(worst)
+        return None
+
+    def verify(self, frame: np.ndarray, plan: LayoutPlan, slack: int = 3) -> bool:
+        """
+        复核锚点：只在校准后的位置附近、按校准后的缩放匹配一次，比完整校准快得多。
+
+        :return: 匹配的锚点数是否达到 min_landmarks
+        """
+        matched = sum(self._match(frame, name, plan.box(name), slack, [plan.scale])[0] >= self.threshold
+                      for name in self.templates)
+        return matched >= min(self.min_landmarks, len(self.templates))
+
+    def ensure(self, frame: np.ndarray, window=None) -> LayoutPlan:
+        """
+        返回帧对应的已校准布局表。
+
+        同一画面区域与窗口位置在 check_interval 内直接查表；到期后复核锚点，
+        复核失败才重新校准。校准失败（例如当前不是有锚点的界面）时保留已有修正，到期后再试。
+
+        :param frame: 截图
+        :param window: 窗口位置与大小 (left, top, width, height)，参与缓存键
+        """
+        viewport = detect_viewport(frame)
+        if not self.templates:
+            return self.manager.plan(viewport)
+        key = self.cache_key(viewport, window)
+        now = time.monotonic()
+        if key == self._active_key and now - self._last_check < self.check_interval:
+            return self.manager.plan(viewport)
+        # 校准失败（没有锚点的界面）同样计入间隔，避免每帧都做完整搜索
+        self._active_key = key
+        self._last_check = now
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._apply(viewport, cached)
+            if self.verify(frame, self.manager.plan(viewport)):
+                return self.manager.plan(viewport)
+
+        start = time.perf_counter()
+        result = self.calibrate(frame, viewport)
+        if result is not None:
+            log.info(f"界面校准 {key}: 缩放 {result['scale']:.4f}, 偏移 ({result['offset'][0]:.1f}, "
+                     f"{result['offset'][1]:.1f}), 锚点 {len(result['landmarks'])} 个, "
+                     f"{(time.perf_counter() - start) * 1000:.1f} ms")
+            self.cache[key] = result
+            self._apply(viewport, result)
+            self._save()
+        elif cached is None:
+            # 从未校准过的画面不做修正，下次到期再试
+            self.manager.set_correction(viewport, None)
+        return self.manager.plan(viewport)
+
+    def _apply(self, viewport, result):
+        self.manager.set_correction(viewport, (result["scale"], *result["offset"]))
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump(self.cache, f, indent=2)
+
+
+def learn_templates(manager: BoxManager, frame: np.ndarray, template_dir: str = DEFAULT_TEMPLATE_DIR) -> List[str]:
+    """
+    从参考分辨率的截图中裁出所有 landmark_* 区域作为模板。
+
+    :return: 保存的锚点名
+    """
+    os.makedirs(template_dir, exist_ok=True)
+    plan = manager.plan(frame.shape[1::-1], calibrated=False)
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    names = [name for name in manager.box_list if name.startswith(LANDMARK_PREFIX)]
+    for name in names:
+        x1, x2, y1, y2 = plan.box(name)
+        cv2.imwrite(os.path.join(template_dir, f"{name}.png"), gray[y1:y2, x1:x2])
+    return names
+
+
+_default_calibrator = None
+
+
+def get_calibrator(manager: BoxManager) -> Calibrator:
+    """获取默认校准器（模板与缓存使用默认路径），换了 BoxManager 时重新创建"""
+    global _default_calibrator
+    if _default_calibrator is None or _default_calibrator.manager is not manager:
+        _default_calibrator = Calibrator.load(manager)
+    return _default_calibrator
+
+
+if __name__ == "__main__":
+    # 学习模板:  python calibration.py learn test.png
+    # 校准截图:  python calibration.py calibrate screenshot.png
+    parser = argparse.ArgumentParser(description="界面锚点校准工具")
+    parser.add_argument("command", choices=["learn", "calibrate"])
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--boxes", type=str, default="boxes.yaml")
+    parser.add_argument("--templates", type=str, default=DEFAULT_TEMPLATE_DIR)
+    options = parser.parse_args()
+    setup_logging(files=False)
+
+    manager = BoxManager(resolution=(1920, 1080))
+    manager.import_from_yaml(options.boxes)
+    if options.command == "learn":
+        names = learn_templates(manager, cv2.imread(options.images[0]), options.templates)
+        print(f"已保存 {len(names)} 个锚点模板到 {options.templates}: {names}")
+    else:
+        calibrator = Calibrator.load(manager, options.templates, cache_path=None)
+        for path in options.images:
+            print(path, calibrator.calibrate(cv2.imread(path)))
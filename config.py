@@ -1,4 +1,3 @@
-import yaml
 from typing import List, Dict, Tuple
 
 class RelicConfig:
@@ -16,6 +15,7 @@ class RelicConfig:
 
     @classmethod
     def load_from_yaml(cls, filepath: str) -> 'RelicConfig':
+        import yaml
         with open(filepath, 'r', encoding='utf-8') as f:
             data = yaml.safe_load(f)
         relic_data = data.get('Relic', {})
@@ -35,6 +35,7 @@ class RelicConfig:
                 'valid_items': self.valid_items,
             }
         }
+        import yaml
         with open(filepath, 'w', encoding='utf-8') as f:
             yaml.dump(data, f, allow_unicode=True)
 
@@ -1,13 +1,24 @@
-import yaml
 import json
-from typing import Tuple, Dict
+from typing import Tuple, Dict, NamedTuple, Optional
+
+import numpy as np
+
+# 锚点：区域在参考分辨率下贴靠的位置，值为 (水平, 垂直) 方向上多余空间的分配比例。
+# 宽高比与参考分辨率一致时所有锚点的结果相同；带鱼屏或 16:10 等比例下，
+# 游戏界面按短边等比缩放，贴边的面板跟随窗口边缘，居中的内容留在中间。
+ANCHORS = {
+    "top_left": (0.0, 0.0), "top": (0.5, 0.0), "top_right": (1.0, 0.0),
+    "left": (0.0, 0.5), "center": (0.5, 0.5), "right": (1.0, 0.5),
+    "bottom_left": (0.0, 1.0), "bottom": (0.5, 1.0), "bottom_right": (1.0, 1.0),
+}
 
 class Box:
     """
-    单个坐标区域对象，包含名称、分辨率、起止坐标。
+    单个坐标区域对象，包含名称、分辨率、起止坐标与锚点。
     """
 
-    def __init__(self, name: str, resolution: Tuple[int, int], position_start: Tuple[int, int], position_end: Tuple[int, int]):
+    def __init__(self, name: str, resolution: Tuple[int, int], position_start: Tuple[int, int], position_end: Tuple[int, int],
+                 anchor: str = "center"):
         """
         初始化 Box 对象。
 
@@ -15,11 +26,15 @@ class Box:
         :param resolution: 坐标对应的原始分辨率，例如 (1920, 1080)
         :param position_start: 区域起始点坐标 (x, y)
         :param position_end: 区域终点坐标 (x, y)
+        :param anchor: 锚点，见 ANCHORS
         """
+        if anchor not in ANCHORS:
+            raise ValueError(f"Unknown anchor '{anchor}' for box '{name}'.")
         self.name = name
         self.resolution = resolution
         self.position_start = position_start
         self.position_end = position_end
+        self.anchor = anchor
 
     def format_output(self) -> Tuple[int, int, int, int]:
         """
@@ -38,7 +53,8 @@ class Box:
             "name": self.name,
             "resolution": list(self.resolution),
             "position_start": list(self.position_start),
-            "position_end": list(self.position_end)
+            "position_end": list(self.position_end),
+            "anchor": self.anchor
         }
 
     @staticmethod
@@ -51,9 +67,106 @@ class Box:
             name=data["name"],
             resolution=tuple(data["resolution"]),
             position_start=tuple(data["position_start"]),
-            position_end=tuple(data["position_end"])
+            position_end=tuple(data["position_end"]),
+            anchor=data.get("anchor", "center")
         )
-    
+
+
+class Viewport(NamedTuple):
+    """
+    画面中实际显示游戏内容的区域（帧坐标），窗口带黑边时小于整帧。
+    """
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+
+def detect_viewport(frame: np.ndarray, black_level: int = 8, min_bar: int = 2, step: int = 8) -> Viewport:
+    """
+    检测帧中的游戏画面区域，去掉上下或左右对称的纯黑边（窗口化、比例不符时的黑边）。
+
+    四条边上都有亮像素时直接返回整帧（常见情况，几微秒）；否则在隔 step 个像素采样的
+    行列上求最大亮度，1080p 约 2 毫秒。黑边不对称时视为画面本身的暗色内容，不裁剪。
+
+    :param frame: BGR 或灰度帧
+    :param black_level: 亮度不超过该值视为黑边
+    :param min_bar: 黑边的最小宽度（像素）
+    :return: Viewport
+    """
+    h, w = frame.shape[:2]
+    if min(frame[0].max(), frame[-1].max(), frame[:, 0].max(), frame[:, -1].max()) > black_level:
+        return Viewport(0, 0, w, h)
+    # 先在稀疏采样的小图上找亮区，再在采样点之间逐行（列）细化边界
+    small = frame[::step, ::step]
+    channels = tuple(range(2, frame.ndim))
+    rows = small.max(axis=(1,) + channels) > black_level
+    cols = small.max(axis=(0,) + channels) > black_level
+    if not rows.any():
+        return Viewport(0, 0, w, h)
+
+    def span(mask, n, bright):
+        start = int(np.argmax(mask)) * step
+        end = (len(mask) - 1 - int(np.argmax(mask[::-1]))) * step + 1
+        while start > 0 and bright(start - 1):
+            start -= 1
+        while end < n and bright(end):
+            end += 1
+        if start < min_bar or abs(start - (n - end)) > min_bar:
+            return 0, n
+        return start, end
+
+    y1, y2 = span(rows, h, lambda y: frame[y, ::step].max() > black_level)
+    x1, x2 = span(cols, w, lambda x: frame[::step, x].max() > black_level)
+    return Viewport(x1, y1, x2 - x1, y2 - y1)
+
+
+class LayoutPlan:
+    """
+    某个画面区域下编译好的布局表：所有区域的帧坐标 [x1, x2, y1, y2] 一次算好，
+    识别区域、点击位置都从这里取，避免各处各自换算坐标。
+    """
+
+    def __init__(self, viewport: Viewport, scale: float, boxes: Dict[str, Tuple[int, int, int, int]]):
+        """
+        :param viewport: 游戏画面区域
+        :param scale: 参考分辨率到画面的缩放比例
+        :param boxes: 区域名 -> 帧坐标 [x1, x2, y1, y2]
+        """
+        self.viewport = viewport
+        self.scale = scale
+        self.boxes = boxes
+
+    def box(self, name: str) -> Tuple[int, int, int, int]:
+        """
+        返回区域的帧坐标 [x1, x2, y1, y2]。
+
+        :param name: Box 名称
+        """
+        if name not in self.boxes:
+            raise ValueError(f"Box '{name}' not found.")
+        return self.boxes[name]
+
+    def center(self, name: str) -> Tuple[int, int]:
+        """
+        返回区域中心的帧坐标，用作点击位置。
+
+        :param name: Box 名称
+        """
+        x1, x2, y1, y2 = self.box(name)
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.boxes
+
+    def __repr__(self):
+        return f"LayoutPlan(viewport={tuple(self.viewport)}, scale={self.scale:.3f}, boxes={len(self.boxes)})"
+
+
 class BoxManager:
     """
     坐标管理类，统一管理多个 Box 区域，并提供导入导出功能。
@@ -67,6 +180,11 @@ class BoxManager:
         """
         self.resolution = resolution
         self.box_list: Dict[str, Box] = {}  # 存储多个 Box 对象，键为 box.name
+        # 按分辨率手工校准的布局表：(宽, 高) -> {区域名: 画面内坐标 [x1, x2, y1, y2]}，优先于锚点换算
+        self.layouts: Dict[Tuple[int, int], Dict[str, Tuple[int, int, int, int]]] = {}
+        # 锚点校准得到的修正 (缩放, x 偏移, y 偏移)，作用于换算后的帧坐标，见 calibration.py
+        self.corrections: Dict[Viewport, Tuple[float, float, float]] = {}
+        self._plans: Dict[Viewport, LayoutPlan] = {}  # 已编译的布局表缓存
 
     def add_box(self, box: Box):
         """
@@ -75,24 +193,107 @@ class BoxManager:
         :param box: Box 实例
         """
         self.box_list[box.name] = box
+        self._plans.clear()
+
+    def add_layout(self, resolution: Tuple[int, int], boxes: Dict[str, Tuple[int, int, int, int]]):
+        """
+        添加某个分辨率下手工校准的区域坐标，编译该分辨率的布局时代替锚点换算。
+
+        :param resolution: 游戏画面分辨率 (宽, 高)
+        :param boxes: 区域名 -> 画面内坐标 [x1, x2, y1, y2]
+        """
+        self.layouts.setdefault(tuple(resolution), {}).update(
+            {name: tuple(int(v) for v in box) for name, box in boxes.items()})
+        self._plans.clear()
+
+    def set_correction(self, viewport: Viewport, correction: Optional[Tuple[float, float, float]]):
+        """
+        设置某个画面区域的校准修正，之后该区域的布局表都包含修正。
+
+        :param viewport: 画面区域
+        :param correction: (缩放, x 偏移, y 偏移)，帧坐标 = 缩放 * 换算坐标 + 偏移；None 表示清除
+        """
+        if correction is None:
+            self.corrections.pop(viewport, None)
+        else:
+            self.corrections[viewport] = tuple(float(v) for v in correction)
+        self._plans.pop(viewport, None)
+
+    def plan(self, viewport, calibrated: bool = True) -> LayoutPlan:
+        """
+        返回指定画面区域的布局表，同一画面区域只编译一次。
+
+        :param viewport: Viewport，或 (宽, 高) 表示整帧都是游戏画面
+        :param calibrated: 为 False 时返回不含校准修正的布局表（不缓存）
+        """
+        if not isinstance(viewport, Viewport):
+            viewport = Viewport(0, 0, int(viewport[0]), int(viewport[1]))
+        if not calibrated:
+            return self._compile(viewport)
+        plan = self._plans.get(viewport)
+        if plan is None:
+            plan = self._plans[viewport] = self._compile(viewport, self.corrections.get(viewport))
+        return plan
+
+    def plan_for_frame(self, frame: np.ndarray, detect_letterbox: bool = True) -> LayoutPlan:
+        """
+        按帧的实际大小（可选去掉黑边）返回布局表。
+
+        :param frame: 截图
+        :param detect_letterbox: 是否检测并排除黑边
+        """
+        if detect_letterbox:
+            return self.plan(detect_viewport(frame))
+        return self.plan(frame.shape[1::-1])
+
+    def _compile(self, viewport: Viewport, correction: Optional[Tuple[float, float, float]] = None) -> LayoutPlan:
+        """
+        按锚点把所有区域换算到画面区域：以短边为准等比缩放，
+        多出的空间按锚点分配，再叠加画面区域在帧中的偏移与校准修正。
+        """
+        vx, vy, vw, vh = viewport
+        k, tx, ty = correction or (1.0, 0.0, 0.0)
+        override = self.layouts.get((vw, vh), {})
+        boxes = {}
+        for name, box in self.box_list.items():
+            if name in override:
+                x1, x2, y1, y2 = override[name]
+                ox, oy, scale = vx, vy, 1.0
+            else:
+                rw, rh = box.resolution
+                scale = min(vw / rw, vh / rh)
+                ax, ay = ANCHORS[box.anchor]
+                # 多余空间，宽高比一致时为 0（消除浮点误差，保证与等比缩放结果相同）
+                ox = vx + ax * round(vw - rw * scale, 6)
+                oy = vy + ay * round(vh - rh * scale, 6)
+                x1, x2, y1, y2 = box.format_output()
+            boxes[name] = (int(k * (ox + x1 * scale) + tx), int(k * (ox + x2 * scale) + tx),
+                           int(k * (oy + y1 * scale) + ty), int(k * (oy + y2 * scale) + ty))
+        return LayoutPlan(viewport, k * min(vw / self.resolution[0], vh / self.resolution[1]), boxes)
     
     def export_to_yaml(self, filepath: str):
-        data = {
-            "resolution": list(self.resolution),  # 转成 list
-            "boxes": {name: box.to_dict() for name, box in self.box_list.items()}
-        }
+        data = self.to_dict()
+        import yaml
         with open(filepath, 'w', encoding='utf-8') as f:
             yaml.dump(data, f, allow_unicode=True)
 
     def import_from_yaml(self, filepath: str):
+        import yaml
         with open(filepath, 'r', encoding='utf-8') as f:
             data = yaml.safe_load(f)
+        self._load(data)
 
+    def _load(self, data: Dict):
         self.resolution = tuple(data["resolution"])  # 转回 tuple
         self.box_list = {
             name: Box.from_dict(box_data)
             for name, box_data in data["boxes"].items()
         }
+        self.layouts = {}
+        self.corrections = {}
+        self._plans.clear()
+        for key, boxes in data.get("layouts", {}).items():
+            self.add_layout(tuple(int(v) for v in key.split("x")), boxes)
 
     def export_to_json(self, filepath: str):
         """
@@ -100,10 +301,7 @@ class BoxManager:
 
         :param filepath: 保存的文件路径
         """
-        data = {
-            "resolution": self.resolution,
-            "boxes": {name: box.to_dict() for name, box in self.box_list.items()}
-        }
+        data = self.to_dict()
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2)
 
@@ -115,49 +313,31 @@ class BoxManager:
         """
         with open(filepath, 'r', encoding='utf-8') as f:
             data = json.load(f)
-
-        self.resolution = tuple(data["resolution"])
-        self.box_list = {
-            name: Box.from_dict(box_data)
-            for name, box_data in data["boxes"].items()
-        }
+        self._load(data)
 
     def format_box_scaled(self, name: str) -> Tuple[int, int, int, int]:
         """
-        返回指定名称 Box 的缩放坐标，按照当前管理器分辨率进行等比缩放。
+        返回指定名称 Box 在当前管理器分辨率下的坐标（整帧都是游戏画面时的布局表）。
 
         :param name: Box 名称
-        :return: 缩放后的坐标 [x1, x2, y1, y2]
+        :return: 换算后的坐标 [x1, x2, y1, y2]
         """
-        if name not in self.box_list:
-            raise ValueError(f"Box '{name}' not found.")
-
-        box = self.box_list[name]
-        box_x1, box_x2, box_y1, box_y2 = box.format_output()
-
-        # 计算缩放因子（目标分辨率 / Box 原始分辨率）
-        scale_x = self.resolution[0] / box.resolution[0]
-        scale_y = self.resolution[1] / box.resolution[1]
-
-        # 返回等比缩放后的坐标
-        return (
-            int(box_x1 * scale_x),
-            int(box_x2 * scale_x),
-            int(box_y1 * scale_y),
-            int(box_y2 * scale_y)
-        )
+        return self.plan(self.resolution).box(name)
     
     def to_dict(self) -> Dict:
-        return {
+        data = {
             "resolution": list(self.resolution),  # 转成列表
             "boxes": {name: box.to_dict() for name, box in self.box_list.items()}
         }
+        if self.layouts:
+            data["layouts"] = {f"{w}x{h}": {name: list(box) for name, box in boxes.items()}
+                               for (w, h), boxes in self.layouts.items()}
+        return data
     
     @staticmethod
     def from_dict(data: Dict) -> 'BoxManager':
         manager = BoxManager(resolution=tuple(data["resolution"]))
-        for name, box_data in data["boxes"].items():
-            manager.box_list[name] = Box.from_dict(box_data)
+        manager._load(data)
         return manager
 
 if __name__ == "__main__":
@@ -171,7 +351,8 @@ if __name__ == "__main__":
         name="relic_name",
         resolution=(1920, 1080),
         position_start=(1400, 130),
-        position_end=(1650, 160)
+        position_end=(1650, 160),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -179,7 +360,8 @@ if __name__ == "__main__":
         name="relic_location",
         resolution=(1920, 1080),
         position_start=(1410, 280),
-        position_end=(1500, 310)
+        position_end=(1500, 310),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -187,7 +369,8 @@ if __name__ == "__main__":
         name="relic_level",
         resolution=(1920, 1080),
         position_start=(1410, 311),
-        position_end=(1500, 345)
+        position_end=(1500, 345),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -195,7 +378,8 @@ if __name__ == "__main__":
         name="relic_main_name",
         resolution=(1920, 1080),
         position_start=(1440, 395),
-        position_end=(1700, 433)
+        position_end=(1700, 433),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -203,7 +387,8 @@ if __name__ == "__main__":
         name="relic_main_value",
         resolution=(1920, 1080),
         position_start=(1701, 395),
-        position_end=(1842, 433)
+        position_end=(1842, 433),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -211,7 +396,8 @@ if __name__ == "__main__":
         name="relic_sub1_name",
         resolution=(1920, 1080),
         position_start=(1440, 439),
-        position_end=(1700, 477)
+        position_end=(1700, 477),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -219,7 +405,8 @@ if __name__ == "__main__":
         name="relic_sub1_value",
         resolution=(1920, 1080),
         position_start=(1701, 439),
-        position_end=(1842, 477)
+        position_end=(1842, 477),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -227,7 +414,8 @@ if __name__ == "__main__":
         name="relic_sub2_name",
         resolution=(1920, 1080),
         position_start=(1440, 478),
-        position_end=(1700, 515)
+        position_end=(1700, 515),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -235,7 +423,8 @@ if __name__ == "__main__":
         name="relic_sub2_value",
         resolution=(1920, 1080),
         position_start=(1701, 478),
-        position_end=(1842, 515)
+        position_end=(1842, 515),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -243,7 +432,8 @@ if __name__ == "__main__":
         name="relic_sub3_name",
         resolution=(1920, 1080),
         position_start=(1440, 516),
-        position_end=(1700, 553)
+        position_end=(1700, 553),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -251,7 +441,8 @@ if __name__ == "__main__":
         name="relic_sub3_value",
         resolution=(1920, 1080),
         position_start=(1701, 516),
-        position_end=(1842, 553)
+        position_end=(1842, 553),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -259,7 +450,8 @@ if __name__ == "__main__":
         name="relic_sub4_name",
         resolution=(1920, 1080),
         position_start=(1440, 554),
-        position_end=(1700, 591)
+        position_end=(1700, 591),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -267,7 +459,8 @@ if __name__ == "__main__":
         name="relic_sub4_value",
         resolution=(1920, 1080),
         position_start=(1701, 554),
-        position_end=(1842, 591)
+        position_end=(1842, 591),
+        anchor="right"
     )
     manager.add_box(box)
 
@@ -275,7 +468,8 @@ if __name__ == "__main__":
         name="backpack_type",
         resolution=(1920, 1080),
         position_start=(100, 65),
-        position_end=(210, 95)
+        position_end=(210, 95),
+        anchor="left"
     )
     manager.add_box(box)
 
@@ -283,11 +477,78 @@ if __name__ == "__main__":
         name="relic_area",
         resolution=(1920, 1080),
         position_start=(127, 200),
-        position_end=(1250, 940)
+        position_end=(1250, 940),
+        anchor="left"
     )
     manager.add_box(box)
 
 
+    # 滚轮位置与按钮只用中心点
+    box = Box(
+        name="relic_scrollbar",
+        resolution=(1920, 1080),
+        position_start=(1290, 480),
+        position_end=(1310, 520),
+        anchor="left"
+    )
+    manager.add_box(box)
+
+    box = Box(
+        name="button_upgrade",
+        resolution=(1920, 1080),
+        position_start=(1645, 960),
+        position_end=(1825, 1010),
+        anchor="right"
+    )
+    manager.add_box(box)
+
+    box = Box(
+        name="button_auto_add",
+        resolution=(1920, 1080),
+        position_start=(1700, 635),
+        position_end=(1880, 685),
+        anchor="right"
+    )
+    manager.add_box(box)
+
+    box = Box(
+        name="button_enhance",
+        resolution=(1920, 1080),
+        position_start=(1590, 965),
+        position_end=(1770, 1015),
+        anchor="right"
+    )
+    manager.add_box(box)
+
+
+    # 背包网格右侧的滚动条，滚动后滑块移动，网格扫描用它判断翻页是否生效
+    box = Box(
+        name="relic_scroll_track",
+        resolution=(1920, 1080),
+        position_start=(1346, 198),
+        position_end=(1360, 922),
+        anchor="left"
+    )
+    manager.add_box(box)
+
+    # 背包右上角的遗器数量 "遗器数量 1932/2000"，网格扫描用它确定总行数
+    box = Box(
+        name="relic_count",
+        resolution=(1920, 1080),
+        position_start=(1515, 45),
+        position_end=(1765, 88),
+        anchor="right"
+    )
+    manager.add_box(box)
+
+    # 校准用的界面锚点（landmark），模板由 calibration.py learn 从参考截图中裁出
+    for name, start, end, anchor in (("landmark_backpack", (44, 36), (98, 94), "left"),
+                                     ("landmark_close", (1834, 40), (1892, 92), "right"),
+                                     ("landmark_filter", (126, 962), (182, 1018), "left"),
+                                     ("landmark_detail", (1400, 952), (1614, 1016), "right")):
+        manager.add_box(Box(name=name, resolution=(1920, 1080), position_start=start, position_end=end, anchor=anchor))
+
+
     # 打印缩放后的坐标
     # print("Scaled output:", manager.format_box_scaled("example"))
 
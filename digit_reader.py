@@ -0,0 +1,282 @@
+import argparse
+import re
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+# 数字字段快速识别：等级、主/副词条数值使用固定的游戏字体，只包含数字、'.'、'%' 和 '+'，
+# 按列投影切分字形后与字形模板库做归一化相关匹配，不需要运行识别网络。
+# 模板库由识别网络高置信度的结果自动建立，匹配置信度不足时回退到识别网络。
+
+NUMERIC_CHARS = "0123456789.%+"
+_VALUE_PATTERN = re.compile(r"\+?\d+(\.\d+)?%?")
+
+# 归一化后的字形大小 (w, h)
+GLYPH_SIZE = (16, 24)
+
+
+def binarize(crop: np.ndarray, min_contrast: float = 60) -> np.ndarray:
+    """
+    把文字区域二值化为文字前景。
+
+    以边缘像素的中位色作为背景色，按与背景色的距离做 OTSU 阈值分割，
+    白色、橙色、金色文字以及不同底色都能用同一套处理。
+    前景与背景的平均距离差小于 min_contrast 时认为区域为空，返回全零图。
+    """
+    if crop.ndim == 3:
+        border = np.concatenate([crop[0], crop[-1], crop[:, 0], crop[:, -1]]).astype(np.float32)
+        background = np.median(border, axis=0)
+        diff = crop.astype(np.float32) - background
+        gray = np.sqrt((diff * diff).sum(axis=2))
+        gray = cv2.convertScaleAbs(gray, alpha=255 / 442)
+    else:
+        gray = crop
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    foreground = binary > 0
+    if np.count_nonzero(foreground) > binary.size // 2:
+        binary = cv2.bitwise_not(binary)
+        foreground = ~foreground
+    if not foreground.any() or foreground.all() or \
+            abs(float(gray[foreground].mean()) - float(gray[~foreground].mean())) < min_contrast:
+        binary[:] = 0
+    return binary
+
+
+def segment(binary: np.ndarray, min_pixels: int = 3) -> Tuple[List[Tuple[int, int]], int, int]:
+    """
+    按列投影切分字形。
+
+    :param binary: 二值图
+    :param min_pixels: 少于该像素数的连续列视为噪声
+    :return: ([(x1, x2), ...], y1, y2)，y1, y2 为整行文字的上下边界
+    """
+    rows = np.flatnonzero(binary.any(axis=1))
+    if rows.size == 0:
+        return [], 0, 0
+    y1, y2 = int(rows[0]), int(rows[-1]) + 1
+    columns = np.count_nonzero(binary[y1:y2], axis=0)
+    on = np.concatenate(([0], (columns > 0).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(on))
+    spans = []
+    for x1, x2 in zip(edges[::2], edges[1::2]):
+        if columns[x1:x2].sum() >= min_pixels:
+            spans.append((int(x1), int(x2)))
+    return spans, y1, y2
+
+
+def glyph_vectors(binary: np.ndarray, spans, y1: int, y2: int) -> np.ndarray:
+    """
+    把切分出的字形归一化为零均值、单位长度的向量，形状 (n, GLYPH_SIZE[0] * GLYPH_SIZE[1])。
+
+    字形保持整行高度与原始宽高比放入画布，'.' 与 '+' 等小字形的位置和大小信息得以保留。
+    """
+    height = y2 - y1
+    canvas_w = max(height, max((x2 - x1 for x1, x2 in spans), default=0))
+    vectors = np.empty((len(spans), GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+    canvas = np.zeros((height, canvas_w), dtype=np.uint8)
+    for i, (x1, x2) in enumerate(spans):
+        canvas[:] = 0
+        offset = (canvas_w - (x2 - x1)) // 2
+        canvas[:, offset:offset + x2 - x1] = binary[y1:y2, x1:x2]
+        v = cv2.resize(canvas, GLYPH_SIZE, interpolation=cv2.INTER_AREA).reshape(-1).astype(np.float32)
+        v -= v.mean()
+        norm = np.linalg.norm(v)
+        vectors[i] = v / norm if norm > 0 else v
+    return vectors
+
+
+class GlyphAtlas:
+    """
+    字形模板库：每个字符保存若干个归一化字形向量。
+    """
+
+    def __init__(self, max_per_char: int = 8, duplicate_score: float = 0.97):
+        """
+        :param max_per_char: 每个字符最多保存的模板数
+        :param duplicate_score: 与已有模板相关度高于该值的新字形视为重复，不再保存
+        """
+        self.max_per_char = max_per_char
+        self.duplicate_score = duplicate_score
+        self.labels = np.empty(0, dtype='<U1')
+        self.templates = np.empty((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def chars(self) -> str:
+        return "".join(sorted(set(self.labels.tolist())))
+
+    def add(self, char: str, vector: np.ndarray) -> bool:
+        """加入一个字形模板，重复或已满时返回 False"""
+        same = self.labels == char
+        if np.count_nonzero(same) >= self.max_per_char:
+            return False
+        if same.any() and float((self.templates[same] @ vector).max()) >= self.duplicate_score:
+            return False
+        self.labels = np.append(self.labels, char)
+        self.templates = np.vstack([self.templates, vector[None]])
+        return True
+
+    def learn(self, crop: np.ndarray, text: str) -> int:
+        """
+        用已知文本的数值区域更新模板库。
+
+        只有切分出的字形数与文本长度一致时才采用，避免把粘连或断裂的字形学错。
+
+        :return: 新增的模板数
+        """
+        text = text.replace(" ", "")
+        if not text or any(ch not in NUMERIC_CHARS for ch in text):
+            return 0
+        binary = binarize(crop)
+        spans, y1, y2 = segment(binary)
+        if len(spans) != len(text):
+            return 0
+        vectors = glyph_vectors(binary, spans, y1, y2)
+        return sum(self.add(ch, v) for ch, v in zip(text, vectors))
+
+    def match(self, vectors: np.ndarray, min_score: float = 0.75) -> Tuple[str, float]:
+        """
+        逐个字形匹配模板。
+
+        :param min_score: 字形与最佳模板的最低相关度，低于该值时置信度为 0
+        :return: (文本, 置信度)；置信度为各字形中最佳相关度与其他字符最佳相关度之差（margin）的最小值
+        """
+        if len(self.labels) == 0 or len(vectors) == 0:
+            return "", 0.0
+        scores = vectors @ self.templates.T
+        best = scores.argmax(axis=1)
+        rows = np.arange(len(vectors))
+        best_score = scores[rows, best]
+        best_labels = self.labels[best]
+        # 其他字符中的最佳相关度
+        others = np.where(self.labels[None, :] == best_labels[:, None], -1.0, scores)
+        margin = best_score - others.max(axis=1)
+        confidence = float(margin.min()) if best_score.min() >= min_score else 0.0
+        return "".join(best_labels.tolist()), confidence
+
+    def save(self, filepath: str):
+        np.savez_compressed(filepath, labels=self.labels, templates=self.templates,
+                            max_per_char=self.max_per_char, duplicate_score=self.duplicate_score)
+
+    @classmethod
+    def load(cls, filepath: str) -> 'GlyphAtlas':
+        data = np.load(filepath)
+        atlas = cls(int(data["max_per_char"]), float(data["duplicate_score"]))
+        atlas.labels = data["labels"]
+        atlas.templates = data["templates"].astype(np.float32)
+        return atlas
+
+
+class DigitReader:
+    """
+    数字字段识别器：先用字形模板匹配，置信度不足时回退到识别网络，
+    并用识别网络的高置信度结果继续完善模板库。
+    """
+
+    def __init__(self, atlas: Optional[GlyphAtlas] = None, ocr_model=None, min_score: float = 0.75,
+                 min_confidence: float = 0.05, learn_score: float = 0.95):
+        """
+        :param atlas: 字形模板库，为空时从空库开始
+        :param ocr_model: My_TS 实例，用于回退与学习，为空时只用模板匹配
+        :param min_score: 字形与模板的最低相关度
+        :param min_confidence: 模板匹配结果可直接采用的最低置信度（与其他字符的相关度之差）
+        :param learn_score: 识别网络结果用于学习模板的最低得分
+        """
+        self.atlas = atlas if atlas is not None else GlyphAtlas()
+        self.ocr_model = ocr_model
+        self.min_score = min_score
+        self.min_confidence = min_confidence
+        self.learn_score = learn_score
+        self.hits = 0
+        self.fallbacks = 0
+
+    def match(self, crop: np.ndarray) -> Tuple[str, float]:
+        """只用模板匹配识别，返回 (文本, 置信度)"""
+        binary = binarize(crop)
+        spans, y1, y2 = segment(binary)
+        if not spans:
+            return "", 1.0
+        return self.atlas.match(glyph_vectors(binary, spans, y1, y2), self.min_score)
+
+    def lookup(self, crop: np.ndarray) -> Optional[str]:
+        """只用模板匹配识别，置信度不足时返回 None"""
+        text, confidence = self.match(crop)
+        if confidence >= self.min_confidence:
+            self.hits += 1
+            return text
+        return None
+
+    def learn(self, crop: np.ndarray, text: str, score: float):
+        """用识别网络的结果完善模板库"""
+        self.fallbacks += 1
+        if score >= self.learn_score:
+            self.atlas.learn(crop, text)
+
+    @staticmethod
+    def accepts(text: str) -> bool:
+        """是否为合法的数值文本，例如 +15、38.8%、118"""
+        return _VALUE_PATTERN.fullmatch(text) is not None
+
+    def read(self, img: np.ndarray, box=None) -> str:
+        """
+        识别数字字段，接口与 My_TS.ocr_one_row 一致。
+
+        :param img: BGR 图像
+        :param box: [x1, x2, y1, y2]，为空时识别整张图
+        """
+        crop = img if box is None else img[box[2]:box[3], box[0]:box[1]]
+        text = self.lookup(crop)
+        if text is not None:
+            return text
+        if self.ocr_model is None:
+            # 没有识别网络可回退时，直接采用模板匹配结果
+            return self.match(crop)[0]
+        text, score = self.ocr_model.ocr_one_row_with_score(crop)
+        self.learn(crop, text, score)
+        return text
+
+
+DEFAULT_ATLAS_PATH = "config/glyph_atlas.npz"
+NUMERIC_BOXES = ["relic_level", "relic_main_value"] + [f"relic_sub{i}_value" for i in range(1, 5)]
+_default_readers = {}
+
+
+def get_digit_reader(ocr_model=None, path: str = DEFAULT_ATLAS_PATH) -> DigitReader:
+    """获取与 ocr_model 绑定的默认数字识别器，模板库文件不存在时从空库开始学习"""
+    reader = _default_readers.get(id(ocr_model))
+    if reader is None:
+        try:
+            atlas = GlyphAtlas.load(path)
+        except FileNotFoundError:
+            atlas = GlyphAtlas()
+        reader = _default_readers[id(ocr_model)] = DigitReader(atlas, ocr_model)
+    return reader
+
+
+if __name__ == "__main__":
+    # 用识别网络在样例截图上建立模板库:  python digit_reader.py test*.png
+    from coordinate_manage import BoxManager
+    from ocr import My_TS
+
+    parser = argparse.ArgumentParser(description="由样例截图建立数字字形模板库")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--boxes", type=str, default="boxes.yaml")
+    parser.add_argument("--output", type=str, default=DEFAULT_ATLAS_PATH)
+    parser.add_argument("--min_score", type=float, default=0.95)
+    args = parser.parse_args()
+
+    manager = BoxManager(resolution=(1920, 1080))
+    manager.import_from_yaml(args.boxes)
+    ocr_model = My_TS(lang='ch')
+    atlas = GlyphAtlas()
+    for path in args.images:
+        img = cv2.imread(path)
+        for name in NUMERIC_BOXES:
+            x1, x2, y1, y2 = manager.format_box_scaled(name)
+            crop = img[y1:y2, x1:x2]
+            text, score = ocr_model.ts.text_recognizer([crop])[0]
+            if score >= args.min_score:
+                atlas.learn(crop, text.strip())
+    atlas.save(args.output)
+    print(f"模板库共 {len(atlas)} 个字形，覆盖字符: {atlas.chars()}，已保存到 {args.output}")
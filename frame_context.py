@@ -0,0 +1,127 @@
+import hashlib
+import cv2
+import numpy as np
+from typing import Callable, Dict, Tuple
+
+# 单帧分析上下文：同一帧的灰度图、HSV、各类掩码与缩小图按需计算，每帧（每个 ROI）最多计算一次。
+#
+# 用法:
+#     ctx = FrameContext(capture_fullscreen())
+#     roi = ctx.roi(box)          # 子区域，父帧已算好的派生图直接切片复用
+#     mask = roi.dark_mask()
+#
+# 帧截图来自帧缓冲环，会被后续截图覆盖；上下文只应在本帧处理期间使用。
+
+
+def frame_key(img: np.ndarray) -> Tuple:
+    """
+    计算图像的标识，用于判断是否为同一帧：(形状, 类型, 内容摘要)。
+
+    对全部像素做摘要：等级、数值只差一个字形的两帧也必须得到不同的标识，
+    抽样会漏掉落在采样点之间的变化。SHA-1 有硬件加速，整帧 1080p 截图约 5 ms，
+    远小于一次识别的耗时；这里只做去重，不涉及安全。
+    """
+    digest = hashlib.sha1(np.ascontiguousarray(img).data, usedforsecurity=False).digest()
+    return img.shape, img.dtype.str, digest
+
+
+class FrameContext:
+    """
+    一帧（或其子区域）的分析上下文。
+    """
+
+    def __init__(self, img: np.ndarray, origin: Tuple[int, int] = (0, 0), parent: 'FrameContext' = None,
+                 box: Tuple[int, int, int, int] = None):
+        """
+        :param img: BGR 图像
+        :param origin: 图像左上角在整帧中的坐标 (x, y)
+        :param parent: 父上下文，子区域的派生图优先从父上下文切片
+        :param box: 在父上下文中的 [x1, x2, y1, y2]
+        """
+        self.img = img
+        self.origin = origin
+        self.parent = parent
+        self.box = box
+        self._cache: Dict = {}
+        self._rois: Dict = {}
+
+    @property
+    def shape(self):
+        return self.img.shape
+
+    @property
+    def key(self) -> Tuple:
+        """帧标识，见 frame_key"""
+        value = self._cache.get("key")
+        if value is None:
+            value = self._cache["key"] = frame_key(self.img)
+        return value
+
+    def cached(self, key, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        取出或计算派生图。父上下文已有同名派生图时直接切片（视图，不复制）。
+        """
+        value = self._cache.get(key)
+        if value is None:
+            if self.parent is not None and key in self.parent._cache:
+                x1, x2, y1, y2 = self.box
+                value = self.parent._cache[key][y1:y2, x1:x2]
+            else:
+                value = compute()
+            self._cache[key] = value
+        return value
+
+    @property
+    def gray(self) -> np.ndarray:
+        return self.cached("gray", lambda: cv2.cvtColor(self.img, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        return self.cached("hsv", lambda: cv2.cvtColor(self.img, cv2.COLOR_BGR2HSV))
+
+    def dark_mask(self, rgb_threshold: int = 55) -> np.ndarray:
+        """三个通道都不超过阈值的暗色区域，单通道 0/255"""
+        return self.cached(("dark", rgb_threshold),
+                           lambda: cv2.inRange(self.img, (0, 0, 0), (rgb_threshold,) * 3))
+
+    def white_mask(self, lower=(0, 0, 160), upper=(180, 40, 255)) -> np.ndarray:
+        """HSV 中低饱和高亮度的白色区域，单通道 0/255"""
+        return self.cached(("white", tuple(lower), tuple(upper)), lambda: cv2.inRange(self.hsv, lower, upper))
+
+    def black_mask(self, lower=(0, 0, 0), upper=(180, 40, 50)) -> np.ndarray:
+        """HSV 中低饱和低亮度的黑色区域，单通道 0/255"""
+        return self.cached(("black", tuple(lower), tuple(upper)), lambda: cv2.inRange(self.hsv, lower, upper))
+
+    def downscaled(self, level: int = 1, gray: bool = True) -> np.ndarray:
+        """
+        图像金字塔的第 level 层（每层缩小一半），level=0 为原图。
+        各层逐级由上一层计算并缓存。
+        """
+        if level <= 0:
+            return self.gray if gray else self.img
+        key = ("pyramid", level, gray)
+        value = self._cache.get(key)
+        if value is None:
+            value = self._cache[key] = cv2.pyrDown(self.downscaled(level - 1, gray))
+        return value
+
+    def roi(self, box) -> 'FrameContext':
+        """
+        取子区域的上下文，同一区域只创建一次。
+
+        :param box: [x1, x2, y1, y2]，相对本上下文
+        """
+        x1, x2, y1, y2 = box
+        h, w = self.img.shape[:2]
+        key = (max(0, x1), min(w, x2), max(0, y1), min(h, y2))
+        child = self._rois.get(key)
+        if child is None:
+            x1, x2, y1, y2 = key
+            child = FrameContext(self.img[y1:y2, x1:x2], (self.origin[0] + x1, self.origin[1] + y1), self, key)
+            self._rois[key] = child
+        return child
+
+
+def as_context(img) -> FrameContext:
+    """接受 BGR 图像或 FrameContext，统一返回 FrameContext"""
+    return img if isinstance(img, FrameContext) else FrameContext(img)
@@ -0,0 +1,434 @@
+import json
+import os
+import threading
+import time
+import zlib
+import cv2
+import numpy as np
+from coordinate_manage import BoxManager
+from utils.capture import CaptureBackend
+from utils.log import log, setup_logging
+
+# 无界面游戏界面模拟器
+#
+# 按 boxes.yaml 的布局把 result.json 格式的遗器数据渲染成背包网格与遗器详情面板，
+# 响应 simulation.py 发出的按键、点击与滚轮操作，并通过截图后端接口提供画面。
+# 这样 main.py 中的自动化流程可以在 Linux 上原样运行并测量吞吐量。
+#
+# 用法:
+#     sim = GameSimulator.from_files("result.json", "boxes.yaml", count=60)
+#     sim.attach()            # 替换 simulation 的截图与输入后端
+#     traversal_ralic(manager, ocr_model)
+
+WINDOW_TITLE = "崩坏：星穹铁道"
+
+# 背包标签页，按 E 循环切换
+BACKPACK_TABS = ["光锥", "养成材料", "遗器", "其他材料", "消耗品", "任务"]
+
+# 游戏中以百分比显示的词条（不含“xx百分比”这类由名字区分的词条）
+PERCENT_STATS = {
+    "暴击率", "暴击伤害", "效果命中", "效果抵抗", "击破特攻", "治疗量加成", "能量恢复效率",
+}
+
+# 常见中文字体位置，找不到时退回 PIL 默认字体（不能显示中文，但流程仍可运行）
+FONT_CANDIDATES = [
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+]
+
+
+def display_stat(name, value):
+    """把 result.json 中的词条名与数值转换成游戏中的显示文本"""
+    if name.endswith("百分比"):
+        return name[:-len("百分比")], f"{value}%"
+    if name in PERCENT_STATS or name.endswith("属性伤害提高"):
+        return name, f"{value}%"
+    return name, str(value)
+
+
+class GridLayout:
+    """
+    背包网格布局：在 relic_area 区域内按固定格子大小排列，默认与游戏一致（1080p 下每行 9 格、可见 5 行）。
+    """
+
+    def __init__(self, area, cols=9, cell_size=(112, 135), gap=(12, 13)):
+        """
+        :param area: relic_area 区域 [x1, x2, y1, y2]
+        :param cols: 每行格子数
+        :param cell_size: 格子大小 (w, h)
+        :param gap: 格子间距 (x, y)
+        """
+        self.area = area
+        self.cols = cols
+        self.cell_w, self.cell_h = cell_size
+        self.gap_x, self.gap_y = gap
+        x1, x2, y1, y2 = area
+        self.rows = max(1, (y2 - y1 + self.gap_y) // (self.cell_h + self.gap_y))
+
+    def cell_rect(self, row, col):
+        """可见区域第 row 行 col 列格子的 [x1, x2, y1, y2]"""
+        x = self.area[0] + col * (self.cell_w + self.gap_x)
+        y = self.area[2] + row * (self.cell_h + self.gap_y)
+        return x, x + self.cell_w, y, y + self.cell_h
+
+    def hit(self, x, y):
+        """返回点击位置对应的 (row, col)，不在格子内时返回 None"""
+        x1, _, y1, _ = self.area
+        col, dx = divmod(x - x1, self.cell_w + self.gap_x)
+        row, dy = divmod(y - y1, self.cell_h + self.gap_y)
+        if 0 <= col < self.cols and 0 <= row < self.rows and dx < self.cell_w and dy < self.cell_h:
+            return int(row), int(col)
+        return None
+
+
+class GameSimulator:
+    """
+    游戏界面状态机与渲染器。
+
+    状态: world（大世界）→ backpack（背包）→ enhance（强化界面）→ enhance_result（强化结果）。
+    每个操作的效果在 latency 秒后才生效，模拟界面动画延迟。
+    """
+
+    def __init__(self, relics, manager, latency=0.15, cols=9, font_path=None, scroll_unit=120):
+        """
+        :param relics: result.json 格式的遗器字典列表
+        :param manager: 已导入布局的 BoxManager
+        :param latency: 操作生效的延迟（秒）
+        :param cols: 背包网格每行格子数
+        :param font_path: 中文字体路径，为空时自动查找
+        :param scroll_unit: 滚轮每滚动一行对应的数值（Windows 每格为 120）
+        """
+        self.relics = [json.loads(json.dumps(relic)) for relic in relics]
+        self.manager = manager
+        self.latency = latency
+        self.scroll_unit = scroll_unit
+        self.width, self.height = manager.resolution
+        # 与 main.py 使用同一份布局表，按钮位置取 boxes.yaml 中按钮区域的中心
+        self.plan = manager.plan((self.width, self.height))
+        self.grid = GridLayout(self.plan.box("relic_area"), cols=cols)
+        self.font_path = font_path or next((p for p in FONT_CANDIDATES if os.path.exists(p)), None)
+        if self.font_path is None:
+            log.warning("模拟器未找到中文字体，渲染的中文将无法识别")
+        self.fonts = {}
+
+        self.lock = threading.Lock()
+        self.state = "world"
+        self.tab = 0
+        self.selected = 0
+        self.scroll_row = 0
+        self.materials_added = False
+        self.pending = []
+        self.frame = None
+        self.frame_version = -1
+        self.version = 0
+        self.actions = 0
+
+    @classmethod
+    def from_files(cls, relic_path="result.json", boxes_path="boxes.yaml", count=None, **kwargs):
+        """
+        从文件创建模拟器。
+
+        :param count: 背包中的遗器数量，大于数据条数时循环复用
+        """
+        with open(relic_path, "r", encoding="utf-8") as f:
+            relics = json.load(f)
+        if count is not None:
+            # 循环复用的副本改变等级，让网格中的格子与详情面板不会整页重复
+            n = len(relics)
+            relics = [dict(relics[i % n], level=str((int(relics[i % n]["level"]) + 3 * (i // n)) % 16))
+                      for i in range(count)]
+        manager = BoxManager(resolution=(1920, 1080))
+        manager.import_from_yaml(boxes_path)
+        return cls(relics, manager, **kwargs)
+
+    def attach(self):
+        """把 simulation 的截图与输入后端替换为本模拟器"""
+        import simulation
+        simulation.set_capture_backend(SimulatorCapture(self))
+        simulation.set_input_backend(SimulatorInput(self))
+
+    # ---------- 状态变化 ----------
+
+    def _schedule(self, change):
+        with self.lock:
+            self.actions += 1
+            self.pending.append((time.perf_counter() + self.latency, change))
+
+    def _apply_pending(self):
+        now = time.perf_counter()
+        with self.lock:
+            due = [change for t, change in self.pending if t <= now]
+            self.pending = [(t, change) for t, change in self.pending if t > now]
+        for change in due:
+            change()
+            self.version += 1
+
+    def press(self, key):
+        self._schedule(lambda: self._on_key(key.lower()))
+
+    def click(self, x, y):
+        self._schedule(lambda: self._on_click(x, y))
+
+    def scroll(self, amount):
+        rows = int(round(-amount / self.scroll_unit)) or (-1 if amount > 0 else 1)
+        self._schedule(lambda: self._on_scroll(rows))
+
+    # 操作在生效时才按当时的界面状态处理，动画期间的操作与游戏一样按顺序排队
+
+    def _on_key(self, key):
+        if key == "b" and self.state == "world":
+            self._set_state("backpack")
+        elif key == "e" and self.state == "backpack":
+            self.tab = (self.tab + 1) % len(BACKPACK_TABS)
+        elif key == "d" and self.state == "backpack" and self._relic_tab():
+            self._select(self.selected + 1)
+        elif key == "esc":
+            self._back()
+
+    def _on_click(self, x, y):
+        if self.state == "backpack" and self._relic_tab():
+            cell = self.grid.hit(x, y)
+            if cell is not None:
+                index = (self.scroll_row + cell[0]) * self.grid.cols + cell[1]
+                if index < len(self.relics):
+                    self._select(index)
+            elif _near((x, y), self.plan.center("button_upgrade")):
+                self._set_state("enhance")
+        elif self.state == "enhance":
+            if _near((x, y), self.plan.center("button_auto_add")):
+                self.materials_added = True
+            elif _near((x, y), self.plan.center("button_enhance")) and self.materials_added:
+                self._enhance()
+
+    def _on_scroll(self, rows):
+        if self.state == "backpack" and self._relic_tab():
+            self._scroll_rows(rows)
+
+    def _relic_tab(self):
+        return BACKPACK_TABS[self.tab] == "遗器"
+
+    def _set_state(self, state):
+        self.state = state
+        self.materials_added = False
+
+    def _select(self, index):
+        self.selected = max(0, min(index, len(self.relics) - 1))
+        # 选中的格子不在可见区域时自动滚动
+        row = self.selected // self.grid.cols
+        if row < self.scroll_row:
+            self.scroll_row = row
+        elif row >= self.scroll_row + self.grid.rows:
+            self.scroll_row = row - self.grid.rows + 1
+
+    def _scroll_rows(self, rows):
+        total_rows = (len(self.relics) + self.grid.cols - 1) // self.grid.cols
+        self.scroll_row = max(0, min(self.scroll_row + rows, max(0, total_rows - self.grid.rows)))
+
+    def _back(self):
+        self.state = {
+            "enhance_result": "enhance",
+            "enhance": "backpack",
+            "backpack": "world",
+        }.get(self.state, self.state)
+        self.materials_added = False
+
+    def _enhance(self):
+        """强化到下一个 3 级档位，副词条不足 4 条时补一条"""
+        relic = self.relics[self.selected]
+        level = int(relic["level"])
+        relic["level"] = str(min(15, level + 3))
+        subs = relic["item_detail"]["sub"]
+        if len(subs) < 4:
+            used = set(subs) | set(relic["item_detail"]["main"])
+            for name in ("攻击力百分比", "暴击率", "暴击伤害", "速度", "效果命中"):
+                if name not in used:
+                    subs[name] = "3.0"
+                    break
+            relic["item_number"] = 1 + len(subs)
+        self.materials_added = False
+        self.state = "enhance_result"
+
+    # ---------- 渲染 ----------
+
+    def _font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            from PIL import ImageFont
+            if self.font_path:
+                font = ImageFont.truetype(self.font_path, size)
+            else:
+                try:
+                    font = ImageFont.load_default(size=size)
+                except TypeError:
+                    # Pillow < 10.1 的默认字体不支持字号
+                    font = ImageFont.load_default()
+            font = self.fonts[size] = font
+        return font
+
+    def _box(self, name):
+        return self.plan.box(name)
+
+    def render(self):
+        """返回当前画面（BGR），状态未变化时复用上一帧"""
+        self._apply_pending()
+        if self.frame is not None and self.frame_version == self.version:
+            return self.frame
+        from PIL import Image, ImageDraw
+
+        img = np.full((self.height, self.width, 3), (40, 30, 25), dtype=np.uint8)
+        texts = []
+        if self.state != "world":
+            self._draw_backpack(img, texts)
+        if self.state in ("enhance", "enhance_result"):
+            self._draw_enhance(img, texts)
+
+        # 文字统一用 PIL 绘制（OpenCV 不支持中文）
+        pil = Image.fromarray(img)
+        draw = ImageDraw.Draw(pil)
+        for (x, y), text, size, color in texts:
+            draw.text((x, y), text, font=self._font(size), fill=color)
+        self.frame = np.asarray(pil)
+        self.frame_version = self.version
+        return self.frame
+
+    def _text_in_box(self, texts, name, text, color=(235, 235, 235)):
+        x1, x2, y1, y2 = self._box(name)
+        size = max(10, int((y2 - y1) * 0.7))
+        texts.append(((x1 + 4, y1 + (y2 - y1 - size) // 2), text, size, color))
+
+    def _draw_backpack(self, img, texts):
+        self._text_in_box(texts, "backpack_type", BACKPACK_TABS[self.tab])
+        if not self._relic_tab():
+            # 其他标签页只画一页灰色物品格子
+            for i in range(self.grid.rows * self.grid.cols):
+                x1, x2, y1, y2 = self.grid.cell_rect(*divmod(i, self.grid.cols))
+                shade = 80 + 12 * self.tab
+                cv2.rectangle(img, (x1, y1), (x2, y2), (shade, shade, shade), -1)
+            return
+
+        self._text_in_box(texts, "relic_count", f"遗器数量 {len(self.relics)}/2000")
+
+        # 背包网格：格子底部是深色等级条
+        first = self.scroll_row * self.grid.cols
+        for i in range(self.grid.rows * self.grid.cols):
+            index = first + i
+            if index >= len(self.relics):
+                break
+            x1, x2, y1, y2 = self.grid.cell_rect(*divmod(i, self.grid.cols))
+            cv2.rectangle(img, (x1, y1), (x2, y2), (90, 120, 170), -1)
+            # 遗器图标：颜色由遗器名、部位与等级决定
+            relic = self.relics[index]
+            color = zlib.crc32(f"{relic['name']}{relic['location']}{relic['level']}".encode()).to_bytes(4, "big")
+            cv2.circle(img, ((x1 + x2) // 2, y1 + 55), 35, tuple(int(c) for c in color[:3]), -1)
+            cv2.rectangle(img, (x1 + 10, y2 - 28), (x2 - 10, y2 - 6), (20, 20, 20), -1)
+            level = f"+{self.relics[index]['level']}"
+            texts.append(((x1 + 40, y2 - 27), level, 18, (235, 235, 235)))
+            if index == self.selected:
+                cv2.rectangle(img, (x1 - 3, y1 - 3), (x2 + 3, y2 + 3), (255, 255, 255), 2)
+
+        # 网格右侧的滚动条，滑块位置与大小按可见行占总行数的比例
+        x1, x2, y1, y2 = self._box("relic_scroll_track")
+        total_rows = max(self.grid.rows, (len(self.relics) + self.grid.cols - 1) // self.grid.cols)
+        thumb_y = y1 + (y2 - y1) * self.scroll_row // total_rows
+        thumb_h = max(14, (y2 - y1) * self.grid.rows // total_rows)
+        cv2.rectangle(img, (x1 + 5, y1), (x2 - 5, y2), (70, 60, 55), -1)
+        cv2.rectangle(img, (x1 + 5, thumb_y), (x2 - 5, thumb_y + thumb_h), (200, 200, 200), -1)
+
+        # 遗器详情面板
+        relic = self.relics[self.selected]
+        x1, _, y1, _ = self._box("relic_name")
+        cv2.rectangle(img, (x1 - 30, y1 - 30), (1900, 1060), (60, 50, 45), -1)
+        self._text_in_box(texts, "relic_name", relic["name"])
+        self._text_in_box(texts, "relic_location", relic["location"])
+        self._text_in_box(texts, "relic_level", f"+{relic['level']}")
+        (main_name, main_value), = relic["item_detail"]["main"].items()
+        name, value = display_stat(main_name, main_value)
+        self._text_in_box(texts, "relic_main_name", name)
+        self._text_in_box(texts, "relic_main_value", value)
+        for i, (sub_name, sub_value) in enumerate(relic["item_detail"]["sub"].items(), start=1):
+            name, value = display_stat(sub_name, sub_value)
+            self._text_in_box(texts, f"relic_sub{i}_name", name)
+            self._text_in_box(texts, f"relic_sub{i}_value", value)
+        x, y = self.plan.center("button_upgrade")
+        cv2.rectangle(img, (x - 90, y - 25), (x + 90, y + 25), (200, 200, 200), -1)
+        texts.append(((x - 36, y - 14), "强化", 26, (30, 30, 30)))
+
+    def _draw_enhance(self, img, texts):
+        cv2.rectangle(img, (1300, 100), (1900, 1060), (70, 60, 80), -1)
+        texts.append(((1340, 140), "遗器强化", 36, (235, 235, 235)))
+        for name, label in (("button_auto_add", "自动添加"), ("button_enhance", "强化")):
+            x, y = self.plan.center(name)
+            cv2.rectangle(img, (x - 90, y - 25), (x + 90, y + 25), (200, 200, 200), -1)
+            texts.append(((x - 50, y - 14), label, 26, (30, 30, 30)))
+        if self.materials_added:
+            texts.append(((1340, 560), "已添加强化材料", 28, (180, 230, 180)))
+        if self.state == "enhance_result":
+            cv2.rectangle(img, (660, 400), (1260, 680), (30, 30, 30), -1)
+            texts.append(((820, 510), "强化成功", 48, (120, 220, 255)))
+
+
+def _near(point, target, radius=60):
+    return abs(point[0] - target[0]) <= radius and abs(point[1] - target[1]) <= radius
+
+
+class SimulatorCapture(CaptureBackend):
+    """把模拟器画面作为截图后端"""
+
+    def __init__(self, sim, ring_size=3):
+        super().__init__(ring_size)
+        self.sim = sim
+
+    def screen_size(self):
+        return self.sim.width, self.sim.height
+
+    def _grab_into(self, x, y, out):
+        h, w = out.shape[:2]
+        np.copyto(out, self.sim.render()[y:y + h, x:x + w])
+
+
+class SimulatorInput:
+    """把键鼠操作转发给模拟器，接口与 simulation.PyAutoGuiInput 相同"""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.mouse = (0, 0)
+
+    def key_down(self, key):
+        pass
+
+    def key_up(self, key):
+        self.sim.press(key)
+
+    def click(self, x, y):
+        self.mouse = (x, y)
+        self.sim.click(x, y)
+
+    def move_to(self, x, y):
+        self.mouse = (x, y)
+
+    def scroll(self, amount):
+        self.sim.scroll(amount)
+
+    def activate(self, title):
+        return title in WINDOW_TITLE
+
+    def active_title(self):
+        return WINDOW_TITLE
+
+    def window_rect(self, title):
+        return (0, 0, self.sim.width, self.sim.height) if title in WINDOW_TITLE else None
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sim = GameSimulator.from_files("result.json", "boxes.yaml", count=40)
+    sim.press("b")
+    for _ in range(2):
+        sim.press("e")
+    time.sleep(sim.latency * 2)
+    cv2.imwrite("sim_frame.png", sim.render())
+    log.info("模拟器画面已保存为 sim_frame.png")
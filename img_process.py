@@ -1,51 +1,73 @@
 import cv2
 import numpy as np
+from frame_context import as_context
 
-import cv2
-import numpy as np
+_CLOSE_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
 
-import cv2
-import numpy as np
 
-def find_dark_background_mask_3ch(img, rgb_threshold=55, min_area=0, max_area=1500, min_aspect=1.5):
+def find_dark_background_mask(img, rgb_threshold=55, min_area=0, max_area=None, min_aspect=None,
+                              fill_holes=False, return_boxes=False):
     """
-    提取深色背景的掩码（数字背景），去除图标等零散或不规则区域，返回三通道掩码图。
-    
+    提取深色背景的单通道掩码（0 或 255），可按面积与长宽比过滤连通区域。
+
     参数说明：
+    - img：BGR 图像或 FrameContext
     - rgb_threshold：RGB阈值
-    - min_area：最小有效面积
-    - max_area：最大有效面积
-    - min_aspect：最小长宽比（长边 / 短边）
+    - min_area / max_area：连通区域面积范围（像素数），max_area 为空时不限
+    - min_aspect：最小长宽比（长边 / 短边），为空时不按形状过滤
+    - fill_holes：是否填充保留区域外轮廓内部的空洞（如深色底上的文字）
+    - return_boxes：为真时返回 (掩码, 区域框数组)，框为 [x1, x2, y1, y2]，坐标相对 img
     """
-    # 1. 提取暗色区域：RGB三个通道都小于阈值
-    mask = cv2.inRange(img, np.array([0, 0, 0]), np.array([rgb_threshold]*3))
+    # 1. 提取暗色区域：RGB三个通道都小于阈值（同一帧内复用 FrameContext 中的掩码）
+    mask = as_context(img).dark_mask(rgb_threshold)
 
     # 2. 闭运算：填补小孔
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=1)
-
-    # 3. 找轮廓
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    filtered_mask = np.zeros_like(mask)
-
-    for cnt in contours:
-        # area = cv2.contourArea(cnt)
-        # if area < min_area or area > max_area:
-        #     continue
-
-        x, y, w, h = cv2.boundingRect(cnt)
-        aspect_ratio = max(w / h, h / w)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, _CLOSE_KERNEL, iterations=1)
+
+    # 3. 连通区域统计，按面积与长宽比一次性向量化过滤
+    filtering = min_area > 0 or max_area is not None or min_aspect is not None
+    if filtering or return_boxes:
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        x, y, w, h, area = stats[1:].T
+        keep = np.ones(count - 1, dtype=bool)
+        if min_area > 0:
+            keep &= area >= min_area
+        if max_area is not None:
+            keep &= area <= max_area
+        if min_aspect is not None:
+            # 判断形状是否“细长”，排除接近正方形或扁平图标
+            keep &= np.maximum(w, h) >= min_aspect * np.minimum(w, h)
+        if filtering:
+            lut = np.zeros(count, dtype=np.uint8)
+            lut[1:][keep] = 255
+            mask = lut.take(labels, mode='clip')
+        boxes = np.stack([x, x + w, y, y + h], axis=1)[keep]
+
+    # 4. 填充空洞：保留区域的外轮廓一次性填充绘制（不再逐个轮廓循环）
+    if fill_holes:
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        mask = np.zeros_like(mask)
+        cv2.drawContours(mask, contours, -1, color=255, thickness=-1)
+
+    if return_boxes:
+        return mask, boxes
+    return mask
 
-        # 判断形状是否“细长”，排除接近正方形或扁平图标
-        if aspect_ratio < min_aspect:
-            continue
 
-        # 填充保留的轮廓
-        cv2.drawContours(filtered_mask, [cnt], -1, color=255, thickness=-1)
+def find_dark_background_mask_3ch(img, rgb_threshold=55, min_area=0, max_area=1500, min_aspect=1.5):
+    """
+    提取深色背景的掩码（数字背景），去除图标等零散或不规则区域，返回三通道掩码图。
+    只在需要三通道模型输入时使用，其余场景请用单通道的 find_dark_background_mask。
 
-    # 4. 转为三通道 BGR 格式
-    mask_3ch = cv2.cvtColor(filtered_mask, cv2.COLOR_GRAY2BGR)
-    return mask_3ch
+    参数说明：
+    - img：BGR 图像或 FrameContext
+    - rgb_threshold：RGB阈值
+    - min_area：最小有效面积（未使用，保持原有行为）
+    - max_area：最大有效面积（未使用，保持原有行为）
+    - min_aspect：最小长宽比（长边 / 短边）
+    """
+    mask = find_dark_background_mask(img, rgb_threshold, min_aspect=min_aspect, fill_holes=True)
+    return cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
 
 
 def find_dark_background_mask_3ch_origin(img, rgb_threshold=55):
@@ -56,23 +78,48 @@ def find_dark_background_mask_3ch_origin(img, rgb_threshold=55):
 
     返回三通道掩码图（0或255，3通道BGR格式）。
     """
-    # 生成单通道掩码，只保留所有通道值 <= rgb_threshold 的区域
-    mask = cv2.inRange(img, np.array([0,0,0]), np.array([rgb_threshold]*3))
-
-    # 形态学闭运算，填补小孔，连通区域更完整
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3,3))
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=1)
-
-    # 转成三通道，方便后续与原图合并显示等操作
-    mask_3ch = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
+    mask = find_dark_background_mask(img, rgb_threshold)
+    return cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
 
-    # 绘制图像
-    # img_show = img.copy()
-    # img_show[mask == 0] = (0, 0, 255)  # 将掩码区域设为红色
-    # cv2.waitKey(0)
-    # cv2.destroyAllWindows()
 
-    return mask_3ch
+def preprocess_image(img, mode=1):
+    """
+    对图像进行增强处理，并确保返回的是三通道图像。
+    img 可为 BGR 图像或 FrameContext，多种模式共用同一个上下文时灰度图只转换一次。
+    mode:
+        0 - 原图
+        1 - 灰度 + 二值化 + 转BGR
+        2 - 灰度 + 自适应阈值 + 转BGR
+        3 - 模糊降噪 + 二值化 + 转BGR
+    """
+    ctx = as_context(img)
+    if mode == 0:
+        return ctx.img  # 原图，三通道
+
+    gray = ctx.gray
+
+    if mode == 1:
+        # 简单阈值处理
+        _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+    elif mode == 2:
+        # 自适应阈值（适用于光照不均）
+        binary = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+        )
+    elif mode == 3:
+        # 去噪+二值化
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    else:
+        binary = gray
+
+    # 转回 BGR 三通道，适配 OCR 模型输入
+    binary_bgr = cv2.cvtColor(binary, cv2.COLOR_GRAY2BGR)
+    return binary_bgr
+
+
+# 识别置信度不足时依次尝试的预处理方式
+PREPROCESS_VARIANTS = (1, 2, 3)
 
 
 def draw_boxes(img, boxes):
@@ -0,0 +1,232 @@
+import re
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from calibration import get_calibrator
+from coordinate_manage import BoxManager, LayoutPlan
+from relic_parser import parse
+from simulation import capture_fullscreen, click_at, scroll_at, get_window_rect, RoiChanged
+from utils.log import log
+
+# 网格扫描：按 relic_area 网格逐页点击每个格子读取遗器，每页读完后滚动正好一页。
+# 与按 D 键逐个切换相比，每一步只等待详情面板实际刷新，翻页由网格位置决定，
+# 总耗时只随遗器数量增长。
+#
+# 已扫描到的行用绝对行号记录。每次翻页保留一行重叠，用每页格子的感知哈希比较新旧两页得到实际位移，
+# 滚轮量与行高的对应关系不准时也不会漏读或重读；背包右上角的遗器数量可读时，用它确定末页的位置并核对位移。
+
+WINDOW_TITLE = "崩坏：星穹铁道"
+
+# 变化时说明详情面板已刷新的区域
+PANEL_FIELDS = ["relic_name", "relic_location", "relic_level", "relic_main_name", "relic_main_value",
+                "relic_sub4_name", "relic_sub4_value"]
+
+
+class InventoryGrid:
+    """
+    可见的背包网格：relic_area 按列数、行数均分，格子中心即点击位置。
+    """
+
+    def __init__(self, area: Tuple[int, int, int, int], cols: int = 9, rows: int = 5):
+        """
+        :param area: relic_area 的帧坐标 [x1, x2, y1, y2]
+        :param cols: 每行格子数
+        :param rows: 一页可见的行数
+        """
+        self.area = area
+        self.cols = cols
+        self.rows = rows
+        x1, x2, y1, y2 = area
+        self.pitch_x = (x2 - x1) / cols
+        self.pitch_y = (y2 - y1) / rows
+
+    def center(self, row: int, col: int) -> Tuple[int, int]:
+        """可见区域第 row 行 col 列格子的中心"""
+        return (int(self.area[0] + (col + 0.5) * self.pitch_x),
+                int(self.area[2] + (row + 0.5) * self.pitch_y))
+
+    def cells(self) -> List[Tuple[int, int]]:
+        """按行优先列出一页的所有格子"""
+        return [(row, col) for row in range(self.rows) for col in range(self.cols)]
+
+    def signature(self, frame: np.ndarray, inset: float = 0.2, min_std: float = 8.0):
+        """
+        每个格子中心部分的 dHash 与是否有物品。
+
+        只取格子中心（去掉 inset 比例的边缘），避开选中框与格子间隙。
+
+        :return: (rows x cols 的 uint64 哈希, rows x cols 的 bool 是否有物品)
+        """
+        hashes = np.zeros((self.rows, self.cols), dtype=np.uint64)
+        occupied = np.zeros((self.rows, self.cols), dtype=bool)
+        dx, dy = self.pitch_x * (0.5 - inset), self.pitch_y * (0.5 - inset)
+        for row, col in self.cells():
+            cx, cy = self.center(row, col)
+            patch = frame[int(cy - dy):int(cy + dy), int(cx - dx):int(cx + dx)]
+            if patch.ndim == 3:
+                patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+            small = cv2.resize(patch, (9, 8), interpolation=cv2.INTER_AREA)
+            bits = np.packbits(small[:, 1:] > small[:, :-1])
+            hashes[row, col] = int.from_bytes(bits.tobytes(), "big")
+            occupied[row, col] = patch.std() > min_std
+        return hashes, occupied
+
+
+def _hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """逐元素汉明距离"""
+    x = np.bitwise_xor(a, b)
+    return np.unpackbits(x.view(np.uint8).reshape(*x.shape, 8), axis=-1).sum(axis=-1)
+
+
+def shift_matches(previous: np.ndarray, current: np.ndarray, shift: int, max_distance: int = 10) -> bool:
+    """翻页移动 shift 行时，新页前 rows - shift 行是否与旧页后 rows - shift 行逐格相近"""
+    rows = len(previous)
+    return bool((_hamming(previous[shift:], current[:rows - shift]) <= max_distance).all())
+
+
+def page_shift(previous: np.ndarray, current: np.ndarray, max_distance: int = 10) -> int:
+    """
+    根据格子哈希估计翻页实际移动的行数。
+
+    找满足 current[:rows - s] 与 previous[s:] 逐格相近的最大 s（1 <= s < rows）；
+    都不满足时认为移动了一整页。
+
+    :return: 移动的行数，0 表示画面没有变化
+    """
+    rows = len(previous)
+    if shift_matches(previous, current, 0, max_distance):
+        return 0
+    for shift in range(rows - 1, 0, -1):
+        if shift_matches(previous, current, shift, max_distance):
+            return shift
+    return rows
+
+
+def panel_box(plan: LayoutPlan) -> Tuple[int, int, int, int]:
+    """详情面板中各字段区域的外接框"""
+    boxes = np.array([plan.box(name) for name in PANEL_FIELDS])
+    return int(boxes[:, 0].min()), int(boxes[:, 1].max()), int(boxes[:, 2].min()), int(boxes[:, 3].max())
+
+
+class InventoryScanner:
+    """
+    遗器背包网格扫描器。
+    """
+
+    def __init__(self, manager: BoxManager, ocr_model, cols: int = 9, rows: int = 5, scroll_per_row: int = 120,
+                 overlap: int = 1, min_timeout: float = 0.25, max_timeout: float = 2.0):
+        """
+        :param manager: 已导入布局的 BoxManager
+        :param ocr_model: My_TS
+        :param cols: 每行格子数
+        :param rows: 一页可见的行数
+        :param scroll_per_row: 滚动一行对应的滚轮量
+        :param overlap: 翻页时保留的重叠行数，用于根据格子哈希核对实际位移
+        :param min_timeout: 等待详情面板刷新的最短超时（秒）
+        :param max_timeout: 等待详情面板刷新的最长超时（秒）
+        """
+        self.manager = manager
+        self.ocr_model = ocr_model
+        self.cols = cols
+        self.rows = rows
+        self.scroll_per_row = scroll_per_row
+        self.step = max(1, rows - overlap)  # 每次翻页滚动的行数
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.waits: List[float] = []  # 最近的面板刷新耗时
+        self.pages: List[int] = []    # 每页顶行的绝对行号
+
+    def read_count(self, frame: np.ndarray, plan: LayoutPlan) -> Optional[int]:
+        """识别背包右上角的遗器数量，识别失败返回 None"""
+        text = self.ocr_model.ocr_one_row(frame, plan.box("relic_count"))
+        match = re.search(r"(\d+)\s*/\s*\d+", text)
+        return int(match.group(1)) if match else None
+
+    def _timeout(self) -> float:
+        """按最近的面板刷新耗时自适应：中位数的 3 倍，限制在 [min_timeout, max_timeout]"""
+        if not self.waits:
+            return max(self.min_timeout, self.max_timeout / 4)
+        return float(np.clip(3 * np.median(self.waits[-16:]), self.min_timeout, self.max_timeout))
+
+    def _read_cell(self, x: int, y: int, panel: Tuple[int, int, int, int]):
+        """点击格子，等待详情面板刷新并稳定后解析"""
+        start = time.perf_counter()
+        # 面板不变（该格子已选中，或相邻遗器显示完全相同）时等到超时后照常解析
+        if click_at(x, y, wait_for=RoiChanged(panel, settle=1), timeout=self._timeout()):
+            self.waits.append(time.perf_counter() - start)
+        return parse(self.manager, self.ocr_model, capture_fullscreen())
+
+    def scan(self, limit: Optional[int] = None) -> list:
+        """
+        扫描整个遗器背包（当前需在背包-遗器页）。
+
+        :param limit: 最多读取的遗器数
+        :return: Relic 列表，按背包顺序
+        """
+        calibrator = get_calibrator(self.manager)
+        window = get_window_rect(WINDOW_TITLE)
+        frame = capture_fullscreen()
+        plan = calibrator.ensure(frame, window)
+        grid = InventoryGrid(plan.box("relic_area"), self.cols, self.rows)
+        panel = panel_box(plan)
+        scroll_point = plan.center("relic_scrollbar")
+
+        total = self.read_count(frame, plan)
+        if total is None:
+            log.warning("未识别到遗器数量，用格子哈希判断翻页位移")
+            total_rows = None
+        else:
+            total_rows = (total + self.cols - 1) // self.cols
+            log.info(f"遗器数量 {total}，共 {total_rows} 行")
+        if limit is not None:
+            total = limit if total is None else min(total, limit)
+
+        relics = []
+        top = 0        # 当前页顶行的绝对行号
+        next_row = 0   # 尚未读取的第一行的绝对行号
+        signature, occupied = grid.signature(frame)
+        self.pages = []
+        while True:
+            self.pages.append(top)
+            finished = False
+            for row in range(max(0, next_row - top), self.rows):
+                for col in range(self.cols):
+                    index = (top + row) * self.cols + col
+                    if (total is not None and index >= total) or (total_rows is None and not occupied[row, col]):
+                        finished = True
+                        break
+                    relics.append(self._read_cell(*grid.center(row, col), panel))
+                if finished:
+                    break
+                next_row = top + row + 1
+            if finished or (total_rows is not None and top + self.rows >= total_rows):
+                break
+
+            # 翻一页（保留一行重叠用于核对位移），等待滚动条滑块停止移动；滑块不动说明已到底
+            if not scroll_at(*scroll_point, -self.step * self.scroll_per_row,
+                             wait_for=RoiChanged(plan.box("relic_scroll_track"), settle=1), timeout=self.max_timeout):
+                break
+            frame = capture_fullscreen()
+            previous = signature
+            signature, occupied = grid.signature(frame)
+            shift = page_shift(previous, signature)
+            if total_rows is not None:
+                # 末页被滚动条截住时只移动剩余的行数；相邻行外观相同时哈希可能有多个解，与之相符就按计算值
+                expected = min(self.step, total_rows - self.rows - top)
+                if shift != expected and shift_matches(previous, signature, expected):
+                    shift = expected
+                elif shift != expected:
+                    log.warning(f"翻页位移 {shift} 行与按遗器数量计算的 {expected} 行不符，按格子哈希处理")
+            if shift == 0:
+                log.warning("翻页后画面没有变化，停止扫描")
+                break
+            if shift >= self.rows:
+                # 重叠行对不上时无法知道实际滚过了多少行，继续只会漏读
+                log.warning("翻页后与上一页没有重叠的行，无法确定位移，停止扫描")
+                break
+            top += shift
+        log.info(f"网格扫描完成: {len(relics)} 个遗器, {len(self.pages)} 页")
+        return relics
@@ -0,0 +1,253 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from digit_reader import binarize
+
+# 闭集字段识别：遗器名、部位、主/副词条名都来自 config/relic.yaml 中的有限集合，
+# 把文字区域二值化、按字高归一化为固定大小的向量，与已知标签的样本做最近邻查找，
+# 不需要运行识别网络，也不需要 difflib 纠错。margin 不足、或有字形相近的合法标签还没有样本时回退到识别网络。
+
+# 归一化后的文字行大小：高度固定，宽度足够放下最长的遗器名
+LINE_HEIGHT = 16
+LINE_WIDTH = 224
+
+
+def line_vector(crop: np.ndarray) -> Optional[np.ndarray]:
+    """
+    把单行文字区域转为零均值、单位长度的向量；区域内没有文字时返回 None。
+
+    先裁到文字的外接矩形，再按高度等比缩放后左对齐放入固定画布，字数不同的标签宽度也不同。
+    """
+    binary = binarize(crop)
+    rows = np.flatnonzero(binary.any(axis=1))
+    cols = np.flatnonzero(binary.any(axis=0))
+    if rows.size == 0:
+        return None
+    text = binary[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    width = min(LINE_WIDTH, max(1, round(text.shape[1] * LINE_HEIGHT / text.shape[0])))
+    canvas = np.zeros((LINE_HEIGHT, LINE_WIDTH), dtype=np.float32)
+    canvas[:, :width] = cv2.resize(text, (width, LINE_HEIGHT), interpolation=cv2.INTER_AREA)
+    # 轻微模糊，容忍一两个像素的切分偏差
+    canvas = cv2.GaussianBlur(canvas, (3, 3), 0)
+    v = canvas.reshape(-1)
+    v -= v.mean()
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else None
+
+
+class LabelIndex:
+    """
+    闭集标签索引：每个合法标签保存若干个样本向量，最近邻查找。
+    """
+
+    def __init__(self, candidates: Sequence[str] = (), max_per_label: int = 4, duplicate_score: float = 0.98):
+        """
+        :param candidates: 合法标签集合，不在集合中的标签不会被加入
+        :param max_per_label: 每个标签最多保存的样本数
+        :param duplicate_score: 与已有样本相关度高于该值的新样本视为重复
+        """
+        self.candidates = set(candidates)
+        self.max_per_label = max_per_label
+        self.duplicate_score = duplicate_score
+        self.labels = np.empty(0, dtype=object)
+        self.vectors = np.empty((0, LINE_HEIGHT * LINE_WIDTH), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def known_labels(self) -> List[str]:
+        return sorted(set(self.labels.tolist()))
+
+    def add(self, label: str, crop: np.ndarray) -> bool:
+        """加入一个已知标签的样本，非法标签、重复或已满时返回 False"""
+        if self.candidates and label not in self.candidates:
+            return False
+        v = line_vector(crop)
+        if v is None:
+            return False
+        same = self.labels == label
+        if np.count_nonzero(same) >= self.max_per_label:
+            return False
+        if same.any() and float((self.vectors[same] @ v).max()) >= self.duplicate_score:
+            return False
+        self.labels = np.append(self.labels, np.array([label], dtype=object))
+        self.vectors = np.vstack([self.vectors, v[None]])
+        return True
+
+    def unindexed_lookalikes(self, label: str, min_overlap: float = 0.5) -> List[str]:
+        """
+        还没有样本、且与 label 字形可能相近的合法标签。
+
+        没有样本的标签无法参与相关度比较，用字符重合度（Dice 系数）近似字形相近：
+        如 攻击力 与 攻击力百分比、同一套装中的兄弟遗器名、头部 与 手部。
+        """
+        indexed = set(self.labels.tolist())
+        chars = set(label)
+        return [candidate for candidate in self.candidates
+                if candidate not in indexed and candidate != label
+                and 2 * len(chars & set(candidate)) / (len(chars) + len(set(candidate))) >= min_overlap]
+
+    def query(self, crop: np.ndarray) -> Tuple[str, float, float]:
+        """
+        查找最近的标签。
+
+        :return: (标签, 相关度, margin)；margin 为与最近的其他标签的相关度之差，
+            只有一个已知标签时 margin 等于相关度。区域为空或索引为空时返回 ("", 0.0, 0.0)
+        """
+        v = line_vector(crop)
+        if v is None or len(self.labels) == 0:
+            return "", 0.0, 0.0
+        scores = self.vectors @ v
+        best = int(scores.argmax())
+        label = self.labels[best]
+        others = scores[self.labels != label]
+        second = float(others.max()) if others.size else 0.0
+        return label, float(scores[best]), float(scores[best]) - second
+
+    def save(self, filepath: str):
+        np.savez_compressed(filepath, labels=self.labels.astype(str), vectors=self.vectors,
+                            candidates=np.array(sorted(self.candidates), dtype=str),
+                            max_per_label=self.max_per_label, duplicate_score=self.duplicate_score)
+
+    @classmethod
+    def load(cls, filepath: str) -> 'LabelIndex':
+        data = np.load(filepath)
+        index = cls(data["candidates"].tolist(), int(data["max_per_label"]), float(data["duplicate_score"]))
+        index.labels = data["labels"].astype(object)
+        index.vectors = data["vectors"].astype(np.float32)
+        return index
+
+
+class LabelReader:
+    """
+    闭集字段识别器：先查标签索引，相关度或 margin 不足时回退到识别网络，
+    并把识别网络得到的合法标签加入索引。
+    """
+
+    def __init__(self, index: LabelIndex, ocr_model=None, min_score: float = 0.9, min_margin: float = 0.05,
+                 learn_score: float = 0.9):
+        """
+        :param index: 标签索引
+        :param ocr_model: My_TS 实例，用于回退与学习，为空时只查索引
+        :param min_score: 直接采用索引结果的最低相关度
+        :param min_margin: 直接采用索引结果的最低 margin
+        :param learn_score: 识别网络结果加入索引的最低得分
+        """
+        self.index = index
+        self.ocr_model = ocr_model
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.learn_score = learn_score
+        self.hits = 0
+        self.fallbacks = 0
+
+    def lookup(self, crop: np.ndarray) -> Optional[str]:
+        """
+        只查索引，相关度或 margin 不足时返回 None。
+
+        margin 只比较了已有样本的标签；还有与结果字形相近的合法标签没有样本时，
+        真实标签可能正是它，同样返回 None 交给识别网络。
+        """
+        label, score, margin = self.index.query(crop)
+        if score >= self.min_score and margin >= self.min_margin and not self.index.unindexed_lookalikes(label):
+            self.hits += 1
+            return label
+        return None
+
+    def learn(self, crop: np.ndarray, text: str, score: float):
+        """把识别网络得到的合法标签加入索引"""
+        self.fallbacks += 1
+        # 只有与合法标签完全一致的结果才加入索引，近似结果交给 Relic 的纠错处理
+        if score >= self.learn_score:
+            self.index.add(text, crop)
+
+    def accepts(self, text: str) -> bool:
+        """是否为合法标签"""
+        return not self.index.candidates or text in self.index.candidates
+
+    def read(self, img: np.ndarray, box=None) -> str:
+        """
+        识别闭集字段，接口与 My_TS.ocr_one_row 一致。
+
+        :param img: BGR 图像
+        :param box: [x1, x2, y1, y2]，为空时识别整张图
+        """
+        crop = img if box is None else img[box[2]:box[3], box[0]:box[1]]
+        label = self.lookup(crop)
+        if label is not None:
+            return label
+        if self.ocr_model is None:
+            return self.index.query(crop)[0]
+        text, score = self.ocr_model.ocr_one_row_with_score(crop)
+        self.learn(crop, text, score)
+        return text
+
+
+# 字段种类 -> 对应的识别区域
+LABEL_BOXES: Dict[str, List[str]] = {
+    "name": ["relic_name"],
+    "location": ["relic_location"],
+    "stat": ["relic_main_name"] + [f"relic_sub{i}_name" for i in range(1, 5)],
+}
+_default_readers = {}
+
+
+def index_path(kind: str) -> str:
+    return f"config/label_index_{kind}.npz"
+
+
+def get_label_reader(ocr_model, kind: str, candidates: Sequence[str]) -> LabelReader:
+    """
+    获取与 ocr_model 绑定的默认闭集识别器，索引文件不存在时从空索引开始学习。
+
+    :param kind: name | location | stat
+    :param candidates: 该字段的合法标签集合
+    """
+    key = (id(ocr_model), kind)
+    reader = _default_readers.get(key)
+    if reader is None:
+        try:
+            index = LabelIndex.load(index_path(kind))
+            index.candidates = set(candidates)
+        except FileNotFoundError:
+            index = LabelIndex(candidates)
+        reader = _default_readers[key] = LabelReader(index, ocr_model)
+    return reader
+
+
+if __name__ == "__main__":
+    # 用识别网络在样例截图上建立索引:  python label_index.py test*.png
+    import argparse
+    from coordinate_manage import BoxManager
+    from config import RelicConfig
+    from ocr import My_TS
+
+    parser = argparse.ArgumentParser(description="由样例截图建立闭集标签索引")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--boxes", type=str, default="boxes.yaml")
+    parser.add_argument("--config", type=str, default="config/relic.yaml")
+    parser.add_argument("--min_score", type=float, default=0.9)
+    args = parser.parse_args()
+
+    manager = BoxManager(resolution=(1920, 1080))
+    manager.import_from_yaml(args.boxes)
+    config = RelicConfig.load_from_yaml(args.config)
+    candidates = {
+        "name": sum(config.set_to_names.values(), []),
+        "location": config.valid_locations,
+        "stat": config.valid_items,
+    }
+    ocr_model = My_TS(lang='ch')
+    indexes = {kind: LabelIndex(candidates[kind]) for kind in LABEL_BOXES}
+    for path in args.images:
+        img = cv2.imread(path)
+        for kind, box_names in LABEL_BOXES.items():
+            for name in box_names:
+                x1, x2, y1, y2 = manager.format_box_scaled(name)
+                crop = img[y1:y2, x1:x2]
+                text, score = ocr_model.ts.text_recognizer([crop])[0]
+                if score >= args.min_score:
+                    indexes[kind].add(text.strip(), crop)
+    for kind, index in indexes.items():
+        index.save(index_path(kind))
+        print(f"{kind}: {len(index)} 个样本，{len(index.known_labels())} 个标签，已保存到 {index_path(kind)}")
@@ -1,59 +1,29 @@
-from ocr import *
-from coordinate_manage import *
-from relic import *
-from config import *
-from simulation import *
+import json
 import cv2
-from img_process import *
-import pygetwindow as gw
-import tkinter as tk
-from tkinter import messagebox
+from ocr import My_TS
+from coordinate_manage import BoxManager
+from relic import Relic
+from config import RelicConfig
+from relic_parser import parse
+from calibration import get_calibrator
+from inventory_scanner import InventoryScanner, panel_box
+from simulation import (switch_to_window, is_window_foreground, press_key, click_at, scroll_wheel_down_at,
+                        capture_fullscreen, get_window_rect, RoiChanged)
+from img_process import find_dark_background_mask
+from screen_state import get_screen_states, UNKNOWN, BACKPACK_RELIC, ENHANCE
+from frame_context import FrameContext
+from utils.log import setup_logging
 
 def show_finished_message():
+    # 界面依赖只在弹窗时导入，无界面环境也能导入本模块
+    import tkinter as tk
+    from tkinter import messagebox
+
     root = tk.Tk()
     root.withdraw()  # 隐藏主窗口
     messagebox.showinfo("提示", "已结束操作")
     root.destroy()
 
-def is_window_foreground(title_substring):
-    active_win = gw.getActiveWindow()
-    if active_win is None:
-        return False
-    return title_substring.lower() in active_win.title.lower()
-
-def preprocess_image(img, mode=1):
-    """
-    对图像进行增强处理，并确保返回的是三通道图像。
-    mode:
-        0 - 原图
-        1 - 灰度 + 二值化 + 转BGR
-        2 - 灰度 + 自适应阈值 + 转BGR
-        3 - 模糊降噪 + 二值化 + 转BGR
-    """
-    if mode == 0:
-        return img  # 原图，三通道
-
-    gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
-
-    if mode == 1:
-        # 简单阈值处理
-        _, binary = cv.threshold(gray, 150, 255, cv.THRESH_BINARY)
-    elif mode == 2:
-        # 自适应阈值（适用于光照不均）
-        binary = cv.adaptiveThreshold(
-            gray, 255, cv.ADAPTIVE_THRESH_GAUSSIAN_C, cv.THRESH_BINARY, 11, 2
-        )
-    elif mode == 3:
-        # 去噪+二值化
-        blurred = cv.GaussianBlur(gray, (5, 5), 0)
-        _, binary = cv.threshold(blurred, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
-    else:
-        binary = gray
-
-    # 转回 BGR 三通道，适配 OCR 模型输入
-    binary_bgr = cv.cvtColor(binary, cv.COLOR_GRAY2BGR)
-    return binary_bgr
-
 def ocr_test(manager, img):
    
     # Initialize the OCR model
@@ -72,94 +42,34 @@ def ocr_test(manager, img):
     print("OCR Result:", result)
     
 
-def parse(manager, ocr_model, img):
-
-    # 识别名字
-    box = manager.format_box_scaled("relic_name")
-    name = ocr_model.ocr_one_row(img, box)
-
-    # 识别位置
-    box = manager.format_box_scaled("relic_location")
-    location = ocr_model.ocr_one_row(img, box)
-
-    # 识别等级
-    box = manager.format_box_scaled("relic_level")
-    level = ocr_model.ocr_one_row(img, box)
-
-    # 识别主词条
-    box = manager.format_box_scaled("relic_main_name")
-    main_name = ocr_model.ocr_one_row(img, box)
-
-    # 识别主词条数值
-    box = manager.format_box_scaled("relic_main_value")
-    main_value = ocr_model.ocr_one_row(img, box)
-
-    # 识别副词条1
-    box = manager.format_box_scaled("relic_sub1_name")
-    sub1_name = ocr_model.ocr_one_row(img, box)
-
-    # 识别副词条1数值
-    box = manager.format_box_scaled("relic_sub1_value")
-    sub1_value = ocr_model.ocr_one_row(img, box)
-
-    # 识别副词条2
-    box = manager.format_box_scaled("relic_sub2_name")
-    sub2_name = ocr_model.ocr_one_row(img, box)
-
-    # 识别副词条2数值
-    box = manager.format_box_scaled("relic_sub2_value")
-    sub2_value = ocr_model.ocr_one_row(img, box)
-
-    # 识别副词条3
-    box = manager.format_box_scaled("relic_sub3_name")
-    sub3_name = ocr_model.ocr_one_row(img, box)
-
-    # 识别副词条3数值
-    box = manager.format_box_scaled("relic_sub3_value")
-    sub3_value = ocr_model.ocr_one_row(img, box)
-
-    # 识别副词条4数值
-    box = manager.format_box_scaled("relic_sub4_value")
-    sub4_value = ocr_model.ocr_one_row(img, box)
-    # 如果不存在副词条4数值，则不再识别副词条4
-    if sub4_value == "":
-        sub4_name = ""
-    else:
-        box = manager.format_box_scaled("relic_sub4_name")
-        sub4_name = ocr_model.ocr_one_row(img, box)
-
-    subs = [
-        (sub1_name, sub1_value),
-        (sub2_name, sub2_value),
-        (sub3_name, sub3_value),
-        (sub4_name, sub4_value),
-    ]
-
-    # 过滤掉副词条名或值是空字符串的条目
-    subs = [(n, v) for n, v in subs if n != "" and v != ""]
-
-    # 组合Relic对象
-    relic = Relic(
-        name=name,
-        location=location,
-        level=level,
-        item_detail={
-            "main": {
-                main_name: main_value,
-            },
-            "sub": subs,
-        },
-        from_set="",
-    )
-
-    return relic
+def is_relic_page(img, plan, ocr_model):
+    """
+    判断当前是否在背包-遗器页。
+
+    界面签名匹配遗器页时为真，匹配其他已知界面时为假；签名无法判断（UNKNOWN，
+    例如分辨率、光照或遮挡使签名落在阈值外）时 OCR 识别背包类型。
+    """
+    state, _ = get_screen_states().classify(img)
+    if state == UNKNOWN:
+        return ocr_model.ocr_one_row(img, plan.box("backpack_type")) == "遗器"
+    return state == BACKPACK_RELIC
+
+def is_enhance_page(img, plan, ocr_model):
+    """
+    判断当前是否在遗器强化界面：签名匹配强化界面时为真，匹配其他已知界面时为假；
+    签名无法判断时以已离开背包-遗器页为准。
+    """
+    state, _ = get_screen_states().classify(img)
+    if state == UNKNOWN:
+        return ocr_model.ocr_one_row(img, plan.box("backpack_type")) != "遗器"
+    return state == ENHANCE
 
 def enter_relic(manager, ocr_model):
     # 切换到游戏窗口
     switch_to_window("崩坏：星穹铁道")
 
-    # 进入背包
-    press_key('b', delay=1)
+    # 进入背包，等待界面切换完成
+    press_key('b', wait_for=RoiChanged(settle=2))
 
     # 循环按E,OCR识别backpack_type区域数值和"遗器"相似度高为止,使用截图capture_fullscreen
     while True:
@@ -168,17 +78,17 @@ def enter_relic(manager, ocr_model):
 
         # 截取全屏
         img = capture_fullscreen()
+        box = get_calibrator(manager).ensure(img, get_window_rect("崩坏：星穹铁道")).box("backpack_type")
 
-        # 识别背包类型
-        box = manager.format_box_scaled("backpack_type")
-        backpack_type = ocr_model.ocr_one_row(img, box)
-
-        # 判断是否为遗器
-        if backpack_type == "遗器":
+        # 先用界面签名判断，无法判断时再 OCR 识别背包类型
+        state, _ = get_screen_states().classify(img)
+        if state == BACKPACK_RELIC:
+            break
+        if state == UNKNOWN and ocr_model.ocr_one_row(img, box) == "遗器":
             break
 
-        # 按E键切换到下一个背包类型
-        press_key('e', delay=1)
+        # 按E键切换到下一个背包类型，等待标签文字变化
+        press_key('e', wait_for=RoiChanged(box, settle=1), timeout=2)
 
     # 进入遗器界面
     print("已进入遗器界面")
@@ -194,13 +104,16 @@ def traversal_ralic(manager, ocr_model):
     relics = []
 
     switch_to_window("崩坏：星穹铁道")
+    calibrator = get_calibrator(manager)
+    window = get_window_rect("崩坏：星穹铁道")
     while True:
-        # 截取全屏
+        # 截取全屏，校准结果在复核间隔内直接查表；重新校准后区域随之更新
         img = capture_fullscreen()
+        panel = panel_box(calibrator.ensure(img, window))
 
         # 识别遗器
         relic = parse(manager, ocr_model, img)
-        if last_relic and last_relic.to_dict() == relic.to_dict():
+        if last_relic and last_relic == relic:
             count += 1
             if count >= 3:
                 print("已遍历完所有遗器")
@@ -213,8 +126,22 @@ def traversal_ralic(manager, ocr_model):
         print(relic.to_dict())
         last_relic = relic
 
-        # 按D键切换到下一个遗器
-        press_key('d')
+        # 按D键切换到下一个遗器，等待详情面板刷新；相邻遗器常常同名，等待整个面板而不只是名称
+        # 最后一个遗器时面板不变，短超时即可
+        press_key('d', wait_for=RoiChanged(panel, settle=1), timeout=1)
+
+    # 保存数据到文件，确保中文正常显示
+    with open("result.json", "w", encoding="utf-8") as f:
+        json.dump([relic.to_dict() for relic in relics], f, indent=4, ensure_ascii=False)
+
+def scan_ralic(manager, ocr_model, limit=None):
+    """
+    网格扫描模式：逐页点击背包网格中的每个遗器读取，每页读完滚动一页，结果同 traversal_ralic。
+    """
+    switch_to_window("崩坏：星穹铁道")
+    relics = InventoryScanner(manager, ocr_model).scan(limit)
+    for relic in relics:
+        print(relic.to_dict())
 
     # 保存数据到文件，确保中文正常显示
     with open("result.json", "w", encoding="utf-8") as f:
@@ -268,6 +195,8 @@ def get_last_row_last_column_center(boxes, row_threshold=10):
     return bottom_right[0]  # (cx, cy)
 
 if __name__ == "__main__":
+    setup_logging()
+
     # 初始化 Box 管理器并导入定义好的 boxes.json
     manager = BoxManager(resolution=(1920, 1080))
     manager.import_from_yaml("boxes.yaml")
@@ -296,8 +225,14 @@ if __name__ == "__main__":
 
     img = capture_fullscreen()
 
+    # 按实际窗口画面（去掉黑边）编译布局表并用界面锚点校准，识别区域与点击位置都从这里取
+    calibrator = get_calibrator(manager)
+    window = get_window_rect("崩坏：星穹铁道")
+    plan = calibrator.ensure(img, window)
+    print("布局:", plan)
+
     # 识别背包类型
-    box = manager.format_box_scaled("backpack_type")
+    box = plan.box("backpack_type")
     backpack_type = ocr_model.ocr_one_row(img, box)
 
     while True:
@@ -305,17 +240,18 @@ if __name__ == "__main__":
             break
 
         # 滚动最下
-        scroll_wheel_down_at(1300, 500, duration_sec=0.5, interval=0.1, amount=10000)        
+        scroll_wheel_down_at(*plan.center("relic_scrollbar"), duration_sec=0.5, interval=0.1, amount=10000)        
 
         img = capture_fullscreen()
+        plan = calibrator.ensure(img, window)
 
-        x1, y1, x2, y2 = 127, 200, 1250, 940,
-        # x1, y1, x2, y2 = 130, 310, 245, 335  # 你的ROI框坐标
-        roi = img[y1:y2, x1:x2]  # 裁剪区域，注意先y后x（行列）
+        x1, x2, y1, y2 = plan.box("relic_area")
+        roi = FrameContext(img).roi((x1, x2, y1, y2))  # 裁剪区域的分析上下文
 
-        roi_2 = find_dark_background_mask_3ch_origin(roi)  # 预处理图像
+        mask = find_dark_background_mask(roi)  # 预处理图像（单通道掩码）
 
-        ret = ocr_model.ts.det_text(roi_2)  # 返回格式如你给的
+        # 检测模型需要三通道输入，只在这里转换
+        ret = ocr_model.ts.det_text(cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR))  # 返回格式如你给的
 
         pos = get_last_row_last_column_center(ret)  # 获取最后一行最后一列的中心点
         
@@ -331,7 +267,8 @@ if __name__ == "__main__":
         
         # 点击坐标
         if pos_in_img is not None:
-            click_at(pos_in_img[0], pos_in_img[1], delay=0.5)
+            click_at(pos_in_img[0], pos_in_img[1],
+                     wait_for=RoiChanged(plan.box("relic_name"), settle=1), timeout=1)
 
         # 截图,识别数据
         img = capture_fullscreen()
@@ -339,18 +276,29 @@ if __name__ == "__main__":
         print(relic.to_dict())
 
         if relic.item_number < 5:
-            # 需要升级
-            click_at(1735, 985, delay=1)
+            # 点击前确认仍在遗器界面，避免弹窗或切页后误点
+            if not is_relic_page(img, plan, ocr_model):
+                print("当前不在遗器界面")
+                break
+
+            # 需要升级，每步等待界面变化并稳定后再继续
+            # 强化界面中该位置紧挨着强化按钮，只有确认仍停在遗器页时才重新点击
+            if not click_at(*plan.center("button_upgrade"), wait_for=RoiChanged(settle=2)) \
+                    and is_relic_page(capture_fullscreen(), plan, ocr_model):
+                click_at(*plan.center("button_upgrade"), wait_for=RoiChanged(settle=2))
+            if not is_enhance_page(capture_fullscreen(), plan, ocr_model):
+                print("未进入强化界面")
+                break
 
             # 自动添加
-            click_at(1790, 660, delay=1)
+            click_at(*plan.center("button_auto_add"), wait_for=RoiChanged(settle=1))
 
             # 强化
-            click_at(1680, 990, delay=2)
+            click_at(*plan.center("button_enhance"), wait_for=RoiChanged(settle=3), timeout=5)
 
-            press_key('esc', delay=1)
+            press_key('esc', wait_for=RoiChanged(settle=2))
 
-            press_key('esc', delay=1)
+            press_key('esc', wait_for=RoiChanged(settle=2))
         else:
             # 不需要升级
             print("不需要升级")
@@ -1,18 +1,33 @@
-from utils.onnxocr.onnx_paddleocr import ONNXPaddleOcr
 import numpy as np
 import cv2 as cv
 from utils.log import log
-from functools import cmp_to_key
+from collections import OrderedDict
+from img_process import preprocess_image, PREPROCESS_VARIANTS
+from frame_context import FrameContext, as_context
+from ocr_index import OCRIndex, boxes_from_quads, merge_lines, row_major_order
 import time
 
 # mode: bless1 bless2 strange
 
 class My_TS:
-    def __init__(self,lang='ch',father=None):
+    def __init__(self,lang='ch',father=None,ts=None,cache_size=8):
+        # ts 可传入 ocr_server.OCRClient，复用常驻服务中已预热的模型
         self.lang=lang
-        self.ts = ONNXPaddleOcr(use_angle_cls=False, cpu=False)
+        if ts is None:
+            # 推理依赖（onnxruntime、shapely 等）只在创建本地模型时导入
+            from utils.onnxocr.onnx_paddleocr import ONNXPaddleOcr
+            ts = ONNXPaddleOcr(use_angle_cls=False, cpu=False)
+        self.ts = ts
+        # 模型加载与预热耗时；OCRClient 没有该属性
+        startup = getattr(self.ts, 'startup', None)
+        if startup:
+            log.info("OCR 模型启动耗时: " + ", ".join(f"{k} {v:.0f}ms" for k, v in startup.items()))
+        self.first_result_logged = startup is None
         self.res=[]
-        self.forward_img = None
+        self.index = OCRIndex([])
+        # 最近识别过的帧：帧标识 -> (识别结果, 索引)（LRU）
+        self.forward_cache = OrderedDict()
+        self.cache_size = cache_size
         self.father = father
 
     def ocr_one_row(self, img, box=None):
@@ -23,6 +38,56 @@ class My_TS:
             text = self.ts.text_recognizer([img[y1:y2, x1:x2]])[0][0]
         return text.strip()
 
+    def ocr_one_row_with_score(self, img, box=None):
+        if box is not None:
+            x1, x2, y1, y2 = box
+            img = img[y1:y2, x1:x2]
+        text, score = self.ts.text_recognizer([img])[0]
+        return text.strip(), score
+
+    def ocr_fields(self, img, boxes, validators=None, min_score=0.9, variants=PREPROCESS_VARIANTS):
+        """
+        批量识别多个单行字段，置信度不足的字段用多种预处理方式重新识别。
+
+        第一轮把所有字段放进一次识别调用；得分低于 min_score 或未通过校验的字段，
+        把各预处理结果放进第二次识别调用。干净的画面只需一次调用。
+        每个字段优先取通过校验的结果，其次取得分最高的结果。
+
+        :param img: BGR 图像
+        :param boxes: {字段名: [x1, x2, y1, y2]}
+        :param validators: {字段名: 校验函数 text -> bool}，例如判断是否在合法词表中
+        :param min_score: 不需要重新识别的最低得分
+        :param variants: 重新识别时使用的 preprocess_image 模式
+        :return: {字段名: (文本, 得分)}
+        """
+        if not boxes:
+            return {}
+        validators = validators or {}
+        names = list(boxes)
+        crops = [img[y1:y2, x1:x2] for x1, x2, y1, y2 in boxes.values()]
+        results = {name: (text.strip(), score) for name, (text, score) in zip(names, self.ts.text_recognizer(crops))}
+
+        def accepted(name, text):
+            validator = validators.get(name)
+            return validator is None or validator(text)
+
+        retry = [i for i, name in enumerate(names)
+                 if results[name][1] < min_score or not accepted(name, results[name][0])]
+        if not retry or not variants:
+            return results
+
+        # 同一字段的各预处理方式共用一个上下文，灰度图只转换一次
+        contexts = [FrameContext(crops[i]) for i in retry]
+        variant_crops = [preprocess_image(ctx, mode) for ctx in contexts for mode in variants]
+        variant_results = self.ts.text_recognizer(variant_crops)
+        for k, i in enumerate(retry):
+            name = names[i]
+            candidates = [results[name]] + [(text.strip(), score) for text, score in
+                                            variant_results[k * len(variants):(k + 1) * len(variants)]]
+            # 通过校验的结果优先，其次比较得分
+            results[name] = max(candidates, key=lambda c: (accepted(name, c[0]), c[1]))
+        return results
+
     def ocr_one_row_origin(self, img, box=None):
             if box is None:
                 return self.ts.text_recognizer([img])[0][0]
@@ -49,72 +114,73 @@ class My_TS:
         return diff_count <= 1
     
     def sort_text(self, text):
-        def compare(item1, item2):
-            x1, _, y1, _ = item1['box']
-            x2, _, y2, _ = item2['box']
-            if abs(y1 - y2) <= 7:
-                return x1 - x2
-            return y1 - y2
-        text = sorted(text, key=cmp_to_key(compare))
-        return text
+        # 行优先排序：y1 相差不超过 7 的视为同一行，行内按 x1 排序
+        if len(text) == 0:
+            return list(text)
+        boxes = np.array([item['box'] for item in text])
+        return [text[i] for i in row_major_order(boxes, tol=7)]
 
     def merge(self, text):
         if len(text) == 0:
             return text
         text = self.sort_text(text)
-        res = []
-        merged = text[0]
-        for i in range(1, len(text)):
-            if abs(text[i]['box'][2] - merged['box'][2]) <= 10 and abs(text[i]['box'][3] - merged['box'][3]) <= 10 and abs(text[i]['box'][0] - merged['box'][1]) <= 35:
-                merged['raw_text'] += text[i]['raw_text']
-                merged['box'][1] = text[i]['box'][1]
-            else:
-                res.append(merged)
-                merged = text[i]
-        res.append(merged)
-        return res
+        texts, boxes, scores = merge_lines([item['raw_text'] for item in text],
+                                           np.array([item['box'] for item in text]),
+                                           [item['score'] for item in text])
+        return [{'raw_text': t, 'box': b.tolist(), 'score': float(s)} for t, b, s in zip(texts, boxes, scores)]
     
     def filter_non_white(self, image, mode=0):
+        # image 可为 BGR 图像或 FrameContext，HSV 与掩码在同一帧内只计算一次
+        ctx = as_context(image)
+        image = ctx.img
         if not mode:
             return image
-        hsv_image = cv.cvtColor(image, cv.COLOR_BGR2HSV)
-        lower_white = np.array([0, 0, 160])
-        upper_white = np.array([180, 40, 255])
-        mask = cv.inRange(hsv_image, lower_white, upper_white)
+        mask = ctx.white_mask()
         if mode == 1:
             filtered_image = cv.bitwise_and(image, image, mask=mask)
             return filtered_image
         elif mode == 2:
-            lower_black = np.array([0, 0, 0])
-            upper_black = np.array([180, 40, 50])
-            mask_black = cv.inRange(hsv_image, lower_black, upper_black)
             kernel = np.ones((5, 30), np.uint8)
-            mask_black = cv.dilate(mask_black, kernel, iterations=1)
+            mask_black = cv.dilate(ctx.black_mask(), kernel, iterations=1)
             filtered_image = cv.bitwise_and(image, image, mask=mask & mask_black)
             return filtered_image
 
-    def forward(self, img):
-        if self.forward_img is not None and self.forward_img.shape == img.shape and np.sum(np.abs(self.forward_img-img))<1e-6:
+    def forward(self, img, mode=0):
+        # img 可为 BGR 图像或 FrameContext；按原始图像与过滤模式查找最近识别过的帧，
+        # 命中时直接复用结果，不再过滤与识别
+        ctx = as_context(img)
+        key = (ctx.key, mode)
+        cached = self.forward_cache.get(key)
+        if cached is not None:
+            self.forward_cache.move_to_end(key)
+            self.res, self.index = cached
             return
-        tm = time.time()
-        self.forward_img = img
-        self.res = []
-        ocr_res = self.ts.ocr(img)
-        for res in ocr_res:
-            res = {'raw_text': res[1][0], 'box': np.array(res[0]), 'score': res[1][1]}
-            res['box'] = [int(np.min(res['box'][:,0])),int(np.max(res['box'][:,0])),int(np.min(res['box'][:,1])),int(np.max(res['box'][:,1]))]
-            self.res.append(res)
-        self.res = self.merge(self.res)
-        # time.sleep(max(0,0.5-(time.time()-tm)))
-
-    def find_with_text(self, text=[]):
-        ans = []
-        for txt in text:
-            for res in self.res:
-                if res['raw_text'] in txt or txt in res['raw_text']:
-                    print("识别到文本：",txt,"匹配文本：",self.text)
-                    ans.append({'text':text, **res})
-        return sorted(ans, key=lambda x: x['score'], reverse=True)
+        ocr_res = self.ts.ocr(self.filter_non_white(ctx, mode=mode))
+        # 检测框一次性转为 [x1, x2, y1, y2] 数组，排序与同行合并都在数组上完成
+        boxes = boxes_from_quads([res[0] for res in ocr_res])
+        order = row_major_order(boxes, tol=7)
+        texts, boxes, scores = merge_lines([ocr_res[i][1][0] for i in order], boxes[order],
+                                           [ocr_res[i][1][1] for i in order])
+        self.res = [{'raw_text': t, 'box': b.tolist(), 'score': float(s)} for t, b, s in zip(texts, boxes, scores)]
+        # 同一帧的多次按区域查找共用一个空间索引
+        self.index = OCRIndex(self.res)
+        if not self.first_result_logged:
+            # 还没有真正运行过模型（例如结果来自缓存）时为 None，下次再记录
+            elapsed = self.ts.time_to_first_result()
+            if elapsed is not None:
+                self.first_result_logged = True
+                log.info(f"OCR 首次出结果耗时（自模型创建起）: {elapsed:.0f}ms")
+        self.forward_cache[key] = (self.res, self.index)
+        if len(self.forward_cache) > self.cache_size:
+            self.forward_cache.popitem(last=False)
+
+    def find_with_text(self, text=[], min_similarity=None):
+        # 在本帧的文字索引中查找：识别结果与查询串互相包含即命中，按得分从高到低排列；
+        # min_similarity 不为空时再按字符二元组相似度模糊查找
+        ans = self.index.find_with_text(text, min_similarity=min_similarity)
+        for item in ans:
+            log.debug(f"识别到文本：{item['raw_text']} 匹配文本：{item['text']}")
+        return ans
 
     def box_contain(self, box_out, box_in, redundancy):
         if type(redundancy) in [tuple, list]:
@@ -125,19 +191,21 @@ class My_TS:
 
     def find_with_box(self, box=None, redundancy=10, forward=0, mode=0):
         if forward and box is not None:
-            self.forward(self.filter_non_white(self.father.get_screen()[box[2]:box[3],box[0]:box[1]], mode=mode))
+            # get_screen 可直接返回 FrameContext，同一帧的多次查找共用派生图；
+            # 重复查找内容未变的区域时直接复用上次的检测结果
+            self.forward(as_context(self.father.get_screen()).roi(box), mode=mode)
             if box[3]==540 or box[3] == 350 and self.father.debug:
                 tm = str(int(time.time()*100)%1000000)
                 cv.imwrite('img/'+tm+'.jpg',self.father.screen[box[2]:box[3],box[0]:box[1]])
                 cv.imwrite('img/'+tm+'w.jpg',self.filter_non_white(self.father.screen[box[2]:box[3],box[0]:box[1]], mode=mode))
+        if box is not None and forward == 0:
+            # 在本帧的空间索引中查找，只检查查询区域附近的结果
+            return self.index.find_with_box(box, redundancy=redundancy)
         ans = []
         for res in self.res:
             if box is None:
                 print(res['raw_text'], res['box'])
-            elif forward == 0:
-                if self.box_contain(box, res['box'], redundancy=redundancy):
-                    ans.append(res)
             else:
-                res['box'] = [box[0]+res['box'][0], box[0]+res['box'][1], box[2]+res['box'][2], box[2]+res['box'][3]]
-                ans.append(res)
+                # 换算到整帧坐标时生成新的结果，不修改缓存中的检测结果
+                ans.append({**res, 'box': [box[0]+res['box'][0], box[0]+res['box'][1], box[2]+res['box'][2], box[2]+res['box'][3]]})
         return self.sort_text(ans)
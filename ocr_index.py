@@ -0,0 +1,298 @@
+import numpy as np
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+# OCR 结果索引：把识别结果保存为 NumPy 框数组，行排序、同行合并与按区域查找都用数组运算完成；
+# 文字查找用 Aho-Corasick 自动机做多模式子串匹配，用字符二元组倒排索引做模糊查找。
+#
+# 框格式与 My_TS 一致：[x1, x2, y1, y2]。
+
+
+def boxes_from_quads(quads) -> np.ndarray:
+    """把检测得到的四点框 (n, 4, 2) 转为外接矩形 (n, 4)，格式 [x1, x2, y1, y2]"""
+    quads = np.asarray(quads, dtype=np.float32).reshape(-1, 4, 2)
+    if len(quads) == 0:
+        return np.empty((0, 4), dtype=np.int32)
+    xs, ys = quads[:, :, 0], quads[:, :, 1]
+    return np.stack([xs.min(axis=1), xs.max(axis=1), ys.min(axis=1), ys.max(axis=1)], axis=1).astype(np.int32)
+
+
+def row_major_order(boxes: np.ndarray, tol: int = 7) -> np.ndarray:
+    """
+    按行优先排序，返回下标。
+
+    按 y1 排序后，相邻 y1 之差不超过 tol 的框链式归为同一行，行内按 x1 排序，
+    x1 相同时保持原顺序。与 My_TS.sort_text 原先的两两比较规则在行间距大于 tol 时结果一致。
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    n = len(boxes)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    y1 = boxes[:, 2]
+    by_y = np.argsort(y1, kind="stable")
+    row_of_sorted = np.concatenate(([0], np.cumsum(np.diff(y1[by_y]) > tol)))
+    row = np.empty(n, dtype=np.int64)
+    row[by_y] = row_of_sorted
+    return np.lexsort((np.arange(n), boxes[:, 0], row))
+
+
+def merge_lines(texts: Sequence[str], boxes: np.ndarray, scores: Sequence[float],
+                y_tol: int = 10, x_gap: int = 35):
+    """
+    合并同一行中相邻的文字片段，输入需已按行优先排序。
+
+    片段与前一片段水平间距不超过 x_gap、且上下边与所在组第一个片段相差不超过 y_tol 时并入该组；
+    合并后的框右边界取最后一个片段，得分取第一个片段。
+    水平间距条件先整体向量化计算，只有满足条件的少数片段才逐个检查上下边。
+
+    :return: (texts, boxes, scores)
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    n = len(boxes)
+    if n == 0:
+        return [], boxes, np.asarray(scores, dtype=np.float32)
+    candidate = np.zeros(n, dtype=bool)
+    candidate[1:] = np.abs(boxes[1:, 0] - boxes[:-1, 1]) <= x_gap
+    linked = np.zeros(n, dtype=bool)
+    head = np.arange(n)
+    for i in np.flatnonzero(candidate):
+        h = head[i - 1]
+        if abs(int(boxes[i, 2]) - int(boxes[h, 2])) <= y_tol and abs(int(boxes[i, 3]) - int(boxes[h, 3])) <= y_tol:
+            linked[i] = True
+            head[i] = h
+    starts = np.flatnonzero(~linked)
+    ends = np.append(starts[1:], n)
+    merged_boxes = boxes[starts].copy()
+    merged_boxes[:, 1] = boxes[ends - 1, 1]
+    merged_texts = ["".join(texts[s:e]) for s, e in zip(starts, ends)]
+    return merged_texts, merged_boxes, np.asarray(scores, dtype=np.float32)[starts]
+
+
+class GridIndex:
+    """
+    均匀网格空间索引：按框左上角所在的网格存放，查找被区域包含的框时只检查相关网格中的候选。
+
+    建立 O(n log n)；每次查找为二分定位各网格行的连续区间，再对少量候选做向量化判断。
+    """
+
+    def __init__(self, boxes: np.ndarray, cell_size: int = 64):
+        self.boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        self.cell_size = cell_size
+        if len(self.boxes) == 0:
+            self.cols = 1
+            self.order = np.empty(0, dtype=np.int64)
+            self.cells = np.empty(0, dtype=np.int64)
+            return
+        cx = np.maximum(self.boxes[:, 0], 0) // cell_size
+        cy = np.maximum(self.boxes[:, 2], 0) // cell_size
+        self.cols = int(cx.max()) + 1
+        cell = cy.astype(np.int64) * self.cols + cx
+        self.order = np.argsort(cell, kind="stable")
+        self.cells = cell[self.order]
+
+    def contained(self, box, redundancy=10) -> np.ndarray:
+        """
+        查找被 box 包含的框（允许 redundancy 的误差），规则与 My_TS.box_contain 一致。
+
+        :param box: [x1, x2, y1, y2]
+        :param redundancy: 整数或 (x 误差, y 误差)
+        :return: 命中框的下标（升序）
+        """
+        if len(self.order) == 0:
+            return np.empty(0, dtype=np.int64)
+        rx, ry = redundancy if isinstance(redundancy, (tuple, list)) else (redundancy, redundancy)
+        x1, x2, y1, y2 = box
+        # 被包含的框左上角必在 [x1 - rx, x2 + rx] x [y1 - ry, y2 + ry] 内
+        cx1 = max(0, (x1 - rx) // self.cell_size)
+        cx2 = min(self.cols - 1, (x2 + rx) // self.cell_size)
+        cy1 = max(0, (y1 - ry) // self.cell_size)
+        cy2 = (y2 + ry) // self.cell_size
+        if cx1 > cx2 or cy1 > cy2:
+            return np.empty(0, dtype=np.int64)
+        rows = np.arange(cy1, cy2 + 1, dtype=np.int64) * self.cols
+        lo = np.searchsorted(self.cells, rows + cx1, side="left")
+        hi = np.searchsorted(self.cells, rows + cx2, side="right")
+        candidates = np.concatenate([self.order[a:b] for a, b in zip(lo, hi) if b > a] or [np.empty(0, np.int64)])
+        b = self.boxes[candidates]
+        hit = (x1 <= b[:, 0] + rx) & (x2 >= b[:, 1] - rx) & (y1 <= b[:, 2] + ry) & (y2 >= b[:, 3] - ry)
+        return np.sort(candidates[hit])
+
+
+class AhoCorasick:
+    """
+    多模式子串匹配自动机：一次扫描文本即可找出其中出现的所有模式串。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        :param patterns: 模式串，下标即模式编号；空串不参与匹配
+        """
+        self.patterns = list(patterns)
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+        for pid, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = self.goto[node][ch] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = nxt
+            self.output[node].append(pid)
+        # 广度优先建立失配指针，并把失配节点的输出并入当前节点
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] += self.output[self.fail[nxt]]
+
+    def search(self, text: str) -> Set[int]:
+        """返回在 text 中出现过的模式编号"""
+        found = set()
+        node = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+
+@lru_cache(maxsize=32)
+def query_automaton(queries: Tuple[str, ...]) -> AhoCorasick:
+    """查询串集合的自动机，同一组查询在各帧之间复用"""
+    return AhoCorasick(queries)
+
+
+def ngrams(text: str) -> Set[str]:
+    """字符二元组集合，单个字符的文本取其本身"""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class TextIndex:
+    """
+    一帧识别文字的查找索引：
+    - 查询串的自动机：扫描一次各结果串，找出包含查询串的结果
+    - 结果串的哈希表：枚举查询串的子串，找出被查询串包含的结果（查询串很短）
+    - 二元组倒排索引：按 Dice 系数模糊查找，第一次模糊查找时建立
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        self.texts = list(texts)
+        self.by_text: Dict[str, List[int]] = {}
+        for i, text in enumerate(self.texts):
+            self.by_text.setdefault(text, []).append(i)
+        self.max_len = max(map(len, self.texts), default=0)
+        self._grams = None
+        self._postings = None
+        # 查询串集合 -> 匹配结果，同一帧重复查找时直接返回
+        self._contains: Dict[Tuple[str, ...], List[Tuple[int, int]]] = {}
+
+    def contains(self, queries: Sequence[str]) -> List[Tuple[int, int]]:
+        """
+        子串匹配：结果串包含查询串，或查询串包含结果串。
+
+        :return: [(查询下标, 结果下标), ...]，按查询顺序、结果下标排列
+        """
+        queries = tuple(queries)
+        cached = self._contains.get(queries)
+        if cached is not None:
+            return cached
+        hits: List[Set[int]] = [set() for _ in queries]
+        automaton = query_automaton(queries)
+        for i, text in enumerate(self.texts):
+            for qid in automaton.search(text):
+                hits[qid].add(i)
+        by_text = self.by_text
+        for qid, query in enumerate(queries):
+            if not query:
+                # 空查询串包含于所有结果
+                hits[qid].update(range(len(self.texts)))
+                continue
+            hits[qid].update(by_text.get("", ()))
+            for start in range(len(query)):
+                for end in range(start + 1, min(len(query), start + self.max_len) + 1):
+                    ids = by_text.get(query[start:end])
+                    if ids:
+                        hits[qid].update(ids)
+        pairs = self._contains[queries] = [(qid, i) for qid in range(len(queries)) for i in sorted(hits[qid])]
+        return pairs
+
+    def similar(self, query: str, min_score: float = 0.6) -> List[Tuple[int, float]]:
+        """
+        模糊查找：只检查与查询串有公共二元组的结果，按 Dice 系数从高到低返回 [(结果下标, 系数), ...]
+        """
+        if self._postings is None:
+            self._grams = [ngrams(text) for text in self.texts]
+            self._postings = {}
+            for i, grams in enumerate(self._grams):
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(i)
+        grams = ngrams(query)
+        if not grams:
+            return []
+        shared = Counter(i for gram in grams for i in self._postings.get(gram, ()))
+        scored = [(i, 2 * count / (len(grams) + len(self._grams[i]))) for i, count in shared.items()]
+        return sorted([item for item in scored if item[1] >= min_score], key=lambda item: -item[1])
+
+
+class OCRIndex:
+    """
+    一帧 OCR 结果的索引，forward() 时建立一次，供多次查询使用。
+    """
+
+    def __init__(self, results: List[Dict], cell_size: int = 64):
+        """
+        :param results: My_TS 格式的结果 [{'raw_text', 'box': [x1, x2, y1, y2], 'score'}, ...]
+        """
+        self.results = results
+        self.boxes = np.array([res['box'] for res in results], dtype=np.int32).reshape(-1, 4)
+        self.grid = GridIndex(self.boxes, cell_size)
+        self._text = None
+
+    @property
+    def text(self) -> TextIndex:
+        """文字索引，第一次按文字查找时建立，之后本帧的查找共用"""
+        if self._text is None:
+            self._text = TextIndex([res['raw_text'] for res in self.results])
+        return self._text
+
+    def find_with_box(self, box, redundancy=10) -> List[Dict]:
+        """返回被 box 包含的结果，按行优先排序"""
+        idx = self.grid.contained(box, redundancy)
+        idx = idx[row_major_order(self.boxes[idx])]
+        return [self.results[i] for i in idx]
+
+    def find_with_text(self, queries: Sequence[str], min_similarity: float = None) -> List[Dict]:
+        """
+        按文字查找结果，按得分从高到低排列。
+
+        :param queries: 查询串，结果串与查询串互相包含即命中
+        :param min_similarity: 不为空时，未命中子串匹配但二元组 Dice 系数不低于该值的结果也返回
+        :return: [{'text': 查询串, 'raw_text', 'box', 'score'[, 'similarity']}, ...]
+        """
+        queries = list(queries)
+        hits = self.text.contains(queries)
+        ans = [{'text': queries[qid], **self.results[i]} for qid, i in hits]
+        if min_similarity is not None:
+            matched = set(hits)
+            for qid, query in enumerate(queries):
+                for i, similarity in self.text.similar(query, min_similarity):
+                    if (qid, i) not in matched:
+                        ans.append({'text': query, **self.results[i], 'similarity': similarity})
+        return sorted(ans, key=lambda x: x['score'], reverse=True)
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import http.client
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import shared_memory
+import numpy as np
+from async_ocr import AsyncOCR
+from utils.log import log, setup_logging
+from utils.onnxocr.onnx_paddleocr import ONNXPaddleOcr
+from utils.onnxocr.utils import MODEL_VARIANTS, str2bool
+
+# 本地 OCR 服务：常驻进程持有已预热的模型，各工具通过 HTTP 复用
+#
+# 协议：
+#   POST /rec  请求体为若干张裁剪图的原始字节（uint8，依次拼接），
+#              X-Shapes 头为 JSON 形状列表 [[h, w, c], ...]，返回 [[text, score], ...]
+#   POST /det  请求体为一帧原始字节，X-Shape 头为 [h, w, c]，返回 [[box, null], ...]
+#   POST /ocr  同 /det，返回 [[box, [text, score]], ...]
+#   GET  /health, GET /metrics
+# 若设置 X-Shm 头，则从该名称的共享内存读取图像数据，请求体为空。
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def _read_arrays(buffer, shapes):
+    """按形状列表把连续缓冲区切成多个 uint8 数组（只读视图，不复制）"""
+    arrays = []
+    offset = 0
+    for shape in shapes:
+        size = int(np.prod(shape))
+        arrays.append(np.frombuffer(buffer, dtype=np.uint8, count=size, offset=offset).reshape(shape))
+        offset += size
+    if offset > len(buffer):
+        raise ValueError("数据长度与形状不符")
+    return arrays
+
+
+class OCRService:
+    """
+    OCR 服务核心：在后台事件循环中运行 AsyncOCR，供 HTTP 处理线程调用。
+    """
+
+    def __init__(self, ts=None, max_batch_size=None, max_wait=0.005, max_concurrency=8):
+        """
+        :param ts: ONNXPaddleOcr 实例，为空时由 AsyncOCR 创建
+        :param max_batch_size: 识别微批大小
+        :param max_wait: 凑批最长等待时间（秒）
+        :param max_concurrency: 同时处理的最大请求数，超出时返回 503
+        """
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="ocr-loop", daemon=True)
+        self.thread.start()
+        self.ocr = AsyncOCR(ts=ts, max_batch_size=max_batch_size, max_wait=max_wait)
+        self.limit = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.started = time.time()
+        self.metrics_lock = threading.Lock()
+        self.requests = {}
+        self.rejected = 0
+        self.errors = 0
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def recognize(self, crops):
+        async def run():
+            return await asyncio.gather(*[self.ocr.recognize(crop) for crop in crops])
+        return [[text, float(score)] for text, score in self._call(run())]
+
+    def detect(self, img):
+        return [[box, None] for box, _ in self._call(self.ocr.detect(img))]
+
+    def ocr_frame(self, img):
+        async def run():
+            # 整帧识别直接放到模型执行器里，与微批请求串行使用模型
+            return await asyncio.get_running_loop().run_in_executor(self.ocr.executor, self.ocr.ts.ocr, img)
+        return [[box, [text, float(score)]] for box, (text, score) in self._call(run())]
+
+    def record(self, path, seconds):
+        with self.metrics_lock:
+            count, total = self.requests.get(path, (0, 0.0))
+            self.requests[path] = (count + 1, total + seconds)
+
+    def metrics(self):
+        with self.metrics_lock:
+            requests = {
+                path: {"count": count, "avg_ms": total * 1000 / count}
+                for path, (count, total) in self.requests.items()
+            }
+            return {
+                "uptime": time.time() - self.started,
+                "max_concurrency": self.max_concurrency,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "requests": requests,
+                "rec_batches": self.ocr.rec_batcher.stats(),
+                "det_batches": self.ocr.det_batcher.stats(),
+            }
+
+    def close(self):
+        self._call(self.ocr.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+class OCRRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: OCRService = None
+
+    def log_message(self, format, *args):
+        log.debug("ocr_server: " + format % args)
+
+    def _send_json(self, code, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send_json(200, self.service.metrics())
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def _read_images(self, shapes):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        shm_name = self.headers.get("X-Shm")
+        if not shm_name:
+            return _read_arrays(body, shapes)
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            # 共享内存只在本次请求期间有效，先复制出来以便及时关闭句柄
+            return [array.copy() for array in _read_arrays(shm.buf, shapes)]
+        finally:
+            shm.close()
+
+    def do_POST(self):
+        service = self.service
+        if not service.limit.acquire(blocking=False):
+            with service.metrics_lock:
+                service.rejected += 1
+            # 超出并发上限时仍需读完请求体，保持连接可复用
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._send_json(503, {"error": "busy"})
+            return
+        start = time.perf_counter()
+        try:
+            if self.path == "/rec":
+                crops = self._read_images(json.loads(self.headers["X-Shapes"]))
+                result = service.recognize(crops)
+            elif self.path in ("/det", "/ocr"):
+                (img,) = self._read_images([json.loads(self.headers["X-Shape"])])
+                result = service.detect(img) if self.path == "/det" else service.ocr_frame(img)
+            else:
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+                return
+            service.record(self.path, time.perf_counter() - start)
+            self._send_json(200, result)
+        except asyncio.CancelledError:
+            # 服务关闭时取消了尚未完成的请求
+            self._send_json(503, {"error": "shutting down"})
+        except Exception as e:
+            with service.metrics_lock:
+                service.errors += 1
+            log.error(f"ocr_server 处理 {self.path} 失败: {e}")
+            self._send_json(500, {"error": str(e)})
+        finally:
+            service.limit.release()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, ts=None, max_batch_size=None, max_wait=0.005, max_concurrency=8):
+    """
+    启动 OCR 服务并阻塞运行，直到被中断。
+    """
+    service = OCRService(ts=ts, max_batch_size=max_batch_size, max_wait=max_wait, max_concurrency=max_concurrency)
+    handler = type("Handler", (OCRRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    log.info(f"OCR 服务已启动: http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+class OCRClient:
+    """
+    OCR 服务客户端，提供与 ONNXPaddleOcr 相同的调用接口，
+    可直接作为 My_TS(ts=OCRClient()) 的后端，连接常驻服务而无需加载模型。
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, use_shm=False, timeout=30):
+        """
+        :param host: 服务地址
+        :param port: 服务端口
+        :param use_shm: 是否通过共享内存传输图像（适合整帧传输）
+        :param timeout: 请求超时（秒）
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.use_shm = use_shm
+        self.shm = None
+        # 连接与共享内存都只有一份：写入共享内存到收到响应之间不能被其他线程打断
+        self.lock = threading.RLock()
+        self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, method, path, body=None, headers=None):
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    self.conn.request(method, path, body=body, headers=headers or {})
+                    response = self.conn.getresponse()
+                    data = json.loads(response.read().decode("utf-8"))
+                    break
+                except (http.client.HTTPException, ConnectionError):
+                    # 服务端关闭了长连接时重连一次
+                    self.conn.close()
+                    self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                    if attempt:
+                        raise
+        if response.status != 200:
+            raise RuntimeError(f"OCR 服务返回 {response.status}: {data.get('error')}")
+        return data
+
+    def _pack(self, images):
+        """把图像打包成请求体与请求头，启用共享内存时写入共享内存"""
+        images = [np.ascontiguousarray(img, dtype=np.uint8) for img in images]
+        shapes = [list(img.shape) for img in images]
+        total = sum(img.nbytes for img in images)
+        if not self.use_shm:
+            return b"".join(img.data for img in images), shapes, {}
+        if self.shm is None or self.shm.size < total:
+            self._release_shm()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+        offset = 0
+        for img in images:
+            self.shm.buf[offset:offset + img.nbytes] = img.reshape(-1)
+            offset += img.nbytes
+        return b"", shapes, {"X-Shm": self.shm.name}
+
+    def _post(self, path, images, shape_header):
+        """打包图像并发送请求；打包与请求在同一把锁内，共享内存不会被其他线程的图像覆盖"""
+        with self.lock:
+            body, shapes, headers = self._pack(images)
+            headers[shape_header] = json.dumps(shapes if shape_header == "X-Shapes" else shapes[0])
+            return self._request("POST", path, body, headers)
+
+    def _release_shm(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def metrics(self):
+        return self._request("GET", "/metrics")
+
+    def text_recognizer(self, img_list):
+        if len(img_list) == 0:
+            return []
+        return self._post("/rec", img_list, "X-Shapes")
+
+    def det_text(self, img):
+        return [(box, None) for box, _ in self._post("/det", [img], "X-Shape")]
+
+    def text_detector(self, img):
+        return np.array([box for box, _ in self.det_text(img)], dtype=np.float32)
+
+    def ocr(self, img):
+        return [(box, tuple(res)) for box, res in self._post("/ocr", [img], "X-Shape")]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+            self._release_shm()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 OCR 服务")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max_batch_size", type=int, default=None)
+    parser.add_argument("--max_wait", type=float, default=0.005)
+    parser.add_argument("--max_concurrency", type=int, default=8)
+    # 量化模型由 utils/onnxocr/quantize.py 生成，切换前先用 benchmark/bench_quantized.py 对比准确率
+    parser.add_argument("--det_model_variant", type=str, default="fp32", choices=MODEL_VARIANTS)
+    parser.add_argument("--rec_model_variant", type=str, default="fp32", choices=MODEL_VARIANTS)
+    parser.add_argument("--warmup", type=str2bool, default=True)
+    args = parser.parse_args()
+    setup_logging()
+    # 常驻服务启动时预热，客户端的第一次请求不再承担模型的延迟初始化
+    ts = ONNXPaddleOcr(use_angle_cls=False, cpu=False, det_model_variant=args.det_model_variant,
+                       rec_model_variant=args.rec_model_variant, warmup=args.warmup)
+    log.info("OCR 模型启动耗时: " + ", ".join(f"{k} {v:.0f}ms" for k, v in ts.startup.items()))
+    serve(args.host, args.port, ts=ts, max_batch_size=args.max_batch_size, max_wait=args.max_wait,
+          max_concurrency=args.max_concurrency)
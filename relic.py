@@ -1,7 +1,40 @@
 import difflib
-from typing import Dict, List, Tuple, Union, Any
+from typing import Dict, List, NamedTuple, Tuple, Union, Any
 import re
 
+# 数值部分，例如 "+15" -> "15"，"38.8%" -> "38.8"
+_NUMBER_PATTERN = re.compile(r'[\d.]+')
+
+
+class StatValue(NamedTuple):
+    """
+    解析后的词条数值。
+
+    value 为数值，is_percent 表示是否为百分比，text 为去掉符号后的数值文本（导出时使用）。
+    """
+    value: float
+    is_percent: bool
+    text: str
+
+    @classmethod
+    def parse(cls, raw) -> 'StatValue':
+        """
+        把 OCR 得到的数值文本解析为 StatValue，只在识别时解析一次。
+        例如："38.8%" -> StatValue(38.8, True, "38.8")，"+15" -> StatValue(15.0, False, "15")
+        """
+        if isinstance(raw, StatValue):
+            return raw
+        if not isinstance(raw, str):
+            return cls(float(raw), False, str(raw))
+        match = _NUMBER_PATTERN.search(raw)
+        text = match.group(0) if match else ""
+        try:
+            value = float(text)
+        except ValueError:
+            # 识别出 "" 或 "1.2.3" 等无法转换的文本时，数值记为 0，保留原始数值文本
+            value = 0.0
+        return cls(value, "%" in raw, text)
+
 class ValidationError(Exception):
     """自定义异常：用于无效字段值的报错"""
     def __init__(self, field: str, value: str, candidates: List[str]):
@@ -66,10 +99,11 @@ class Relic:
 
         # 继续验证其他字段
         self.location = self._validate("location", location, self.valid_locations)
-        self.level = level
+        self.level = StatValue.parse(level)
 
         # 主词条
         main_name, main_value = self._parse_single_kv(item_detail.get("main", {}))
+        main_value = StatValue.parse(main_value)
         normalized_main = self._normalize_stat_name_by_value(main_name, main_value)
         self.main_stat = {
             "name": self._validate("item_detail.main.name", normalized_main, self.valid_items),
@@ -85,6 +119,7 @@ class Relic:
             counts = defaultdict(int)
 
             for sub_name, sub_val in sub_input:
+                sub_val = StatValue.parse(sub_val)
                 normalized_sub = self._normalize_stat_name_by_value(sub_name, sub_val)
                 valid_name = self._validate("item_detail.sub.name", normalized_sub, self.valid_items)
 
@@ -95,6 +130,7 @@ class Relic:
 
         elif isinstance(sub_input, dict):
             for sub_name, sub_val in sub_input.items():
+                sub_val = StatValue.parse(sub_val)
                 normalized_sub = self._normalize_stat_name_by_value(sub_name, sub_val)
                 valid_name = self._validate("item_detail.sub.name", normalized_sub, self.valid_items)
                 sub_stats[valid_name] = sub_val
@@ -105,6 +141,10 @@ class Relic:
         self.sub_stats = sub_stats   
 
         self.item_number = 1 + len(self.sub_stats)  # 主词条 1 个 + 副词条数量
+
+        # 比较与导出的缓存，遗器创建后字段不再修改
+        self._key = None
+        self._dict = None
    
         
     def _validate(self, field: str, value: str, valid_list: List[str]) -> str:
@@ -149,13 +189,13 @@ class Relic:
             raise ValueError("主词条 item_detail.main 必须包含一个且仅一个属性")
         return next(iter(d.items()))
 
-    def _normalize_stat_name_by_value(self, name: str, value) -> str:
+    def _normalize_stat_name_by_value(self, name: str, value: StatValue) -> str:
         """
-        根据值是否含 '%' 判断是否为百分比词条。
-        - 若值是字符串且包含 %，则尝试匹配 name + '%'
+        根据值是否为百分比判断是否为百分比词条。
+        - 若值为百分比，则尝试匹配 name + '百分比'
         - 否则尝试直接使用原始名称 name
         """
-        if isinstance(value, str) and "%" in value:
+        if value.is_percent:
             percent_name = f"{name}百分比"
             if percent_name in self.valid_items:
                 return percent_name
@@ -166,13 +206,8 @@ class Relic:
         去除字符串中的百分号、加号、减号等特殊符号，保留数值部分。
         例如："-12.5%" -> "12.5"
         """
-        if isinstance(value, str):
-            # 提取数字和小数点部分
-            match = re.search(r'[\d.]+', value)
-            if match:
-                return match.group(0)
-            else:
-                return ""  # 如果没有数字，返回空字符串
+        if isinstance(value, (str, StatValue)):
+            return StatValue.parse(value).text
         return value
 
     def _clean_value_origin(self, value: str) -> str:
@@ -185,29 +220,53 @@ class Relic:
         return value
 
     def to_dict(self) -> Dict:
-        """导出为字典结构，移除百分号"""
-        return {
-            "name": self.name,
-            "location": self.location,
-            "level": self._clean_value(self.level),
-            "item_number": self.item_number,
-            "item_detail": {
-                "main": {
-                    self.main_stat["name"]: self._clean_value(self.main_stat["value"])
+        """导出为字典结构，移除百分号。结果会被缓存，调用方不应修改返回的字典"""
+        if self._dict is None:
+            self._dict = {
+                "name": self.name,
+                "location": self.location,
+                "level": self.level.text,
+                "item_number": self.item_number,
+                "item_detail": {
+                    "main": {
+                        self.main_stat["name"]: self.main_stat["value"].text
+                    },
+                    "sub": {
+                        name: val.text for name, val in self.sub_stats.items()
+                    }
                 },
-                "sub": {
-                    name: self._clean_value(val) for name, val in self.sub_stats.items()
-                }
-            },
-            "from_set": self.from_set
-        }
+                "from_set": self.from_set
+            }
+        return self._dict
+
+    def key(self) -> Tuple:
+        """用于比较与哈希的类型化字段（数值与是否百分比，不比较文本）"""
+        if self._key is None:
+            self._key = (
+                self.name,
+                self.location,
+                self.level[:2],
+                self.main_stat["name"],
+                self.main_stat["value"][:2],
+                tuple((name, val[:2]) for name, val in self.sub_stats.items()),
+                self.from_set,
+            )
+        return self._key
+
+    def __eq__(self, other):
+        if not isinstance(other, Relic):
+            return NotImplemented
+        return self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
 
     def __repr__(self):
-        return f"<Relic {self.name} ({self.location}) Lv.{self.level} #{self.item_number}>"
+        return f"<Relic {self.name} ({self.location}) Lv.{self.level.text} #{self.item_number}>"
 
 # 示例使用
 if __name__ == "__main__":
-    from config import *
+    from config import RelicConfig
 
     config = RelicConfig.load_from_yaml("config/relic.yaml")
     Relic.valid_locations = config.valid_locations
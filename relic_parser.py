@@ -0,0 +1,82 @@
+from relic import Relic
+from digit_reader import get_digit_reader
+from label_index import get_label_reader
+
+# 遗器详情面板解析：从一帧截图读出遗器的各个字段并组合成 Relic。
+# 只依赖识别模型与布局，不涉及窗口、键鼠与界面弹窗，可在无界面环境中使用。
+
+
+def parse(manager, ocr_model, img):
+    # 等级与数值字段优先用字形模板匹配，名字、部位与词条名优先查闭集标签索引；
+    # 剩下的字段放进一次识别调用，置信度不足的再用多种预处理方式批量重新识别
+    digits = get_digit_reader(ocr_model)
+    stats = get_label_reader(ocr_model, "stat", Relic.valid_items)
+    readers = {
+        "relic_name": get_label_reader(ocr_model, "name", sum(Relic.valid_names_by_set.values(), [])),
+        "relic_location": get_label_reader(ocr_model, "location", Relic.valid_locations),
+        "relic_level": digits,
+        "relic_main_name": stats,
+        "relic_main_value": digits,
+    }
+    for i in range(1, 5):
+        readers[f"relic_sub{i}_name"] = stats
+        readers[f"relic_sub{i}_value"] = digits
+
+    # 按截图实际大小（去掉黑边）取布局表，同一画面区域只编译一次
+    plan = manager.plan_for_frame(img)
+    boxes = {field: plan.box(field) for field in readers}
+    fields = {}
+    pending = {}
+    for field, (x1, x2, y1, y2) in boxes.items():
+        text = readers[field].lookup(img[y1:y2, x1:x2])
+        if text is None:
+            pending[field] = boxes[field]
+        else:
+            fields[field] = text
+
+    # 如果不存在副词条4数值，则不再识别副词条4
+    if fields.get("relic_sub4_value") == "":
+        pending.pop("relic_sub4_name", None)
+        fields["relic_sub4_name"] = ""
+
+    validators = {field: readers[field].accepts for field in pending}
+    for field, (text, score) in ocr_model.ocr_fields(img, pending, validators).items():
+        x1, x2, y1, y2 = boxes[field]
+        readers[field].learn(img[y1:y2, x1:x2], text, score)
+        fields[field] = text
+
+    name = fields["relic_name"]
+    location = fields["relic_location"]
+    level = fields["relic_level"]
+    main_name = fields["relic_main_name"]
+    main_value = fields["relic_main_value"]
+    sub1_name, sub1_value = fields["relic_sub1_name"], fields["relic_sub1_value"]
+    sub2_name, sub2_value = fields["relic_sub2_name"], fields["relic_sub2_value"]
+    sub3_name, sub3_value = fields["relic_sub3_name"], fields["relic_sub3_value"]
+    sub4_name, sub4_value = fields["relic_sub4_name"], fields["relic_sub4_value"]
+
+    subs = [
+        (sub1_name, sub1_value),
+        (sub2_name, sub2_value),
+        (sub3_name, sub3_value),
+        (sub4_name, sub4_value),
+    ]
+
+    # 过滤掉副词条名或值是空字符串的条目
+    subs = [(n, v) for n, v in subs if n != "" and v != ""]
+
+    # 组合Relic对象
+    relic = Relic(
+        name=name,
+        location=location,
+        level=level,
+        item_detail={
+            "main": {
+                main_name: main_value,
+            },
+            "sub": subs,
+        },
+        from_set="",
+    )
+
+    return relic
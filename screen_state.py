@@ -0,0 +1,172 @@
+import argparse
+import cv2
+import numpy as np
+from typing import Dict, List, Tuple
+
+# 界面状态识别：用小区域的感知哈希（dHash）与平均亮度作为已知界面的签名，
+# 比较这些签名即可判断当前界面，不需要 OCR。
+
+UNKNOWN = "unknown"
+
+# 已知界面状态
+BACKPACK_RELIC = "backpack_relic"  # 背包-遗器页（含遗器详情面板）
+BACKPACK_OTHER = "backpack_other"  # 背包-其他标签页
+ENHANCE = "enhance"                # 遗器强化界面
+CONFIRM = "confirm"                # 确认弹窗
+
+
+class ScreenStateClassifier:
+    """
+    界面状态分类器。
+
+    每个状态保存若干样本，每个样本由若干区域的 dHash 与平均亮度组成，
+    区域坐标使用参考分辨率下的 [x1, x2, y1, y2]。
+    """
+
+    def __init__(self, reference_resolution: Tuple[int, int] = (1920, 1080), max_distance: int = 10,
+                 max_mean_diff: float = 25.0):
+        """
+        :param reference_resolution: 区域坐标对应的分辨率，其他分辨率的帧按比例换算
+        :param max_distance: 单个区域允许的最大哈希汉明距离（0~64）
+        :param max_mean_diff: 单个区域允许的最大平均亮度差
+        """
+        self.reference_resolution = tuple(reference_resolution)
+        self.max_distance = max_distance
+        self.max_mean_diff = max_mean_diff
+        # state -> [{"regions": [...], "hashes": [...], "means": [...]}]
+        self.signatures: Dict[str, List[Dict]] = {}
+
+    def _signature(self, frame, region):
+        """
+        返回区域的 (dHash, 平均亮度)。
+
+        只把区域本身缩小到 9x8，不处理整帧，因此单次识别远低于 1 毫秒。
+        """
+        h, w = frame.shape[:2]
+        sx, sy = w / self.reference_resolution[0], h / self.reference_resolution[1]
+        x1, x2, y1, y2 = region
+        patch = frame[int(y1 * sy):int(y2 * sy), int(x1 * sx):int(x2 * sx)]
+        small = cv2.resize(patch, (9, 8), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        bits = np.packbits(small[:, 1:] > small[:, :-1])
+        return int.from_bytes(bits.tobytes(), "big"), float(small.mean())
+
+    def learn(self, state: str, frame: np.ndarray, regions: List[Tuple[int, int, int, int]]):
+        """
+        从一帧已知状态的画面学习签名。
+
+        :param state: 状态名
+        :param frame: BGR 帧
+        :param regions: 能稳定区分该状态的界面区域（参考分辨率坐标），应避开随数据变化的内容
+        """
+        hashes, means = zip(*(self._signature(frame, region) for region in regions))
+        self.signatures.setdefault(state, []).append({
+            "regions": [list(map(int, region)) for region in regions],
+            "hashes": list(hashes),
+            "means": [round(mean, 1) for mean in means],
+        })
+
+    def knows(self, state: str) -> bool:
+        return state in self.signatures
+
+    def _distance(self, frame, sample):
+        """样本与当前画面的距离：各区域汉明距离的最大值；亮度差超限时视为不匹配"""
+        worst = 0
+        for region, ref_hash, ref_mean in zip(sample["regions"], sample["hashes"], sample["means"]):
+            h, mean = self._signature(frame, region)
+            if abs(mean - ref_mean) > self.max_mean_diff:
+                return 65
+            worst = max(worst, (h ^ ref_hash).bit_count())
+        return worst
+
+    def classify(self, frame: np.ndarray) -> Tuple[str, int]:
+        """
+        识别当前界面状态。
+
+        :param frame: BGR 帧
+        :return: (状态名, 距离)，没有匹配时状态为 UNKNOWN
+        """
+        best_state, best_distance = UNKNOWN, 65
+        for state, samples in self.signatures.items():
+            for sample in samples:
+                distance = self._distance(frame, sample)
+                if distance < best_distance:
+                    best_state, best_distance = state, distance
+        if best_distance > self.max_distance:
+            return UNKNOWN, best_distance
+        return best_state, best_distance
+
+    def is_state(self, frame: np.ndarray, state: str) -> bool:
+        """判断当前是否为指定状态（只比较该状态的样本）"""
+        return any(self._distance(frame, sample) <= self.max_distance for sample in self.signatures.get(state, []))
+
+    def export_to_yaml(self, filepath: str):
+        data = {
+            "reference_resolution": list(self.reference_resolution),
+            "max_distance": self.max_distance,
+            "max_mean_diff": self.max_mean_diff,
+            "states": self.signatures,
+        }
+        import yaml
+        with open(filepath, 'w', encoding='utf-8') as f:
+            yaml.dump(data, f, allow_unicode=True)
+
+    @classmethod
+    def load_from_yaml(cls, filepath: str) -> 'ScreenStateClassifier':
+        import yaml
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f)
+        classifier = cls(
+            reference_resolution=tuple(data["reference_resolution"]),
+            max_distance=data["max_distance"],
+            max_mean_diff=data["max_mean_diff"],
+        )
+        classifier.signatures = data.get("states", {})
+        return classifier
+
+
+DEFAULT_PATH = "config/screen_states.yaml"
+_default_classifier = None
+
+
+def get_screen_states(path: str = DEFAULT_PATH) -> ScreenStateClassifier:
+    """获取默认的界面状态分类器，签名文件不存在时返回空分类器（所有界面均为 UNKNOWN）"""
+    global _default_classifier
+    if _default_classifier is None:
+        try:
+            _default_classifier = ScreenStateClassifier.load_from_yaml(path)
+        except FileNotFoundError:
+            _default_classifier = ScreenStateClassifier()
+    return _default_classifier
+
+
+def _parse_region(text):
+    return tuple(int(v) for v in text.split(","))
+
+
+if __name__ == "__main__":
+    # 学习:  python screen_state.py learn backpack_relic test.png --region 100,210,65,95
+    # 识别:  python screen_state.py classify test2.png
+    parser = argparse.ArgumentParser(description="界面状态签名工具")
+    parser.add_argument("command", choices=["learn", "classify"])
+    parser.add_argument("args", nargs="+", help="learn: 状态名 图片...; classify: 图片...")
+    parser.add_argument("--region", action="append", type=_parse_region, default=[],
+                        help="x1,x2,y1,y2（1920x1080 坐标），可重复")
+    parser.add_argument("--file", type=str, default=DEFAULT_PATH)
+    options = parser.parse_args()
+
+    try:
+        classifier = ScreenStateClassifier.load_from_yaml(options.file)
+    except FileNotFoundError:
+        classifier = ScreenStateClassifier()
+
+    if options.command == "learn":
+        state, paths = options.args[0], options.args[1:]
+        for path in paths:
+            classifier.learn(state, cv2.imread(path), options.region)
+        classifier.export_to_yaml(options.file)
+        print(f"已为 {state} 学习 {len(paths)} 个样本，保存到 {options.file}")
+    else:
+        for path in options.args:
+            print(path, classifier.classify(cv2.imread(path)))
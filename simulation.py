@@ -1,49 +1,329 @@
-import pyautogui
-import pygetwindow as gw
 import time
 import numpy as np
+import cv2
+from utils.capture import create_backend
+from utils.log import log, setup_logging
+
+# 当前截图后端，首次截图时按平台自动创建
+_capture_backend = None
+
+def set_capture_backend(backend):
+    """替换截图后端，例如 FileBackend 或 X11Backend"""
+    global _capture_backend
+    _capture_backend = backend
+
+def get_capture_backend():
+    global _capture_backend
+    if _capture_backend is None:
+        _capture_backend = create_backend()
+    return _capture_backend
+
+class PyAutoGuiInput:
+    """
+    默认输入后端：通过 pyautogui 发送键鼠事件，通过 pygetwindow 管理窗口。
+    其他输入后端（如 game_sim.SimulatorInput）实现相同的方法即可替换。
+    """
+
+    def __init__(self):
+        import pyautogui
+        import pygetwindow
+        self.pyautogui = pyautogui
+        self.gw = pygetwindow
+
+    def key_down(self, key):
+        self.pyautogui.keyDown(key)
+
+    def key_up(self, key):
+        self.pyautogui.keyUp(key)
+
+    def click(self, x, y):
+        self.pyautogui.click(x, y)
+
+    def move_to(self, x, y):
+        self.pyautogui.moveTo(x, y)
+
+    def scroll(self, amount):
+        self.pyautogui.scroll(amount)
+
+    def activate(self, title):
+        windows = self.gw.getWindowsWithTitle(title)
+        if not windows:
+            return False
+        windows[0].activate()
+        return True
+
+    def active_title(self):
+        active_win = self.gw.getActiveWindow()
+        return None if active_win is None else active_win.title
+
+    def window_rect(self, title):
+        windows = self.gw.getWindowsWithTitle(title)
+        if not windows:
+            return None
+        win = windows[0]
+        return win.left, win.top, win.width, win.height
+
+# 当前输入后端，首次使用时创建
+_input_backend = None
+
+def set_input_backend(backend):
+    """替换输入后端，例如无界面模拟器"""
+    global _input_backend
+    _input_backend = backend
+
+def get_input_backend():
+    global _input_backend
+    if _input_backend is None:
+        _input_backend = PyAutoGuiInput()
+    return _input_backend
 
 def switch_to_window(title):
-    windows = gw.getWindowsWithTitle(title)
-    if not windows:
+    if not get_input_backend().activate(title):
         print(f"没找到标题包含 '{title}' 的窗口")
         return False
-    win = windows[0]
-    win.activate()
     time.sleep(0.5)  # 等待窗口激活
     return True
 
+def is_window_foreground(title_substring):
+    active_title = get_input_backend().active_title()
+    if active_title is None:
+        return False
+    return title_substring.lower() in active_title.lower()
+
+def get_window_rect(title):
+    """
+    返回窗口位置与大小 (left, top, width, height)，找不到窗口或后端不支持时返回 None。
+    """
+    window_rect = getattr(get_input_backend(), "window_rect", None)
+    return None if window_rect is None else window_rect(title)
+
 def scroll_wheel_down_at(x, y, duration_sec, interval=0.1, amount=10):
     """
     鼠标移动到 (x, y)，然后持续滚轮向下滚动 duration_sec 秒
     interval 是每次滚动间隔，amount 是滚动的“格数”
     """
-    pyautogui.moveTo(x, y)
+    backend = get_input_backend()
+    backend.move_to(x, y)
     start_time = time.time()
     while time.time() - start_time < duration_sec:
-        pyautogui.scroll(-amount)  # 负数向下滚动
+        backend.scroll(-amount)  # 负数向下滚动
         time.sleep(interval)
         
-def press_key(key, delay=0.1):
-    pyautogui.keyDown(key)
-    time.sleep(delay)
-    pyautogui.keyUp(key)
-    time.sleep(0.2)  # 按键间隔
+def scroll_at(x, y, amount, wait_for=None, timeout=3.0):
+    """
+    鼠标移动到 (x, y) 后发送一次滚轮事件。
+
+    :param amount: 滚动量，负数向下（Windows 每格为 120）
+    :param wait_for: 等待条件（见 wait_until），指定后滚动后等待界面响应
+    :param timeout: 等待超时（秒）
+    :return: 条件是否满足（未指定 wait_for 时总为 True）
+    """
+    def action():
+        backend = get_input_backend()
+        backend.move_to(x, y)
+        backend.scroll(amount)
 
-def click_at(x, y, delay=0.1):
-    pyautogui.click(x, y)
-    time.sleep(delay)
+    if wait_for is None:
+        action()
+        return True
+    return act_and_wait(action, wait_for, timeout=timeout, desc=f"滚动 {amount}")
+
+def press_key(key, delay=0.1, wait_for=None, timeout=3.0, retries=0):
+    """
+    按下并松开按键。
+
+    :param delay: 按住时长；未指定 wait_for 时松开后再固定等待 0.2 秒
+    :param wait_for: 等待条件（见 wait_until），指定后按键后等待界面响应而不是固定等待
+    :param timeout: 每次等待的超时（秒）
+    :param retries: 超时后重新按键的次数
+    :return: 条件是否满足（未指定 wait_for 时总为 True）
+    """
+    def action():
+        backend = get_input_backend()
+        backend.key_down(key)
+        time.sleep(delay)
+        backend.key_up(key)
+
+    if wait_for is None:
+        action()
+        time.sleep(0.2)  # 按键间隔
+        return True
+    return act_and_wait(action, wait_for, timeout=timeout, retries=retries, desc=f"按键 {key}")
+
+def click_at(x, y, delay=0.1, wait_for=None, timeout=3.0, retries=0):
+    """
+    点击指定坐标。
+
+    :param delay: 未指定 wait_for 时点击后的固定等待时间
+    :param wait_for: 等待条件（见 wait_until），指定后点击后等待界面响应
+    :param timeout: 每次等待的超时（秒）
+    :param retries: 超时后重新点击的次数
+    :return: 条件是否满足（未指定 wait_for 时总为 True）
+    """
+    if wait_for is None:
+        get_input_backend().click(x, y)
+        time.sleep(delay)
+        return True
+    return act_and_wait(lambda: get_input_backend().click(x, y), wait_for, timeout=timeout, retries=retries,
+                        desc=f"点击 ({x}, {y})")
+
+def wait_until(predicate, timeout=3.0, poll=0.05, desc=None):
+    """
+    轮询等待条件满足。
+
+    :param predicate: 无参可调用对象，返回 True 表示条件满足
+    :param timeout: 超时时间（秒）
+    :param poll: 轮询间隔（秒）
+    :param desc: 日志中的描述
+    :return: 条件是否在超时前满足
+    """
+    start = time.perf_counter()
+    while True:
+        if predicate():
+            log.debug(f"{desc or predicate} 等待 {time.perf_counter() - start:.2f}s")
+            return True
+        if time.perf_counter() - start >= timeout:
+            log.warning(f"{desc or predicate} 等待超时 ({timeout}s)")
+            return False
+        time.sleep(poll)
+
+def act_and_wait(action, predicate, timeout=3.0, poll=0.05, retries=0, desc=None):
+    """
+    执行操作并等待其效果出现，超时后按 retries 重试。
+
+    谓词若有 arm() 方法，会在每次操作前调用以记录操作前的画面。
+    """
+    for attempt in range(retries + 1):
+        arm = getattr(predicate, "arm", None)
+        if arm is not None:
+            arm()
+        action()
+        if wait_until(predicate, timeout=timeout, poll=poll, desc=desc):
+            return True
+        if attempt < retries:
+            log.warning(f"{desc or action} 未生效，第 {attempt + 1} 次重试")
+    return False
+
+def _grab_gray(box, scale):
+    img = capture_fullscreen() if box is None else capture_region(box)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if scale != 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray
+
+class RoiChanged:
+    """
+    区域画面变化条件：与 arm() 时的画面相比，变化像素比例超过阈值。
+    settle > 0 时还要求变化后画面连续 settle 次轮询保持不变，即界面动画结束。
+    """
+
+    def __init__(self, box=None, ratio=0.002, pixel_threshold=25, settle=0, scale=None):
+        """
+        :param box: [x1, x2, y1, y2]，为空时检查全屏
+        :param ratio: 判定为变化的像素比例
+        :param pixel_threshold: 灰度差超过该值的像素视为变化
+        :param settle: 变化后要求画面稳定的轮询次数
+        :param scale: 比较前的缩放比例，默认全屏 0.25、区域 1.0
+        """
+        self.box = box
+        self.ratio = ratio
+        self.pixel_threshold = pixel_threshold
+        self.settle = settle
+        self.scale = scale if scale is not None else (0.25 if box is None else 1.0)
+        self.reference = None
+        self.last = None
+        self.stable = 0
+
+    def arm(self):
+        self.reference = _grab_gray(self.box, self.scale)
+        self.last = None
+        self.stable = 0
+
+    def _changed(self, a, b):
+        diff = cv2.absdiff(a, b)
+        return np.count_nonzero(diff > self.pixel_threshold) > self.ratio * diff.size
+
+    def __call__(self):
+        gray = _grab_gray(self.box, self.scale)
+        if self.reference is None:
+            self.reference = gray
+            return False
+        if self.last is None:
+            if self._changed(self.reference, gray):
+                self.last = gray
+                return self.settle == 0
+            return False
+        # 已发生变化，等待画面稳定
+        if self._changed(self.last, gray):
+            self.stable = 0
+        else:
+            self.stable += 1
+        self.last = gray
+        return self.stable >= self.settle
+
+    def __repr__(self):
+        return f"RoiChanged({self.box})"
+
+class TemplatePresent:
+    """
+    模板出现条件：区域内模板匹配得分达到阈值。
+    """
+
+    def __init__(self, template, box=None, threshold=0.85):
+        """
+        :param template: BGR 模板图像
+        :param box: 搜索区域 [x1, x2, y1, y2]，为空时搜索全屏
+        :param threshold: TM_CCOEFF_NORMED 匹配阈值
+        """
+        self.template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY) if template.ndim == 3 else template
+        self.box = box
+        self.threshold = threshold
+
+    def __call__(self):
+        gray = _grab_gray(self.box, 1.0)
+        if gray.shape[0] < self.template.shape[0] or gray.shape[1] < self.template.shape[1]:
+            return False
+        score = cv2.matchTemplate(gray, self.template, cv2.TM_CCOEFF_NORMED).max()
+        return score >= self.threshold
+
+    def __repr__(self):
+        return f"TemplatePresent({self.box})"
+
+class OcrTokenSeen:
+    """
+    文字出现条件：对区域做单行识别，结果包含指定文字。
+    """
+
+    def __init__(self, ocr_model, box, token):
+        """
+        :param ocr_model: My_TS 实例
+        :param box: 识别区域 [x1, x2, y1, y2]
+        :param token: 需要出现的文字
+        """
+        self.ocr_model = ocr_model
+        self.box = box
+        self.token = token
+
+    def __call__(self):
+        return self.token in self.ocr_model.ocr_one_row(capture_region(self.box))
+
+    def __repr__(self):
+        return f"OcrTokenSeen({self.token!r})"
 
 def capture_fullscreen():
-    # 直接截全屏，返回PIL图片对象
-    img = pyautogui.screenshot()
-    img_np = np.array(img)
-    return img_np
+    # 截全屏，返回 BGR 格式的 numpy 图像（位于截图后端的帧缓冲环中）
+    return get_capture_backend().grab()
+
+def capture_region(box):
+    """
+    只截取指定区域，box 为 [x1, x2, y1, y2]，返回 BGR 图像。
+    """
+    return get_capture_backend().grab(box)
 
 def screenshot_fullscreen(filename="screenshot_full.png"):
     # 截取全屏
-    img = pyautogui.screenshot()
-    img.save(filename)
+    img = capture_fullscreen()
+    cv2.imwrite(filename, img)
     print(f"全屏截图已保存为 {filename}")
 
 def main():
@@ -69,4 +349,5 @@ def main():
     print("已操作完最后一个装备")
 
 if __name__ == "__main__":
+    setup_logging()
     main()
@@ -0,0 +1,48 @@
+import asyncio
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from async_ocr import AsyncOCR
+
+# 异步 OCR 前端：关闭时正在运行与排队的请求都要结束，调用方不能一直挂起。
+
+
+class BlockingRecognizer:
+    rec_batch_num = 2
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, img_list):
+        self.started.set()
+        self.release.wait(5)
+        return [("", 1.0)] * len(img_list)
+
+
+class BlockingTS:
+    def __init__(self):
+        self.text_recognizer = BlockingRecognizer()
+
+
+def test_close_resolves_pending_requests():
+    async def run():
+        ts = BlockingTS()
+        ocr = AsyncOCR(ts=ts, max_wait=0.001)
+        crop = np.zeros((8, 8, 3), dtype=np.uint8)
+        tasks = [asyncio.ensure_future(ocr.recognize(crop)) for _ in range(5)]
+        # 第一批已进入执行器，其余的在排队
+        await asyncio.get_running_loop().run_in_executor(None, ts.text_recognizer.started.wait, 5)
+        await ocr.close()
+        ts.text_recognizer.release.set()
+        results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 2)
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+    asyncio.run(run())
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from frame_context import frame_key
+
+# 帧标识：识别结果按帧标识缓存，只差一个小字形的两帧必须得到不同的标识。
+
+
+def render(text):
+    roi = np.full((120, 200, 3), 40, dtype=np.uint8)
+    cv2.putText(roi, text, (10, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (235, 235, 235), 1)
+    return roi
+
+
+def test_key_changes_with_one_glyph_in_large_roi():
+    roi, changed = render("+12"), render("+13")
+    assert np.count_nonzero((roi != changed).any(axis=2)) < 100
+    assert frame_key(roi) != frame_key(changed)
+    # 变化只落在抽样点之间时也能发现
+    stroke = roi.copy()
+    stroke[80, 31] = 235
+    assert frame_key(roi) != frame_key(stroke)
+
+
+def test_key_changes_with_one_pixel_in_full_frame():
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    changed = frame.copy()
+    changed[501, 1003, 1] = 1
+    assert frame_key(frame) == frame_key(frame.copy())
+    assert frame_key(frame) != frame_key(changed)
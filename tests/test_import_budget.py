@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmark"))
+
+from bench_import import BUDGETS, FORBIDDEN, measure
+
+# 核心模块的导入预算：复用 benchmark/bench_import.py 的测量方法。
+# 无界面与无副作用的检查是确定的；耗时随机器波动，预算按 IMPORT_BUDGET_SCALE（默认 2 倍）放宽。
+
+BUDGET_SCALE = float(os.environ.get("IMPORT_BUDGET_SCALE", "2"))
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_import_is_headless(module):
+    _, imported, leftovers = measure(module)
+    assert sorted(name for name in FORBIDDEN if name in imported) == []
+    assert leftovers == []
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_import_time_budget(module):
+    median = sorted(measure(module)[0] for _ in range(3))[1]
+    assert median <= BUDGETS[module] * BUDGET_SCALE
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from label_index import LabelIndex, LabelReader
+
+# 闭集标签索引：真实标签没有样本时，不能把字形相近的已有标签当作结果。
+
+
+def render(text):
+    """深色底白字的单行文字区域"""
+    crop = np.full((32, 160, 3), 40, dtype=np.uint8)
+    cv2.putText(crop, text, (4, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (235, 235, 235), 2, cv2.LINE_AA)
+    return crop
+
+
+def test_lookup_rejects_label_missing_from_index():
+    index = LabelIndex(["Crit Rate", "Crit Rate.", "SPD"])
+    index.add("Crit Rate", render("Crit Rate"))
+    index.add("SPD", render("SPD"))
+    # 只有一个相近标签有样本时相关度与 margin 都很高
+    label, score, margin = index.query(render("Crit Rate."))
+    assert label == "Crit Rate" and score >= 0.9 and margin >= 0.05
+    reader = LabelReader(index)
+    assert reader.lookup(render("Crit Rate.")) is None
+    assert reader.lookup(render("SPD")) == "SPD"
+
+
+def test_lookup_answers_when_lookalikes_are_indexed():
+    index = LabelIndex(["ATK", "ATK%", "SPD"])
+    for label in ("ATK", "ATK%", "SPD"):
+        index.add(label, render(label))
+    reader = LabelReader(index)
+    assert reader.lookup(render("ATK")) == "ATK"
+    assert reader.lookup(render("SPD")) == "SPD"
@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ocr_server import OCRClient, OCRRequestHandler, OCRService
+
+# OCR 服务客户端：多个线程共用一个启用共享内存的客户端时，每个调用只拿到自己图像的结果。
+
+
+class FakeRecognizer:
+    rec_batch_num = 8
+
+    def __call__(self, img_list):
+        # 识别结果为图像的像素值，可以看出是哪张图
+        return [(str(int(img[0, 0, 0])), 1.0) for img in img_list]
+
+
+class FakeTS:
+    def __init__(self):
+        self.text_recognizer = FakeRecognizer()
+
+
+def test_shared_client_keeps_threads_apart():
+    service = OCRService(ts=FakeTS(), max_wait=0.001, max_concurrency=64)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), type("Handler", (OCRRequestHandler,), {"service": service}))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OCRClient(port=server.server_address[1], use_shm=True)
+    wrong = []
+
+    def worker(value):
+        img = np.full((48, 320, 3), value, dtype=np.uint8)
+        for _ in range(10):
+            (text, _), = client.text_recognizer([img])
+            if text != str(value):
+                wrong.append((value, text))
+
+    try:
+        threads = [threading.Thread(target=worker, args=(value,)) for value in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+        service.close()
+    assert wrong == []
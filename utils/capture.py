@@ -0,0 +1,281 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+import cv2
+import numpy as np
+from utils.log import log
+
+# 截图后端：统一返回 BGR 顺序的 uint8 图像 (h, w, 3)
+#
+# 区域统一使用 [x1, x2, y1, y2]，与 BoxManager.format_box_scaled 的输出一致。
+# 截图结果写入预分配的帧缓冲环，稳定运行时不再分配内存；
+# 缓冲区会被循环复用，需要长期保存的帧请自行 copy()。
+
+
+class CaptureError(Exception):
+    """截图失败"""
+
+
+class FrameRing:
+    """
+    预分配的帧缓冲环，按形状各保留 size 个缓冲区并轮流复用。
+    """
+
+    def __init__(self, size=3):
+        """
+        :param size: 每种形状保留的缓冲区个数，即一帧在被覆盖前还能再截几帧
+        """
+        self.size = max(1, size)
+        self.buffers = {}
+        self.index = {}
+
+    def acquire(self, shape):
+        """取出下一个指定形状的缓冲区"""
+        shape = tuple(shape)
+        buffers = self.buffers.get(shape)
+        if buffers is None:
+            buffers = self.buffers[shape] = [np.empty(shape, dtype=np.uint8) for _ in range(self.size)]
+            self.index[shape] = 0
+        i = self.index[shape]
+        self.index[shape] = (i + 1) % self.size
+        return buffers[i]
+
+    def clear(self):
+        self.buffers = {}
+        self.index = {}
+
+
+class CaptureBackend:
+    """
+    截图后端基类，子类实现 screen_size 与 _grab_into。
+    """
+
+    def __init__(self, ring_size=3):
+        self.ring = FrameRing(ring_size)
+
+    def screen_size(self):
+        """返回 (width, height)"""
+        raise NotImplementedError
+
+    def _grab_into(self, x, y, out):
+        """把左上角为 (x, y)、大小与 out 相同的区域以 BGR 写入 out"""
+        raise NotImplementedError
+
+    def grab(self, region=None):
+        """
+        截取整个屏幕或指定区域。
+
+        :param region: [x1, x2, y1, y2]，为空时截全屏
+        :return: BGR 图像，位于帧缓冲环中
+        """
+        width, height = self.screen_size()
+        if region is None:
+            x1, x2, y1, y2 = 0, width, 0, height
+        else:
+            x1, x2, y1, y2 = region
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(width, x2), min(height, y2)
+        if x2 <= x1 or y2 <= y1:
+            raise CaptureError(f"截图区域无效: {region}")
+        out = self.ring.acquire((y2 - y1, x2 - x1, 3))
+        self._grab_into(x1, y1, out)
+        return out
+
+    def close(self):
+        pass
+
+
+class FileBackend(CaptureBackend):
+    """
+    从图片文件截图，用于离线调试与测试。图片在初始化时全部解码。
+    """
+
+    def __init__(self, paths, advance=True, ring_size=3):
+        """
+        :param paths: 图片路径或路径列表
+        :param advance: 每次截图后是否切换到下一张图片（循环）
+        """
+        super().__init__(ring_size)
+        if isinstance(paths, (str, os.PathLike)):
+            paths = [paths]
+        self.frames = []
+        for path in paths:
+            img = cv2.imread(str(path))
+            if img is None:
+                raise CaptureError(f"无法读取图片: {path}")
+            self.frames.append(img)
+        self.advance = advance
+        self.current = 0
+
+    def screen_size(self):
+        h, w = self.frames[self.current].shape[:2]
+        return w, h
+
+    def _grab_into(self, x, y, out):
+        h, w = out.shape[:2]
+        np.copyto(out, self.frames[self.current][y:y + h, x:x + w])
+        if self.advance:
+            self.current = (self.current + 1) % len(self.frames)
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    """
+    通过 pyautogui 截图，作为没有专用后端时的兜底方案。
+    """
+
+    def __init__(self, ring_size=3):
+        super().__init__(ring_size)
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def screen_size(self):
+        width, height = self.pyautogui.size()
+        return int(width), int(height)
+
+    def _grab_into(self, x, y, out):
+        h, w = out.shape[:2]
+        img = self.pyautogui.screenshot(region=(x, y, w, h))
+        # pyautogui 返回 RGB，转为 BGR 写入缓冲区
+        cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR, dst=out)
+
+
+class _XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong),
+        ("green_mask", ctypes.c_ulong),
+        ("blue_mask", ctypes.c_ulong),
+    ]
+
+
+_X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+
+class X11Backend(CaptureBackend):
+    """
+    通过 libX11 的 XGetImage 截图，可在 Linux / Xvfb 下无界面运行。
+    """
+
+    ZPixmap = 2
+    AllPlanes = ctypes.c_ulong(-1)
+
+    def __init__(self, display=None, ring_size=3):
+        """
+        :param display: X 显示名，例如 ":99"，为空时使用 DISPLAY 环境变量
+        """
+        super().__init__(ring_size)
+        path = ctypes.util.find_library("X11")
+        if path is None:
+            raise CaptureError("未找到 libX11")
+        xlib = ctypes.cdll.LoadLibrary(path)
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        xlib.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        xlib.XGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_int,
+                                   ctypes.c_uint, ctypes.c_uint, ctypes.c_ulong, ctypes.c_int]
+        xlib.XGetImage.restype = ctypes.POINTER(_XImage)
+        xlib.XDestroyImage.argtypes = [ctypes.POINTER(_XImage)]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        self.xlib = xlib
+
+        # 默认的 X 错误处理会直接退出进程，这里改为记录错误后由 grab 抛出异常
+        self.error = None
+
+        def on_error(display, event):
+            self.error = "X11 请求失败"
+            return 0
+        self._error_handler = _X_ERROR_HANDLER(on_error)
+        xlib.XSetErrorHandler(self._error_handler)
+
+        name = display.encode() if display else None
+        self.display = xlib.XOpenDisplay(name)
+        if not self.display:
+            raise CaptureError(f"无法连接 X 显示: {display or os.environ.get('DISPLAY')}")
+        screen = xlib.XDefaultScreen(self.display)
+        self.root = xlib.XDefaultRootWindow(self.display)
+        self.width = xlib.XDisplayWidth(self.display, screen)
+        self.height = xlib.XDisplayHeight(self.display, screen)
+
+    def screen_size(self):
+        return self.width, self.height
+
+    def _grab_into(self, x, y, out):
+        h, w = out.shape[:2]
+        self.error = None
+        ximage = self.xlib.XGetImage(self.display, self.root, x, y, w, h, self.AllPlanes, self.ZPixmap)
+        if not ximage or self.error:
+            raise CaptureError(self.error or "XGetImage 失败")
+        try:
+            image = ximage.contents
+            if image.bits_per_pixel != 32:
+                raise CaptureError(f"不支持的像素格式: {image.bits_per_pixel} bpp")
+            # 24/32 位 TrueColor 在小端机器上按 BGRA 排列，每行可能有填充
+            buffer = (ctypes.c_ubyte * (image.bytes_per_line * h)).from_address(image.data)
+            src = np.frombuffer(buffer, dtype=np.uint8).reshape(h, image.bytes_per_line // 4, 4)
+            np.copyto(out, src[:, :w, :3])
+        finally:
+            self.xlib.XDestroyImage(ximage)
+
+    def close(self):
+        if self.display:
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+
+
+def create_backend(name="auto", **kwargs):
+    """
+    按名称创建截图后端。
+
+    :param name: auto | gdi | x11 | file | pyautogui
+        auto 时 Windows 使用 gdi，设置了 DISPLAY 的 Linux 使用 x11，否则使用 pyautogui
+    :param kwargs: 传给后端构造函数的参数
+    """
+    if name == "auto":
+        if sys.platform == "win32":
+            name = "gdi"
+        elif os.environ.get("DISPLAY"):
+            name = "x11"
+        else:
+            name = "pyautogui"
+    if name == "gdi":
+        from utils.screenshot import GdiBackend
+        return GdiBackend(**kwargs)
+    if name == "x11":
+        return X11Backend(**kwargs)
+    if name == "file":
+        return FileBackend(**kwargs)
+    if name == "pyautogui":
+        return PyAutoGuiBackend(**kwargs)
+    raise ValueError(f"未知的截图后端: {name}")
+
+
+if __name__ == "__main__":
+    import time
+    from utils.log import setup_logging
+
+    setup_logging(files=False)
+
+    backend = create_backend()
+    log.info(f"截图后端: {type(backend).__name__}, 屏幕大小: {backend.screen_size()}")
+    start = time.perf_counter()
+    for _ in range(20):
+        frame = backend.grab()
+    log.info(f"全屏截图平均耗时: {(time.perf_counter() - start) / 20 * 1000:.1f} ms, 形状: {frame.shape}")
+    cv2.imwrite("capture_test.png", frame)
+    backend.close()
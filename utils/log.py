@@ -6,7 +6,6 @@ from logging import (
     StreamHandler,
     FileHandler,
     Formatter,
-    basicConfig,
     INFO,
     DEBUG,
     CRITICAL,
@@ -14,41 +13,53 @@ from logging import (
 from pathlib import Path
 from datetime import datetime
 
-logs_path = Path("logs")
-logs_path.mkdir(exist_ok=True, parents=True)
+# 导入本模块没有副作用：只取得 logger，不创建目录与文件。
+# 由入口脚本调用 setup_logging() 添加控制台与日志文件输出。
 
-current_time_str = datetime.now().strftime("%Y-%m-%d-%H-%M")
+logs_path = Path("logs")
+logging_format = "%(levelname)s [%(asctime)s] [%(filename)s:%(lineno)d] %(message)s"
 
 log = getLogger()
-log.setLevel(INFO)
 
-logging_format = "%(levelname)s [%(asctime)s] [%(filename)s:%(lineno)d] %(message)s"
-formatter = Formatter(logging_format)
+_configured = False
+
 
-stream_handler = StreamHandler()
-stream_handler.setFormatter(formatter)
+def setup_logging(debug: bool = False, log_dir=logs_path, files: bool = True):
+    """
+    配置日志输出，重复调用只生效一次（之后只调整级别）。
 
-file_handler = FileHandler(filename=logs_path / "log.txt", mode="w", encoding="utf-8")
-file_handler.setFormatter(formatter)
+    :param debug: 是否输出 DEBUG 级别
+    :param log_dir: 日志目录
+    :param files: 是否写日志文件（log.txt 与带时间戳的日志），为假时只输出到控制台
+    """
+    global _configured, logs_path
+    set_debug(debug)
+    if _configured:
+        return log
+    _configured = True
+    formatter = Formatter(logging_format)
 
-timestamped_file_handler = FileHandler(filename=logs_path / f"log_{current_time_str}.txt", mode="w", encoding="utf-8")
-timestamped_file_handler.setFormatter(formatter)
+    stream_handler = StreamHandler()
+    stream_handler.setFormatter(formatter)
+    log.addHandler(stream_handler)
 
-log.addHandler(stream_handler)
-log.addHandler(file_handler)
-log.addHandler(timestamped_file_handler)
+    if files:
+        logs_path = Path(log_dir)
+        logs_path.mkdir(exist_ok=True, parents=True)
+        current_time_str = datetime.now().strftime("%Y-%m-%d-%H-%M")
+        for filename in ("log.txt", f"log_{current_time_str}.txt"):
+            file_handler = FileHandler(filename=logs_path / filename, mode="w", encoding="utf-8")
+            file_handler.setFormatter(formatter)
+            log.addHandler(file_handler)
 
-flet = getLogger("flet")
-flet.setLevel(CRITICAL)
-flet_core = getLogger("flet_core")
-flet_core.setLevel(CRITICAL)
+    getLogger("flet").setLevel(CRITICAL)
+    getLogger("flet_core").setLevel(CRITICAL)
+    return log
 
-basicConfig(level=INFO)
 
 def set_debug(debug: bool = False):
     log.setLevel(DEBUG if debug else INFO)
 
-set_debug()
 
 def my_print(*args, **kwargs):
     log.info(" ".join(map(str, args)))
@@ -56,6 +67,7 @@ def my_print(*args, **kwargs):
         print(*args, **kwargs)
 
 def print_exc():
-    with io.StringIO() as buf, open("logs/error_log.txt", "a") as f:
+    logs_path.mkdir(exist_ok=True, parents=True)
+    with io.StringIO() as buf, open(logs_path / "error_log.txt", "a") as f:
         traceback.print_exc(file=buf)
         f.write(buf.getvalue())
\ No newline at end of file
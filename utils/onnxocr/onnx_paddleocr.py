@@ -3,7 +3,9 @@ import time
 from .predict_system import TextSystem
 from .utils import infer_args as init_args
 from .utils import str2bool, draw_ocr
+from . import profiler
 import argparse
+import atexit
 import sys
 
 
@@ -24,6 +26,11 @@ class ONNXPaddleOcr(TextSystem):
         params.__dict__.update({"cpu": False})
         params.__dict__.update(**kwargs)
 
+        # 开启分阶段计时，文件类 sink 在退出时写盘
+        if params.profile:
+            sink = profiler.enable(profiler.sink_from_spec(params.profile))
+            atexit.register(sink.close)
+
         # 初始化模型
         super().__init__(params)
 
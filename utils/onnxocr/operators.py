@@ -26,8 +26,12 @@ class NormalizeImage(object):
             img = np.array(img)
         assert isinstance(img,
                           np.ndarray), "invalid input 'img' in NormalizeImage"
-        data['image'] = (
-            img.astype('float32') * self.scale - self.mean) / self.std
+        # 原地运算，只分配一次 float32 图像
+        img = img.astype('float32')
+        img *= self.scale
+        img -= self.mean
+        img /= self.std
+        data['image'] = img
         return data
 
 
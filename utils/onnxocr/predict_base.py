@@ -1,19 +1,92 @@
+import hashlib
+import os
+import platform
+import threading
+import time
+
 import onnxruntime
 
+from . import profiler
+
+
+def session_cache_path(model_dir, cache_dir, providers, optimization_level):
+    """
+    Where the ORT-optimized copy of model_dir is cached. The name is keyed on
+    the model content, the ORT version, the providers and the optimization
+    level, so a changed model or upgraded onnxruntime never loads a stale graph.
+    """
+    digest = hashlib.sha256()
+    with open(model_dir, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    digest.update(repr((onnxruntime.__version__, tuple(providers), int(optimization_level),
+                        platform.machine())).encode())
+    stem = os.path.splitext(os.path.basename(model_dir))[0]
+    return os.path.join(cache_dir, f"{stem}.{digest.hexdigest()[:16]}.onnx")
+
+
 class PredictBase(object):
     def __init__(self, cpu=False):
         self.cpu = cpu
+        # perf_counter() when the first inference finished, see TextSystem.startup
+        self.first_run = None
+        # session cache still to be written, see get_onnx_session
+        self.cache_job = None
 
-    def get_onnx_session(self, model_dir, use_gpu):
+    def get_onnx_session(self, model_dir, use_gpu, cache_dir=None):
         if self.cpu:
             providers = ['CPUExecutionProvider']
         else:
             providers = onnxruntime.get_available_providers()
         sess_options = onnxruntime.SessionOptions()
-        onnx_session = onnxruntime.InferenceSession(model_dir, providers=providers, sess_options=sess_options)
+        if not cache_dir:
+            with profiler.stage('session.load', model=os.path.basename(model_dir), cached=False):
+                return onnxruntime.InferenceSession(model_dir, providers=providers, sess_options=sess_options)
+
+        # Serialize at ENABLE_EXTENDED only: ENABLE_ALL adds layout transforms
+        # (NCHWc block size) that depend on the CPU's instruction set, and the
+        # cache travels with the tool. The CPU provider applies them on load.
+        level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        cpu_only = providers == ['CPUExecutionProvider']
+        cache_path = session_cache_path(model_dir, cache_dir, providers, level)
+        if not os.path.exists(cache_path):
+            # The session in use keeps the default level (an EXTENDED-only graph
+            # runs much slower on CPU); the cache is written by a throwaway
+            # session in the background once the first inference is done, so
+            # it does not compete with startup.
+            self.cache_job = (model_dir, cache_dir, cache_path, providers, level)
+            with profiler.stage('session.load', model=os.path.basename(model_dir), cached=False):
+                return onnxruntime.InferenceSession(model_dir, providers=providers, sess_options=sess_options)
+
+        # already optimized up to EXTENDED, only the hardware-specific passes remain
+        sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL if cpu_only \
+            else onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+        with profiler.stage('session.load', model=os.path.basename(model_dir), cached=True):
+            return onnxruntime.InferenceSession(cache_path, providers=providers, sess_options=sess_options)
 
-        return onnx_session
+    @staticmethod
+    def _write_session_cache(model_dir, cache_dir, cache_path, providers, level):
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            sess_options = onnxruntime.SessionOptions()
+            sess_options.graph_optimization_level = level
+            sess_options.optimized_model_filepath = tmp_path
+            onnxruntime.InferenceSession(model_dir, providers=providers, sess_options=sess_options)
+            os.replace(tmp_path, cache_path)
+        except Exception:
+            # read-only model directory or a concurrent writer; the next start retries
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
+    def run_session(self, onnx_session, output_name, input_feed):
+        outputs = onnx_session.run(output_name, input_feed=input_feed)
+        if self.first_run is None:
+            self.first_run = time.perf_counter()
+            if self.cache_job is not None:
+                threading.Thread(target=self._write_session_cache, name="ort-cache", args=self.cache_job).start()
+                self.cache_job = None
+        return outputs
 
     def get_output_name(self, onnx_session):
         """
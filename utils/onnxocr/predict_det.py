@@ -2,6 +2,8 @@ import numpy as np
 from .imaug import transform, create_operators
 from .db_postprocess import DBPostProcess
 from .predict_base import PredictBase
+from .utils import model_variant_path
+from . import profiler
 
 
 class TextDetector(PredictBase):
@@ -45,13 +47,19 @@ class TextDetector(PredictBase):
         self.postprocess_op = DBPostProcess(**postprocess_params)
 
         # 初始化模型
-        self.det_onnx_session = self.get_onnx_session(args.det_model_dir, args.use_gpu)
+        self.det_onnx_session = self.get_onnx_session(
+            model_variant_path(args.det_model_dir, args.det_model_variant), args.use_gpu, args.ort_cache_dir)
         self.det_input_name = self.get_input_name(self.det_onnx_session)
         self.det_output_name = self.get_output_name(self.det_onnx_session)
 
 
 
 
+    def warmup(self, shapes):
+        """run the detector once per input shape (h, w) so kernels are initialized"""
+        for h, w in shapes:
+            self(np.zeros((h, w, 3), dtype=np.uint8))
+
     def order_points_clockwise(self, pts):
         rect = np.zeros((4, 2), dtype="float32")
         s = pts.sum(axis=1)
@@ -97,31 +105,33 @@ class TextDetector(PredictBase):
         return dt_boxes
 
     def __call__(self, img):
-        ori_im = img.copy()
+        ori_shape = img.shape
         data = {'image': img}
 
-        data = transform(data, self.preprocess_op)
-        img, shape_list = data
-        if img is None:
-            return None, 0
-        img = np.expand_dims(img, axis=0)
-        shape_list = np.expand_dims(shape_list, axis=0)
-        img = img.copy()
+        with profiler.stage('det.preprocess', shape=img.shape):
+            data = transform(data, self.preprocess_op)
+            img, shape_list = data
+            if img is None:
+                return None, 0
+            # CHW 转置后是非连续视图，onnxruntime 需要连续内存，这里是唯一一次复制
+            img = np.ascontiguousarray(np.expand_dims(img, axis=0))
+            shape_list = np.expand_dims(shape_list, axis=0)
 
 
         input_feed = self.get_input_feed(self.det_input_name, img)
-        outputs = self.det_onnx_session.run(self.det_output_name, input_feed=input_feed)
-
-        preds = {}
-        preds['maps'] = outputs[0]
+        with profiler.stage('det.run', shape=img.shape):
+            outputs = self.run_session(self.det_onnx_session, self.det_output_name, input_feed)
 
-        post_result = self.postprocess_op(preds, shape_list)
-        dt_boxes = post_result[0]['points']
+        with profiler.stage('det.postprocess'):
+            preds = {}
+            preds['maps'] = outputs[0]
 
-        if self.args.det_box_type == 'poly':
-            dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, ori_im.shape)
-        else:
-            dt_boxes = self.filter_tag_det_res(dt_boxes, ori_im.shape)
+            post_result = self.postprocess_op(preds, shape_list)
+            dt_boxes = post_result[0]['points']
 
-        return dt_boxes
+            if self.args.det_box_type == 'poly':
+                dt_boxes = self.filter_tag_det_res_only_clip(dt_boxes, ori_shape)
+            else:
+                dt_boxes = self.filter_tag_det_res(dt_boxes, ori_shape)
 
+        return dt_boxes
\ No newline at end of file
@@ -1,11 +1,12 @@
 import cv2
 import numpy as np
 import math
-from PIL import Image
 
 
 from .rec_postprocess import CTCLabelDecode
 from .predict_base import PredictBase
+from .utils import model_variant_path
+from . import profiler
 
 class TextRecognizer(PredictBase):
     def __init__(self, args, cpu=False):
@@ -16,14 +17,26 @@ class TextRecognizer(PredictBase):
         self.postprocess_op = CTCLabelDecode(character_dict_path=args.rec_char_dict_path, use_space_char=args.use_space_char)
 
         # 初始化模型
-        self.rec_onnx_session = self.get_onnx_session(args.rec_model_dir, args.use_gpu)
+        self.rec_onnx_session = self.get_onnx_session(
+            model_variant_path(args.rec_model_dir, args.rec_model_variant), args.use_gpu, args.ort_cache_dir)
         self.rec_input_name = self.get_input_name(self.rec_onnx_session)
         self.rec_output_name = self.get_output_name(self.rec_onnx_session)
 
 
-    def resize_norm_img(self, img, max_wh_ratio):
+    def warmup(self, widths):
+        """run one full batch per crop width so kernels are initialized"""
+        _, img_h, _ = self.rec_image_shape
+        for w in widths:
+            self([np.zeros((img_h, w, 3), dtype=np.uint8)] * self.rec_batch_num)
+
+    def resize_norm_img(self, img, max_wh_ratio, out=None):
+        """
+        out: optional zero-filled (imgC, imgH, imgW) float32 buffer, e.g. one
+        slot of the batch tensor; the default path writes into it directly.
+        """
         imgC, imgH, imgW = self.rec_image_shape
         if self.rec_algorithm == 'NRTR' or self.rec_algorithm == 'ViTSTR':
+            from PIL import Image
             img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
             # return padding_im
             image_pil = Image.fromarray(np.uint8(img))
@@ -71,12 +84,12 @@ class TextRecognizer(PredictBase):
                 resized_w = self.rec_image_shape[2]
             imgW = self.rec_image_shape[2]
         resized_image = cv2.resize(img, (resized_w, imgH))
-        resized_image = resized_image.astype('float32')
-        resized_image = resized_image.transpose((2, 0, 1)) / 255
-        resized_image -= 0.5
-        resized_image /= 0.5
-        padding_im = np.zeros((imgC, imgH, imgW), dtype=np.float32)
-        padding_im[:, :, 0:resized_w] = resized_image
+        padding_im = out if out is not None else np.zeros((imgC, imgH, imgW), dtype=np.float32)
+        # 归一化 (x / 255 - 0.5) / 0.5 直接写入输出缓冲区
+        dst = padding_im[:, :, 0:resized_w]
+        np.divide(resized_image.transpose((2, 0, 1)), np.float32(255), out=dst)
+        dst -= 0.5
+        dst /= 0.5
         return padding_im
 
     def resize_norm_img_vl(self, img, image_shape):
@@ -279,22 +292,30 @@ class TextRecognizer(PredictBase):
 
         for beg_img_no in range(0, img_num, batch_num):
             end_img_no = min(img_num, beg_img_no + batch_num)
-            norm_img_batch = []
+            norm_img_batch = None
             imgC, imgH, imgW = self.rec_image_shape[:3]
             max_wh_ratio = imgW / imgH
             # max_wh_ratio = 0
-            for ino in range(beg_img_no, end_img_no):
-                h, w = img_list[indices[ino]].shape[0:2]
-                wh_ratio = w * 1.0 / h
-                max_wh_ratio = max(max_wh_ratio, wh_ratio)
-            for ino in range(beg_img_no, end_img_no):
-                norm_img = self.resize_norm_img(img_list[indices[ino]],
-                                                max_wh_ratio)
-                norm_img = norm_img[np.newaxis, :]
-                norm_img_batch.append(norm_img)
-
-            norm_img_batch = np.concatenate(norm_img_batch)
-            norm_img_batch = norm_img_batch.copy()
+            with profiler.stage('rec.preprocess', batch=end_img_no - beg_img_no):
+                for ino in range(beg_img_no, end_img_no):
+                    h, w = img_list[indices[ino]].shape[0:2]
+                    wh_ratio = w * 1.0 / h
+                    max_wh_ratio = max(max_wh_ratio, wh_ratio)
+                # 第一张图确定输入形状后预分配整批张量，其余图直接写入对应位置
+                for ino in range(beg_img_no, end_img_no):
+                    if norm_img_batch is None:
+                        norm_img = self.resize_norm_img(img_list[indices[ino]],
+                                                        max_wh_ratio)
+                        norm_img_batch = np.zeros(
+                            (end_img_no - beg_img_no, ) + norm_img.shape,
+                            dtype=np.float32)
+                        norm_img_batch[0] = norm_img
+                    else:
+                        slot = norm_img_batch[ino - beg_img_no]
+                        norm_img = self.resize_norm_img(img_list[indices[ino]],
+                                                        max_wh_ratio, out=slot)
+                        if norm_img is not slot:
+                            slot[...] = norm_img
 
             # img = img[:, :, ::-1].transpose(2, 0, 1)
             # img = img[:, :, ::-1]
@@ -303,11 +324,13 @@ class TextRecognizer(PredictBase):
             # img = np.expand_dims(img, axis=0)
             # print(img.shape)
             input_feed = self.get_input_feed(self.rec_input_name, norm_img_batch)
-            outputs = self.rec_onnx_session.run(self.rec_output_name, input_feed=input_feed)
+            with profiler.stage('rec.run', shape=norm_img_batch.shape):
+                outputs = self.run_session(self.rec_onnx_session, self.rec_output_name, input_feed)
 
             preds = outputs[0]
 
-            rec_result = self.postprocess_op(preds)
+            with profiler.stage('rec.decode', batch=len(preds)):
+                rec_result = self.postprocess_op(preds)
             for rno in range(len(rec_result)):
                 rec_res[indices[beg_img_no + rno]] = rec_result[rno]
 
@@ -1,19 +1,51 @@
 import os
+import time
 import cv2
-import copy
+import numpy as np
 from . import predict_det
 from . import predict_rec
+from . import profiler
 from .utils import get_rotate_crop_image, get_minarea_rect_crop
 
 
 class TextSystem(object):
     def __init__(self, args):
+        self.created = time.perf_counter()
         self.text_detector = predict_det.TextDetector(args, cpu=args.cpu)
         self.text_recognizer = predict_rec.TextRecognizer(args, cpu=args.cpu)
         self.drop_score = args.drop_score
 
         self.args = args
         self.crop_image_res_index = 0
+        self.startup = {'init_ms': (time.perf_counter() - self.created) * 1000}
+        if args.warmup:
+            self.warmup()
+
+    def warmup(self, det_shapes=None, rec_widths=None):
+        """
+        Run dummy inferences at the shapes the scanner uses, so the first real
+        call does not pay for lazy kernel and buffer initialization.
+        det_shapes: "HxW,HxW" or [(h, w), ...]; rec_widths: "W,W" or [w, ...]
+        """
+        det_shapes = self.args.warmup_det_shapes if det_shapes is None else det_shapes
+        rec_widths = self.args.warmup_rec_widths if rec_widths is None else rec_widths
+        if isinstance(det_shapes, str):
+            det_shapes = [tuple(int(v) for v in shape.split('x')) for shape in det_shapes.split(',') if shape]
+        if isinstance(rec_widths, str):
+            rec_widths = [int(w) for w in rec_widths.split(',') if w]
+        start = time.perf_counter()
+        with profiler.stage('system.warmup'):
+            self.text_detector.warmup(det_shapes)
+            self.text_recognizer.warmup(rec_widths)
+        # time to first result counts real inferences only
+        self.text_detector.first_run = None
+        self.text_recognizer.first_run = None
+        self.startup['warmup_ms'] = (time.perf_counter() - start) * 1000
+
+    def time_to_first_result(self):
+        """ms from construction until the first real det or rec inference finished, None before that"""
+        runs = [t for t in (self.text_detector.first_run, self.text_recognizer.first_run) if t is not None]
+        return (min(runs) - self.created) * 1000 if runs else None
 
 
     def draw_crop_rec_res(self, output_dir, img_crop_list, rec_res):
@@ -28,27 +60,30 @@ class TextSystem(object):
         self.crop_image_res_index += bbox_num
 
     def __call__(self, img):
-        ori_im = img.copy()
+        # 检测与裁剪都不修改原图，直接在原图（或其视图）上操作
         # 文字检测
-        dt_boxes = self.text_detector(img)
+        with profiler.stage('system.det', shape=img.shape):
+            dt_boxes = self.text_detector(img)
 
         if dt_boxes is None:
             return None, None
 
         img_crop_list = []
 
-        dt_boxes = sorted_boxes(dt_boxes)
+        with profiler.stage('system.sort', boxes=len(dt_boxes)):
+            dt_boxes = sorted_boxes(dt_boxes)
 
         # 图片裁剪
-        for bno in range(len(dt_boxes)):
-            tmp_box = copy.deepcopy(dt_boxes[bno])
-            if self.args.det_box_type == "quad":
-                img_crop = get_rotate_crop_image(ori_im, tmp_box)
-            else:
-                img_crop = get_minarea_rect_crop(ori_im, tmp_box)
-            img_crop_list.append(img_crop)
+        with profiler.stage('system.crop', boxes=len(dt_boxes)):
+            for bno in range(len(dt_boxes)):
+                if self.args.det_box_type == "quad":
+                    img_crop = get_rotate_crop_image(img, dt_boxes[bno])
+                else:
+                    img_crop = get_minarea_rect_crop(img, dt_boxes[bno])
+                img_crop_list.append(img_crop)
         # 图像识别
-        rec_res = self.text_recognizer(img_crop_list)
+        with profiler.stage('system.rec', crops=len(img_crop_list)):
+            rec_res = self.text_recognizer(img_crop_list)
 
         filter_boxes, filter_rec_res = [], []
         for box, rec_result in zip(dt_boxes, rec_res):
@@ -60,26 +95,51 @@ class TextSystem(object):
         return filter_boxes, filter_rec_res
 
 
-def sorted_boxes(dt_boxes):
+def sorted_boxes(dt_boxes, y_tolerance=10):
     """
     Sort text boxes in order from top to bottom, left to right
     args:
         dt_boxes(array):detected text boxes with shape [4, 2]
     return:
         sorted boxes(array) with shape [4, 2]
+
+    Same ordering as sorting by the top-left point followed by the
+    insertion pass that swaps neighbours whose y differs by less than
+    y_tolerance. Boxes are split into row clusters wherever consecutive
+    y values (in sorted order) differ by at least y_tolerance; no box can
+    cross such a gap. Clusters whose whole y span is below the tolerance
+    reduce to a stable sort by x and are ordered with one lexsort; only
+    wider clusters fall back to the exact pass.
     """
+    dt_boxes = np.asarray(dt_boxes)
     num_boxes = dt_boxes.shape[0]
-    sorted_boxes = sorted(dt_boxes, key=lambda x: (x[0][1], x[0][0]))
-    _boxes = list(sorted_boxes)
-
-    for i in range(num_boxes - 1):
+    if num_boxes == 0:
+        return []
+    x = dt_boxes[:, 0, 0]
+    y = dt_boxes[:, 0, 1]
+    order = np.lexsort((x, y))
+    ys = y[order]
+    row = np.concatenate(([0], np.cumsum(np.abs(np.diff(ys)) >= y_tolerance)))
+    starts = np.flatnonzero(np.r_[True, row[1:] != row[:-1]])
+    ends = np.r_[starts[1:], num_boxes]
+    span = ys[ends - 1] - ys[starts]
+
+    # rank within the (y, x) order breaks ties, keeping the sort stable
+    order = order[np.lexsort((np.arange(num_boxes), x[order], row))]
+    for start, end in zip(starts[span >= y_tolerance], ends[span >= y_tolerance]):
+        cluster = np.sort(order[start:end])
+        cluster = cluster[np.lexsort((x[cluster], y[cluster]))]
+        order[start:end] = _insertion_pass(cluster, x, y, y_tolerance)
+    return list(dt_boxes[order])
+
+
+def _insertion_pass(index, x, y, y_tolerance):
+    index = list(index)
+    for i in range(len(index) - 1):
         for j in range(i, -1, -1):
-            if abs(_boxes[j + 1][0][1] - _boxes[j][0][1]) < 10 and \
-                    (_boxes[j + 1][0][0] < _boxes[j][0][0]):
-                tmp = _boxes[j]
-                _boxes[j] = _boxes[j + 1]
-                _boxes[j + 1] = tmp
+            if abs(y[index[j + 1]] - y[index[j]]) < y_tolerance and \
+                    (x[index[j + 1]] < x[index[j]]):
+                index[j], index[j + 1] = index[j + 1], index[j]
             else:
                 break
-    return _boxes
-
+    return index
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 分阶段计时工具
+#
+# 用法:
+#     with profiler.profiling(profiler.MemorySink()) as sink:
+#         model.ocr(img)
+#     print(sink.summary())
+#
+# 未启用时 stage() 返回一个共享的空上下文，不计时也不分配对象。
+
+_sink = None
+
+
+class MemorySink(object):
+    """ aggregate timings in memory: count / total / min / max per stage
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def record(self, name, start, duration, meta):
+        with self.lock:
+            item = self.stats.get(name)
+            if item is None:
+                item = self.stats[name] = {
+                    'count': 0, 'total': 0.0, 'min': duration, 'max': duration, 'meta': {}
+                }
+            item['count'] += 1
+            item['total'] += duration
+            item['min'] = min(item['min'], duration)
+            item['max'] = max(item['max'], duration)
+            if meta:
+                # 只保留最近一次的批大小、张量形状等附加信息
+                item['meta'] = meta
+
+    def summary(self):
+        """ return {stage: {count, total_ms, avg_ms, min_ms, max_ms, meta}} """
+        with self.lock:
+            return {
+                name: {
+                    'count': item['count'],
+                    'total_ms': item['total'] * 1000,
+                    'avg_ms': item['total'] * 1000 / item['count'],
+                    'min_ms': item['min'] * 1000,
+                    'max_ms': item['max'] * 1000,
+                    'meta': item['meta'],
+                }
+                for name, item in self.stats.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+
+    def close(self):
+        pass
+
+
+class JsonFileSink(object):
+    """ collect every stage event and dump them to a json file on close
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.events = []
+
+    def record(self, name, start, duration, meta):
+        with self.lock:
+            self.events.append({
+                'name': name,
+                'start': start,
+                'duration_ms': duration * 1000,
+                'thread': threading.get_ident(),
+                **meta,
+            })
+
+    def close(self):
+        with self.lock:
+            events, self.events = self.events, []
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(events, f, indent=2, default=str)
+
+
+class ChromeTraceSink(object):
+    """ write chrome://tracing (trace event format) complete events
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.events = []
+        self.pid = os.getpid()
+
+    def record(self, name, start, duration, meta):
+        with self.lock:
+            self.events.append({
+                'name': name,
+                'ph': 'X',
+                'ts': start * 1e6,
+                'dur': duration * 1e6,
+                'pid': self.pid,
+                'tid': threading.get_ident(),
+                'args': {k: str(v) for k, v in meta.items()},
+            })
+
+    def close(self):
+        with self.lock:
+            events, self.events = self.events, []
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events}, f)
+
+
+class _Stage(object):
+    __slots__ = ('sink', 'name', 'meta', 'start')
+
+    def __init__(self, sink, name, meta):
+        self.sink = sink
+        self.name = name
+        self.meta = meta
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.sink.record(self.name, self.start, time.perf_counter() - self.start, self.meta)
+        return False
+
+
+class _NullStage(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, **meta):
+    """ time a block: `with stage('rec.run', batch=6):` """
+    sink = _sink
+    if sink is None:
+        return _NULL_STAGE
+    return _Stage(sink, name, meta)
+
+
+def is_enabled():
+    return _sink is not None
+
+
+def enable(sink=None):
+    """ start recording into sink (MemorySink by default), return the sink """
+    global _sink
+    _sink = sink if sink is not None else MemorySink()
+    return _sink
+
+
+def disable():
+    global _sink
+    _sink = None
+
+
+@contextmanager
+def profiling(sink=None):
+    """ enable profiling for the duration of the block, then close the sink """
+    global _sink
+    previous = _sink
+    sink = enable(sink)
+    try:
+        yield sink
+    finally:
+        _sink = previous
+        sink.close()
+
+
+def sink_from_spec(spec):
+    """
+    build a sink from a string spec:
+        'memory'            -> MemorySink
+        'json:<path>'       -> JsonFileSink
+        'trace:<path>'      -> ChromeTraceSink
+    """
+    if not spec:
+        return None
+    kind, _, path = spec.partition(':')
+    if kind == 'memory':
+        return MemorySink()
+    if kind == 'json':
+        return JsonFileSink(path or 'ocr_profile.json')
+    if kind == 'trace':
+        return ChromeTraceSink(path or 'ocr_trace.json')
+    raise ValueError("unknown profile sink: {}".format(spec))
@@ -0,0 +1,131 @@
+"""
+Build INT8 variants of the det / rec models.
+
+    python -m utils.onnxocr.quantize --model det --mode dynamic
+    python -m utils.onnxocr.quantize --model rec --mode static --images "test*.png"
+
+The output is written next to the fp32 model (see utils.variant_file)
+and selected at runtime with --det_model_variant / --rec_model_variant.
+Static quantization calibrates activation ranges on our own screenshots:
+full frames for det, and the text crops det finds in them for rec.
+Requires the `onnx` package (onnxruntime.quantization imports it).
+"""
+import argparse
+import glob
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from .utils import infer_args, variant_file, get_rotate_crop_image
+from .predict_system import sorted_boxes
+
+
+def default_args():
+    parser = infer_args()
+    args = argparse.Namespace(**{action.dest: action.default for action in parser._actions})
+    args.rec_image_shape = "3, 48, 320"
+    args.cpu = True
+    return args
+
+
+def det_calibration_inputs(args, images):
+    """Preprocessed det inputs (1, 3, H, W), one per screenshot."""
+    from .predict_det import TextDetector
+    from .imaug import transform
+    detector = TextDetector(args, cpu=True)
+    for path in images:
+        img, _ = transform({'image': cv2.imread(path)}, detector.preprocess_op)
+        yield np.ascontiguousarray(img[None])
+
+
+def rec_calibration_inputs(args, images, max_crops=512):
+    """Preprocessed rec inputs (1, 3, 48, 320) from the text boxes det finds in the screenshots."""
+    from .predict_det import TextDetector
+    from .predict_rec import TextRecognizer
+    detector = TextDetector(args, cpu=True)
+    recognizer = TextRecognizer(args, cpu=True)
+    _, img_h, img_w = recognizer.rec_image_shape
+    count = 0
+    for path in images:
+        img = cv2.imread(path)
+        for box in sorted_boxes(detector(img)):
+            crop = get_rotate_crop_image(img, box.copy())
+            yield recognizer.resize_norm_img(crop, img_w / img_h)[None]
+            count += 1
+            if count >= max_crops:
+                return
+
+
+def quantize_model(src, dst, mode="dynamic", inputs=None, per_channel=False):
+    """
+    Quantize src to dst.
+
+    mode: dynamic - int8 weights, activations quantized at run time
+          static  - int8 weights and activations (QDQ), activation ranges
+                    calibrated on `inputs`, an iterable of input arrays
+    """
+    from onnxruntime import InferenceSession
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_dynamic, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if mode == "dynamic":
+        # ConvInteger only has a uint8 kernel on CPU
+        quantize_dynamic(src, dst, weight_type=QuantType.QUInt8, per_channel=per_channel)
+        return dst
+    if mode != "static":
+        raise ValueError(f"unknown quantization mode {mode!r}")
+    if inputs is None:
+        raise ValueError("static quantization needs calibration inputs")
+
+    input_name = InferenceSession(src, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.samples = iter(inputs)
+
+        def get_next(self):
+            sample = next(self.samples, None)
+            return None if sample is None else {input_name: sample}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # shape inference and graph cleanup recommended before static quantization
+        prepared = os.path.join(tmp, "prepared.onnx")
+        quant_pre_process(src, prepared)
+        quantize_static(prepared, dst, Reader(), quant_format=QuantFormat.QDQ,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                        per_channel=per_channel)
+    return dst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="build INT8 det / rec models")
+    parser.add_argument("--model", choices=["det", "rec"], required=True)
+    parser.add_argument("--mode", choices=["dynamic", "static"], default="dynamic")
+    parser.add_argument("--images", type=str, default="test*.png", help="calibration screenshots (static)")
+    parser.add_argument("--max_crops", type=int, default=512, help="rec calibration crops (static)")
+    parser.add_argument("--per_channel", action="store_true")
+    opts = parser.parse_args()
+
+    args = default_args()
+    src = args.det_model_dir if opts.model == "det" else args.rec_model_dir
+    dst = variant_file(src, f"int8_{opts.mode}")
+
+    inputs = None
+    if opts.mode == "static":
+        images = sorted(glob.glob(opts.images))
+        if not images:
+            raise SystemExit(f"no calibration images match {opts.images}")
+        if opts.model == "det":
+            inputs = det_calibration_inputs(args, images)
+        else:
+            inputs = rec_calibration_inputs(args, images, opts.max_crops)
+
+    quantize_model(src, dst, opts.mode, inputs, opts.per_channel)
+    print(f"{src} -> {dst} ({os.path.getsize(src) / 2**20:.1f} MB -> {os.path.getsize(dst) / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
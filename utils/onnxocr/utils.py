@@ -2,11 +2,40 @@ import numpy as np
 import cv2
 import argparse
 import math
-from PIL import Image, ImageDraw, ImageFont
 import os
 abspath = os.path.dirname(os.path.dirname(os.path.dirname(__file__))) + '/'
 
-def get_rotate_crop_image(img, points):
+def axis_aligned_crop(img, points, tolerance=0.0):
+    """
+    Return the crop of an axis-aligned quad as a view of img, or None.
+
+    The quad must be ordered top-left, top-right, bottom-right, bottom-left,
+    lie inside the image and have corners within `tolerance` pixels of an
+    integer-aligned rectangle. With tolerance 0 the warp in
+    get_rotate_crop_image is a pure integer translation, so the slice is
+    pixel-identical to it.
+    """
+    corners = np.round(points)
+    if tolerance <= 0:
+        if not np.array_equal(corners, points):
+            return None
+    elif np.abs(corners - points).max() > tolerance:
+        return None
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = corners
+    left, top = min(x0, x3), min(y0, y1)
+    if max(abs(x0 - x3), abs(x1 - x2), abs(y0 - y1), abs(y2 - y3)) > 2 * tolerance:
+        return None
+    # same size as get_rotate_crop_image
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    left, top = int(left), int(top)
+    if width <= 0 or height <= 0 or x1 <= x0 or y3 <= y0 or left < 0 or top < 0 \
+            or top + height > img.shape[0] or left + width > img.shape[1]:
+        return None
+    return img[top:top + height, left:left + width]
+
+
+def get_rotate_crop_image(img, points, axis_tolerance=0.0):
     '''
     img_height, img_width = img.shape[0:2]
     left = int(np.min(points[:, 0]))
@@ -18,6 +47,13 @@ def get_rotate_crop_image(img, points):
     points[:, 1] = points[:, 1] - top
     '''
     assert len(points) == 4, "shape of points must be 4*2"
+    # axis-aligned boxes (almost all UI text) are sliced without warping;
+    # axis_tolerance=None always warps
+    dst_img = None if axis_tolerance is None else axis_aligned_crop(img, points, axis_tolerance)
+    if dst_img is not None:
+        if dst_img.shape[0] * 1.0 / dst_img.shape[1] >= 1.5:
+            dst_img = np.rot90(dst_img)
+        return dst_img
     img_crop_width = int(
         max(
             np.linalg.norm(points[0] - points[1]),
@@ -113,6 +149,8 @@ def text_visual(texts,
         font_path: the path of font which is used to draw text
     return(array):
     """
+    from PIL import Image, ImageDraw, ImageFont
+
     if scores is not None:
         assert len(texts) == len(
             scores), "The number of txts and corresponding scores must match"
@@ -222,6 +260,28 @@ def base64_to_cv2(b64str):
 def str2bool(v):
     return v.lower() in ("true", "t", "1")
 
+# fp32 is the exported model; the int8 variants are written next to it by
+# quantize.py, e.g. v3_det.onnx -> v3_det.int8_dynamic.onnx
+MODEL_VARIANTS = ("fp32", "int8_dynamic", "int8_static")
+
+
+def variant_file(model_path, variant):
+    if variant == "fp32":
+        return model_path
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.{variant}{ext}"
+
+
+def model_variant_path(model_path, variant="fp32"):
+    """Path of a model variant; raises if a quantized variant was not built."""
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"unknown model variant {variant!r}, expected one of {MODEL_VARIANTS}")
+    path = variant_file(model_path, variant)
+    if variant != "fp32" and not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found, build it with python -m utils.onnxocr.quantize")
+    return path
+
+
 def infer_args():
     parser = argparse.ArgumentParser()
     # params for prediction engine
@@ -243,6 +303,7 @@ def infer_args():
     parser.add_argument("--det_limit_side_len", type=float, default=1440)
     parser.add_argument("--det_limit_type", type=str, default='max')
     parser.add_argument("--det_box_type", type=str, default='quad')
+    parser.add_argument("--det_model_variant", type=str, default='fp32', choices=MODEL_VARIANTS)
 
     # DB parmas
     parser.add_argument("--det_db_thresh", type=float, default=0.3)
@@ -276,6 +337,7 @@ def infer_args():
     # params for text recognizer
     parser.add_argument("--rec_algorithm", type=str, default='SVTR_LCNet')
     parser.add_argument("--rec_model_dir", type=str, default=abspath + 'utils/models/v4_rec.onnx')
+    parser.add_argument("--rec_model_variant", type=str, default='fp32', choices=MODEL_VARIANTS)
     parser.add_argument("--rec_image_inverse", type=str2bool, default=True)
     parser.add_argument("--rec_image_shape", type=str, default="3, 48, 320")
     parser.add_argument("--rec_batch_num", type=int, default=6)
@@ -314,6 +376,11 @@ def infer_args():
     parser.add_argument("--cpu_threads", type=int, default=10)
     parser.add_argument("--use_pdserving", type=str2bool, default=False)
     parser.add_argument("--warmup", type=str2bool, default=False)
+    # shapes warmed up at startup: full 1080p frames for det, full-width crops for rec
+    parser.add_argument("--warmup_det_shapes", type=str, default="1080x1920")
+    parser.add_argument("--warmup_rec_widths", type=str, default="320")
+    # ORT-optimized graphs are cached here; empty disables the cache
+    parser.add_argument("--ort_cache_dir", type=str, default=abspath + 'utils/models/ort_cache')
 
     # SR parmas
     parser.add_argument("--sr_model_dir", type=str)
@@ -332,6 +399,8 @@ def infer_args():
     parser.add_argument("--process_id", type=int, default=0)
 
     parser.add_argument("--benchmark", type=str2bool, default=False)
+    # memory | json:<path> | trace:<path>, see profiler.sink_from_spec
+    parser.add_argument("--profile", type=str, default="")
     parser.add_argument("--save_log_path", type=str, default="./onnxocr/log_output/")
 
     parser.add_argument("--show_log", type=str2bool, default=True)
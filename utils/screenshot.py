@@ -4,6 +4,7 @@ from ctypes.wintypes import DWORD,LONG,WORD
 from threading import Lock
 import numpy as np
 from utils.log import log
+from utils.capture import CaptureBackend, CaptureError
 import time
 
 class BITMAPINFOHEADER(Structure):
@@ -24,12 +25,20 @@ class BITMAPINFO(Structure):
     _fields_ = [("bmiHeader", BITMAPINFOHEADER), ("bmiColors", DWORD * 3)]
 
 lock = Lock()
-class Screen():
-    def __init__(self,w=1920,h=1080):
+class GdiBackend(CaptureBackend):
+    """
+    Windows GDI 截图后端，BitBlt 到内存位图后用 GetDIBits 读出 BGRA 数据。
+    """
+    def __init__(self, ring_size=3, retries=10):
+        super().__init__(ring_size)
         self.gdi = ctypes.WinDLL("gdi32")
-        self.srcdc  = ctypes.WinDLL("user32").GetWindowDC(0)
+        self.user32 = ctypes.WinDLL("user32")
+        self.srcdc = self.user32.GetWindowDC(0)
         self.memdc = self.gdi.CreateCompatibleDC(self.srcdc)
-        self.width, self.height = w, h
+        # SM_CXSCREEN / SM_CYSCREEN
+        self.width = self.user32.GetSystemMetrics(0)
+        self.height = self.user32.GetSystemMetrics(1)
+        self.retries = retries
         self.bmi = BITMAPINFO()
         self.bmi.bmiHeader.biSize = 40
         self.bmi.bmiHeader.biPlanes = 1
@@ -37,20 +46,46 @@ class Screen():
         self.bmi.bmiHeader.biCompression = 0
         self.bmi.bmiHeader.biClrUsed = 0
         self.bmi.bmiHeader.biClrImportant = 0
-        self.bmi.bmiHeader.biWidth = self.width
-        self.bmi.bmiHeader.biHeight = -self.height
-        self.data = ctypes.create_string_buffer(self.width * self.height * 4)
-        self.bmp = self.gdi.CreateCompatibleBitmap(self.srcdc, self.width, self.height)
+        # 位图与数据缓冲区按截图区域大小缓存，区域不变时重复使用
+        self.bmp = None
+        self.bmp_size = None
+        self.data = None
+
+    def screen_size(self):
+        return self.width, self.height
+
+    def _prepare(self, w, h):
+        if self.bmp_size == (w, h):
+            return
+        if self.bmp is not None:
+            self.gdi.DeleteObject(self.bmp)
+        self.bmi.bmiHeader.biWidth = w
+        self.bmi.bmiHeader.biHeight = -h
+        self.data = ctypes.create_string_buffer(w * h * 4)
+        self.bmp = self.gdi.CreateCompatibleBitmap(self.srcdc, w, h)
         self.gdi.SelectObject(self.memdc, self.bmp)
+        self.bmp_size = (w, h)
 
-    def grab(self, x, y):
+    def _grab_into(self, x, y, out):
+        h, w = out.shape[:2]
         with lock:
-            for _ in range(10):
-                self.gdi.BitBlt(self.memdc, 0, 0, self.width, self.height, self.srcdc, x, y, 0x40CC0020)
-                bits = self.gdi.GetDIBits(self.memdc, self.bmp, 0, self.height, self.data, self.bmi, 0)
-                if bits != self.height:
+            self._prepare(w, h)
+            for _ in range(self.retries):
+                self.gdi.BitBlt(self.memdc, 0, 0, w, h, self.srcdc, x, y, 0x40CC0020)
+                bits = self.gdi.GetDIBits(self.memdc, self.bmp, 0, h, self.data, self.bmi, 0)
+                if bits != h:
                     log.info('截图失败！')
                     time.sleep(0.05)
                     continue
-                return np.frombuffer(bytearray(self.data), dtype=np.uint8).reshape((self.height,self.width,4))[:,:,:3]
-        return np.zeros((self.height,self.width,4))
\ No newline at end of file
+                # GDI 数据为 BGRA，直接从 ctypes 缓冲区复制 BGR 通道到输出帧
+                src = np.frombuffer(self.data, dtype=np.uint8, count=w * h * 4).reshape((h, w, 4))
+                np.copyto(out, src[:, :, :3])
+                return
+        raise CaptureError(f"GDI 截图连续失败 {self.retries} 次")
+
+    def close(self):
+        if self.bmp is not None:
+            self.gdi.DeleteObject(self.bmp)
+            self.bmp = None
+        self.gdi.DeleteDC(self.memdc)
+        self.user32.ReleaseDC(0, self.srcdc)